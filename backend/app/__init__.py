@@ -5,6 +5,8 @@ from flask_migrate import Migrate
 
 from .config import Config, DevelopmentConfig, ProductionConfig 
 from .models import db
+from .utils import fechas  # Registra los eventos que calculan el día local de sesiones y tareas
+from .utils.paginacion import CABECERA_CURSOR
 
 # Routers
 from .routes.auth import auth_bp
@@ -21,6 +23,7 @@ from .controllers.pomodoro_controller import pomodoro_controller
 from .controllers.meditacion_controller import meditacion_controller
 from .controllers.todo_controller import todo_controller
 from .controllers.recompensa_controller import recompensa_controller
+from .controllers.temporizador_controller import temporizador_controller
 
 def create_app(config_name='development'):
     app = Flask(__name__)
@@ -35,7 +38,7 @@ def create_app(config_name='development'):
 
     # Inicializar extensiones
     db.init_app(app)
-    CORS(app, origins=app.config.get('CORS_ORIGINS', '*'))
+    CORS(app, origins=app.config.get('CORS_ORIGINS', '*'), expose_headers=[CABECERA_CURSOR])
     jwt = JWTManager(app)
     migrate = Migrate(app, db)
 
@@ -53,6 +56,7 @@ def create_app(config_name='development'):
     app.register_blueprint(meditacion_controller, url_prefix='/api/bienestar')
     app.register_blueprint(todo_controller, url_prefix='/api/productividad')
     app.register_blueprint(recompensa_controller, url_prefix='/api/gamificacion')
+    app.register_blueprint(temporizador_controller, url_prefix='/api/productividad')
 
     # Crear tablas, roles, técnicas base y recompensas base
     with app.app_context():
@@ -87,4 +91,13 @@ def create_app(config_name='development'):
         from app.services.recompensa_service import RecompensaService
         RecompensaService.inicializar_recompensas_sistema()
 
+        # Tabla FTS5 para la búsqueda de tareas en SQLite (en MariaDB el índice FULLTEXT va en el modelo)
+        from app.services.busqueda_tarea_service import BusquedaTareaService
+        BusquedaTareaService.asegurar_indice()
+
+    # Cierre periódico de sesiones abandonadas dentro del proceso (opcional)
+    if app.config.get('CIERRE_SESIONES_INTERVALO', 0) > 0:
+        from app.services.sesion_inactiva_service import SesionInactivaService
+        SesionInactivaService.iniciar_hilo(app)
+
     return app
@@ -0,0 +1,28 @@
+import argparse
+import sys
+import os
+import time
+
+# Asegurarse de que el directorio backend esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db
+from app.services.sesion_inactiva_service import SesionInactivaService
+
+def cerrar_sesiones_inactivas(minutos=None, tamano_lote=200):
+    # Finaliza las sesiones en ejecución sin latido reciente (pensado para cron)
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        minutos = minutos or app.config.get('SESION_INACTIVIDAD_MINUTOS', 30)
+        inicio = time.perf_counter()
+        total = SesionInactivaService.cerrar_inactivas(minutos, tamano_lote)
+        db.session.remove()
+        print(f"Sesiones inactivas cerradas: {total} (más de {minutos} min sin latido) en {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cierra sesiones abandonadas sin latido reciente')
+    parser.add_argument('--minutos', type=int, default=None, help='Minutos sin latido (por defecto SESION_INACTIVIDAD_MINUTOS)')
+    parser.add_argument('--tamano-lote', type=int, default=200, help='Sesiones cerradas por transacción')
+    args = parser.parse_args()
+    cerrar_sesiones_inactivas(args.minutos, args.tamano_lote)
@@ -15,6 +15,14 @@ class Config:
     # Configuración CORS
     CORS_ORIGINS = ['http://localhost:3000'] # Cambiar según el frontend
     
+    # Cierre de sesiones en ejecución sin latido del cliente
+    SESION_INACTIVIDAD_MINUTOS = int(os.environ.get('SESION_INACTIVIDAD_MINUTOS', 30))
+    # Segundos entre pasadas del hilo de cierre; 0 = desactivado (usar cerrar_sesiones_inactivas.py)
+    CIERRE_SESIONES_INTERVALO = int(os.environ.get('CIERRE_SESIONES_INTERVALO', 0))
+    
+    # Máximo de tareas devueltas por lista en /api/productividad/todo/listas
+    TODO_TAREAS_POR_LISTA = int(os.environ.get('TODO_TAREAS_POR_LISTA', 100))
+    
     # Configuración general
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'otra-clave-secreta'
 
@@ -3,3 +3,4 @@ from .pomodoro_controller import pomodoro_controller
 from .meditacion_controller import meditacion_controller
 from .todo_controller import todo_controller
 from .recompensa_controller import recompensa_controller
+from .temporizador_controller import temporizador_controller
@@ -1,8 +1,11 @@
 # controllers/pomodoro_controller.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.pomodoro_service import PomodoroService
+from app.services.difusor_pomodoro import DifusorPomodoro
 from app.services.recompensa_service import RecompensaService
+import json
+import queue
 
 pomodoro_controller = Blueprint('pomodoro_controller', __name__)
 
@@ -27,4 +30,151 @@ def iniciar_pomodoro():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Similar structure for other routes like completar_ciclo_pomodoro, finalizar_pomodoro, obtener_estado_pomodoro
+@pomodoro_controller.route('/pomodoro/<string:sesion_id>/completar-ciclo', methods=['PATCH'])
+@jwt_required()
+def completar_ciclo_pomodoro(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        tipo_ciclo = data.get('tipo_ciclo')
+        if tipo_ciclo not in ('trabajo', 'descanso'):
+            return jsonify({'error': "tipo_ciclo debe ser 'trabajo' o 'descanso'"}), 400
+
+        resultado = PomodoroService.completar_ciclo(usuario_id, sesion_id, tipo_ciclo)
+
+        return jsonify(resultado), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pomodoro_controller.route('/pomodoro/<string:sesion_id>/pausar', methods=['PATCH'])
+@jwt_required()
+def pausar_pomodoro(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        pomodoro = PomodoroService.pausar_pomodoro(usuario_id, sesion_id)
+        DifusorPomodoro.notificar(sesion_id)
+
+        return jsonify({'message': 'Pomodoro pausado', 'pomodoro': pomodoro}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pomodoro_controller.route('/pomodoro/<string:sesion_id>/reanudar', methods=['PATCH'])
+@jwt_required()
+def reanudar_pomodoro(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        pomodoro = PomodoroService.reanudar_pomodoro(usuario_id, sesion_id)
+        DifusorPomodoro.notificar(sesion_id)
+
+        return jsonify({'message': 'Pomodoro reanudado', 'pomodoro': pomodoro}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pomodoro_controller.route('/pomodoro/<string:sesion_id>/finalizar', methods=['PATCH'])
+@jwt_required()
+def finalizar_pomodoro(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        completado_totalmente = data.get('completado_totalmente', False)
+
+        resultado = PomodoroService.finalizar_pomodoro(usuario_id, sesion_id, completado_totalmente)
+        DifusorPomodoro.notificar(sesion_id)
+
+        return jsonify(resultado), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pomodoro_controller.route('/pomodoro/<string:sesion_id>/estado', methods=['GET'])
+@jwt_required()
+def obtener_estado_pomodoro(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        # Solo lectura: la fase se calcula a partir del reloj
+        pomodoro = PomodoroService.obtener_estado_pomodoro(usuario_id, sesion_id)
+
+        return jsonify(pomodoro), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _evento(tipo, datos):
+    return f"event: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+@pomodoro_controller.route('/pomodoro/<string:sesion_id>/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # EventSource no envía cabeceras
+def stream_pomodoro(sesion_id):
+    """
+    Flujo SSE con el estado del Pomodoro: un evento al conectar, uno por cada
+    cambio de fase y una sincronización periódica. El cliente ya no necesita
+    sondear /estado.
+    """
+    usuario_id = get_jwt_identity()
+    try:
+        inicial, foto = DifusorPomodoro.cargar(usuario_id, sesion_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    def recargar():
+        try:
+            return DifusorPomodoro.cargar(usuario_id, sesion_id)[1]
+        except ValueError:
+            return None
+
+    def generar(foto):
+        yield _evento('estado', inicial)
+        if foto.estado != 'EnEjecucion':
+            return
+
+        suscripcion = DifusorPomodoro.suscribir(sesion_id, foto)
+        try:
+            while True:
+                try:
+                    mensaje = suscripcion.cola.get(timeout=DifusorPomodoro.INTERVALO_SYNC * 2)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+
+                if mensaje['tipo'] == 'fase':
+                    yield _evento('fase', mensaje['estado'])
+                    continue
+
+                # 'recarga' (cambio en este proceso) o 'sync': se relee la sesión
+                # por si otro proceso la pausó o la finalizó
+                nueva = recargar()
+                if nueva is None:
+                    return
+                if DifusorPomodoro.clave_foto(nueva) != DifusorPomodoro.clave_foto(foto):
+                    foto = nueva
+                    DifusorPomodoro.actualizar(suscripcion, foto)
+                    calculado = PomodoroService.calcular_estado(foto)
+                    calculado['estado'] = foto.estado
+                    yield _evento('estado', calculado)
+                    if foto.estado != 'EnEjecucion':
+                        return
+                elif mensaje['tipo'] == 'sync':
+                    yield _evento('sync', mensaje['estado'])
+        finally:
+            DifusorPomodoro.cancelar(suscripcion)
+
+    return Response(
+        stream_with_context(generar(foto)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
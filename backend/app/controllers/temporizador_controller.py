@@ -0,0 +1,100 @@
+# controllers/temporizador_controller.py
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.temporizador_service import TemporizadorService
+
+temporizador_controller = Blueprint('temporizador_controller', __name__)
+
+@temporizador_controller.route('/temporizadores/iniciar', methods=['POST'])
+@jwt_required()
+def iniciar_temporizador():
+    try:
+        usuario_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        tipo = data.get('tipo', 'estudio')
+        tecnica = data.get('tecnica')
+        if not tecnica:
+            return jsonify({'error': 'La técnica es requerida'}), 400
+
+        temporizador = TemporizadorService.iniciar(usuario_id, tipo, tecnica)
+
+        return jsonify({'message': 'Temporizador iniciado exitosamente', 'temporizador': temporizador}), 201
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@temporizador_controller.route('/temporizadores/<string:sesion_id>', methods=['GET'])
+@jwt_required()
+def obtener_temporizador(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        # Se reconstruye desde la base de datos: no depende del proceso que lo inició
+        temporizador = TemporizadorService.obtener_estado(usuario_id, sesion_id)
+
+        return jsonify(temporizador), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@temporizador_controller.route('/temporizadores/<string:sesion_id>/pausar', methods=['PATCH'])
+@jwt_required()
+def pausar_temporizador(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        temporizador = TemporizadorService.pausar(usuario_id, sesion_id)
+
+        return jsonify({'message': 'Temporizador pausado', 'temporizador': temporizador}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@temporizador_controller.route('/temporizadores/<string:sesion_id>/reanudar', methods=['PATCH'])
+@jwt_required()
+def reanudar_temporizador(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        temporizador = TemporizadorService.reanudar(usuario_id, sesion_id)
+
+        return jsonify({'message': 'Temporizador reanudado', 'temporizador': temporizador}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@temporizador_controller.route('/temporizadores/<string:sesion_id>/saltar-fase', methods=['PATCH'])
+@jwt_required()
+def saltar_fase_temporizador(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        temporizador = TemporizadorService.saltar_fase(usuario_id, sesion_id)
+
+        return jsonify({'message': 'Fase completada', 'temporizador': temporizador}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@temporizador_controller.route('/temporizadores/<string:sesion_id>/finalizar', methods=['PATCH'])
+@jwt_required()
+def finalizar_temporizador(sesion_id):
+    try:
+        usuario_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        resultado = TemporizadorService.finalizar(usuario_id, sesion_id, data.get('completada', False))
+
+        return jsonify(resultado), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,5 +1,5 @@
 # controllers/todo_controller.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.todo_service import TodoService
 from app.services.recompensa_service import RecompensaService
@@ -11,7 +11,7 @@ todo_controller = Blueprint('todo_controller', __name__)
 def obtener_listas_todo():
     try:
         usuario_id = get_jwt_identity()
-        listas = TodoService.obtener_listas_usuario(usuario_id)
+        listas = TodoService.obtener_listas_usuario(usuario_id, current_app.config['TODO_TAREAS_POR_LISTA'])
         return jsonify(listas), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
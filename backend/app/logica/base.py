@@ -4,18 +4,23 @@ Sistema de Temporizadores para Técnicas de Concentración y Meditación
 Archivo Base - Inicialización y Control Principal
 """
 
-import time
 import sys
-from datetime import datetime, timedelta
-from study_techniques import StudyTimer
-from meditation_techniques import MeditationTimer
+try:
+    from .estudio import StudyTimer
+    from .meditacion import MeditationTimer
+    from .reloj import SYSTEM_CLOCK
+except ImportError:  # Ejecutado como script desde logica/
+    from estudio import StudyTimer
+    from meditacion import MeditationTimer
+    from reloj import SYSTEM_CLOCK
 
 class TimerManager:
     """Gestor principal del sistema de temporizadores"""
     
-    def __init__(self):
-        self.study_timer = StudyTimer()
-        self.meditation_timer = MeditationTimer()
+    def __init__(self, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.study_timer = StudyTimer(clock=self.clock)
+        self.meditation_timer = MeditationTimer(clock=self.clock)
         self.current_session = None
         self.is_paused = False
         self.session_stats = {
@@ -90,24 +95,33 @@ class TimerManager:
                 current_phase = phase
             
             if remaining <= 0:
-                if session_type == 'study' and self.study_timer.has_next_phase():
-                    print(f"\n✅ Fase completada! Cambiando a {self.study_timer.get_next_phase()}")
-                    self.study_timer.next_phase()
-                    continue
-                else:
+                if not self.advance_phase(session_type):
                     self.complete_session()
                     break
+                continue
             
             self.display_timer(remaining, current_phase, session_type)
             
             # Simular entrada de teclado (en implementación real usarías threading)
-            time.sleep(1)
+            self.clock.sleep(1)
             
-            if not self.is_paused:
-                if session_type == 'study':
-                    self.study_timer.tick()
-                else:
-                    self.meditation_timer.tick()
+            self.step(session_type)
+    
+    def advance_phase(self, session_type):
+        """Pasa a la siguiente fase al agotarse el tiempo; False si la sesión terminó"""
+        if session_type == 'study' and self.study_timer.has_next_phase():
+            print(f"\n✅ Fase completada! Cambiando a {self.study_timer.get_next_phase()}")
+            self.study_timer.next_phase()
+            return True
+        return False
+    
+    def step(self, session_type):
+        """Avanza el temporizador activo un segundo"""
+        if not self.is_paused:
+            if session_type == 'study':
+                self.study_timer.tick()
+            else:
+                self.meditation_timer.tick()
     
     def display_timer(self, remaining, phase, session_type):
         """Muestra el temporizador en pantalla"""
@@ -150,7 +164,7 @@ class TimerManager:
         print(f"⭐ Mejor racha: {self.session_stats['best_streak']} días")
         print(f"✅ Sesiones hoy: {self.session_stats['sessions_today']}")
         print(f"⏱️  Minutos totales: {self.session_stats['total_minutes']}")
-        print(f"📅 Fecha: {datetime.now().strftime('%d/%m/%Y')}")
+        print(f"📅 Fecha: {self.clock.now().strftime('%d/%m/%Y')}")
     
     def configure_custom_pause(self):
         """Configura pausas personalizadas"""
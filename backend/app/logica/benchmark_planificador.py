@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Planificador de Temporizadores
+Mide el coste de mantener miles de temporizadores en un solo proceso
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import time
+try:
+    from .estudio import StudyTimer
+    from .meditacion import MeditationTimer
+    from .planificador import TimerScheduler
+except ImportError:  # Ejecutado como script desde logica/
+    from estudio import StudyTimer
+    from meditacion import MeditationTimer
+    from planificador import TimerScheduler
+
+def create_timers(scheduler: TimerScheduler, count: int, window: int, compress: bool):
+    """
+    Crea `count` temporizadores en un punto aleatorio de su fase actual. Con
+    `compress` todas las fases vencen dentro de la ventana (caso extremo).
+    """
+    study_keys = list(StudyTimer().get_available_techniques())
+    meditation_keys = list(MeditationTimer().get_available_techniques())
+
+    for i in range(count):
+        if i % 2 == 0:
+            timer = StudyTimer()
+            timer.start_technique(random.choice(study_keys))
+            timer_type = 'study'
+        else:
+            timer = MeditationTimer()
+            timer.start_technique(random.choice(meditation_keys))
+            timer_type = 'meditation'
+        # Simula sesiones iniciadas en momentos distintos
+        phase_length = window * 2 if compress else timer.remaining_time
+        timer.remaining_time = random.uniform(0, phase_length)
+        scheduler.add_timer(timer, timer_type)
+
+async def run_benchmark(count: int, window: int, compress: bool):
+    transitions = {'count': 0}
+
+    def on_phase_change(timer_id, previous, current, timer):
+        transitions['count'] += 1
+
+    scheduler = TimerScheduler(on_phase_change)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        create_timers(scheduler, count, window, compress)
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(window)
+        scheduler.stop()
+        await task
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+    print(f"⏱️  Temporizadores: {count}")
+    print(f"🔄 Cambios de fase: {transitions['count']}")
+    print(f"🕒 Tiempo real: {wall:.2f}s")
+    print(f"⚙️  CPU: {cpu:.3f}s ({cpu / wall * 100:.2f}%)")
+    print(f"📉 tick() por segundo que se evitan: {count}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del planificador de temporizadores')
+    parser.add_argument('--temporizadores', type=int, default=10000, help='Temporizadores simultáneos')
+    parser.add_argument('--segundos', type=int, default=10, help='Duración de la medición')
+    parser.add_argument('--comprimir', action='store_true', help='Hacer vencer todas las fases durante la medición')
+    args = parser.parse_args()
+
+    if args.temporizadores < 1 or args.segundos < 1:
+        parser.error('Los valores deben ser mayores que 0')
+
+    asyncio.run(run_benchmark(args.temporizadores, args.segundos, args.comprimir))
+
+if __name__ == "__main__":
+    main()
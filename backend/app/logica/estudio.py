@@ -4,14 +4,23 @@ Técnicas de Estudio con Cronómetro
 Implementación de Pomodoro, 52-17, Ultradian y otras técnicas
 """
 
-import time
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Dict, Any, Optional
+import math
+try:
+    from .linea_tiempo import PhaseTimeline
+    from .historial import SessionHistory
+    from .reloj import SYSTEM_CLOCK
+except ImportError:  # Ejecutado como script desde logica/
+    from linea_tiempo import PhaseTimeline
+    from historial import SessionHistory
+    from reloj import SYSTEM_CLOCK
 
 class StudyTimer:
     """Clase para manejar las técnicas de estudio con cronómetro"""
     
-    def __init__(self):
+    def __init__(self, history_path: Optional[str] = None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
         self.techniques = {
             'pomodoro': {
                 'name': 'Técnica Pomodoro Clásica',
@@ -74,13 +83,14 @@ class StudyTimer:
         
         # Estado actual del temporizador
         self.current_technique = None
+        self.current_technique_key = None
         self.current_phase = 'work'  # 'work', 'break', 'long_break'
         self.remaining_time = 0  # en segundos
         self.cycle_count = 0
         self.is_active = False
         self.start_time = None
         self.total_work_time = 0
-        self.session_history = []
+        self.session_history = SessionHistory(history_path, value_field='work_minutes')
     
     def get_available_techniques(self) -> Dict[str, Any]:
         """Retorna las técnicas disponibles"""
@@ -92,11 +102,12 @@ class StudyTimer:
             raise ValueError(f"Técnica '{technique_key}' no encontrada")
         
         self.current_technique = self.techniques[technique_key]
+        self.current_technique_key = technique_key
         self.current_phase = 'work'
         self.remaining_time = self.current_technique['work'] * 60  # convertir a segundos
         self.cycle_count = 0
         self.is_active = True
-        self.start_time = datetime.now()
+        self.start_time = self.clock.now()
         
         print(f"🚀 Iniciando: {self.current_technique['name']}")
         print(f"📝 {self.current_technique['description']}")
@@ -182,6 +193,41 @@ class StudyTimer:
         """Retorna el tiempo restante en segundos"""
         return max(0, self.remaining_time)
     
+    def get_timeline(self, technique_key: Optional[str] = None, cycles: Optional[int] = None) -> PhaseTimeline:
+        """Calendario de fases compilado de una técnica (por defecto la actual)"""
+        if technique_key is None:
+            if not self.current_technique:
+                raise ValueError("No hay ninguna técnica en curso")
+            technique = self.current_technique
+        elif technique_key in self.techniques:
+            technique = self.techniques[technique_key]
+        else:
+            raise ValueError(f"Técnica '{technique_key}' no encontrada")
+        return PhaseTimeline.from_technique(technique, cycles)
+    
+    def get_phase_at(self, seconds: float, technique_key: Optional[str] = None) -> Dict[str, Any]:
+        """Fase en la que estaría la sesión `seconds` segundos después de empezar"""
+        return self.get_timeline(technique_key).phase_at(seconds)
+    
+    def get_timeline_position(self) -> float:
+        """Segundo del calendario que representa el estado actual (incluye fases saltadas)"""
+        return self.get_timeline().position_of(self.current_phase, self.cycle_count, self.remaining_time)
+    
+    def restore_state(self, technique: Dict[str, Any], position: float, technique_key: Optional[str] = None):
+        """
+        Reconstruye el temporizador en el segundo `position` de su calendario
+        sin simular ticks (p. ej. a partir del estado guardado por otro proceso)
+        """
+        phase = PhaseTimeline.from_technique(technique).phase_at(position)
+        self.current_technique = technique
+        self.current_technique_key = technique_key
+        self.current_phase = phase['phase']
+        self.remaining_time = math.ceil(phase['remaining_seconds'])
+        self.cycle_count = phase['cycles_completed']
+        self.total_work_time = self.cycle_count * technique['work']
+        self.is_active = True
+        self.start_time = self.clock.now() - timedelta(seconds=position)
+    
     def pause(self):
         """Pausa el temporizador"""
         self.is_active = False
@@ -214,7 +260,7 @@ class StudyTimer:
         if not self.start_time:
             return {}
         
-        elapsed = datetime.now() - self.start_time
+        elapsed = self.clock.now() - self.start_time
         return {
             'technique': self.current_technique['name'] if self.current_technique else None,
             'elapsed_minutes': int(elapsed.total_seconds() / 60),
@@ -281,9 +327,9 @@ class StudyTimer:
         """Guarda la sesión actual al historial"""
         if self.start_time and self.current_technique:
             session_data = {
-                'date': datetime.now().isoformat(),
+                'date': self.clock.now().isoformat(),
                 'technique': self.current_technique['name'],
-                'duration_minutes': int((datetime.now() - self.start_time).total_seconds() / 60),
+                'duration_minutes': int((self.clock.now() - self.start_time).total_seconds() / 60),
                 'cycles_completed': self.cycle_count,
                 'work_minutes': self.total_work_time
             }
@@ -292,34 +338,16 @@ class StudyTimer:
     
     def get_weekly_stats(self) -> Dict[str, Any]:
         """Retorna estadísticas semanales"""
-        now = datetime.now()
-        week_ago = now - timedelta(days=7)
-        
-        recent_sessions = [
-            session for session in self.session_history
-            if datetime.fromisoformat(session['date']) >= week_ago
-        ]
+        stats = self.session_history.weekly_stats(self.clock.now())
         
-        if not recent_sessions:
+        if not stats['sessions']:
             return {'sessions': 0, 'total_minutes': 0, 'average_session': 0}
         
-        total_minutes = sum(session['work_minutes'] for session in recent_sessions)
+        total_minutes = int(stats['total'])
         
         return {
-            'sessions': len(recent_sessions),
+            'sessions': stats['sessions'],
             'total_minutes': total_minutes,
-            'average_session': total_minutes // len(recent_sessions) if recent_sessions else 0,
-            'most_used_technique': self._get_most_used_technique(recent_sessions)
+            'average_session': total_minutes // stats['sessions'],
+            'most_used_technique': stats['most_used_technique']
         }
-    
-    def _get_most_used_technique(self, sessions) -> str:
-        """Determina la técnica más utilizada"""
-        technique_counts = {}
-        for session in sessions:
-            technique = session['technique']
-            technique_counts[technique] = technique_counts.get(technique, 0) + 1
-        
-        if not technique_counts:
-            return "Ninguna"
-        
-        return max(technique_counts, key=technique_counts.get)
\ No newline at end of file
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Historial de Sesiones
+Almacén persistente de solo añadido con una vista compacta en memoria
+"""
+
+import json
+import os
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, Optional
+
+class SessionHistory:
+    """
+    Historial de sesiones de un temporizador.
+
+    Cada sesión se añade como una línea JSON al fichero (si se indica uno),
+    que es la copia completa y duradera. En memoria solo se guardan columnas
+    en arrays tipados: marca de tiempo (segundos), día (ordinal), valor
+    principal (minutos) con sumas acumuladas, ciclos y técnica (índice en una
+    tabla de nombres). Las consultas por rango de tiempo son búsquedas
+    binarias y la racha diaria se mantiene al añadir.
+
+    La vista en memoria conserva solo `retention_days` días; la racha no se
+    ve afectada porque se calcula de forma incremental.
+    """
+
+    def __init__(self, path: Optional[str] = None, value_field: str = 'work_minutes',
+                 retention_days: int = 400):
+        if retention_days < 1:
+            raise ValueError("retention_days debe ser mayor que 0")
+
+        self.path = path
+        self.value_field = value_field
+        self.retention_days = retention_days
+
+        self._timestamps = array('q')
+        self._days = array('l')
+        self._values = array('d')
+        self._sums = array('d', [0.0])  # _sums[i] = suma de _values[:i]
+        self._cycles = array('l')
+        self._techniques = array('H')
+        self._technique_names = []
+        self._technique_index = {}
+
+        # Racha: días consecutivos que terminan en el último día con sesiones
+        self._last_day = None
+        self._streak = 0
+        self._best_streak = 0
+
+        if path and os.path.exists(path):
+            self._load()
+
+    # --- Escritura ---
+
+    def append(self, session: Dict[str, Any]):
+        """Añade una sesión (con 'date' en ISO) al fichero y a la vista"""
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(session, ensure_ascii=False) + '\n')
+        self._add(session)
+        self._trim()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    self._add(json.loads(line))
+        self._trim()
+
+    def _add(self, session: Dict[str, Any]):
+        moment = datetime.fromisoformat(session['date'])
+        timestamp = int(moment.timestamp())
+        day = moment.date().toordinal()
+
+        technique = session.get('technique') or ''
+        if technique not in self._technique_index:
+            self._technique_index[technique] = len(self._technique_names)
+            self._technique_names.append(technique)
+
+        value = float(session.get(self.value_field) or 0)
+        row = (timestamp, day, value, int(session.get('cycles_completed') or 0), self._technique_index[technique])
+
+        if not self._timestamps or timestamp >= self._timestamps[-1]:
+            self._append_row(row)
+        else:
+            self._insert_row(row)
+        self._update_streak(day)
+
+    def _append_row(self, row):
+        timestamp, day, value, cycles, technique = row
+        self._timestamps.append(timestamp)
+        self._days.append(day)
+        self._values.append(value)
+        self._sums.append(self._sums[-1] + value)
+        self._cycles.append(cycles)
+        self._techniques.append(technique)
+
+    def _insert_row(self, row):
+        # Sesión con fecha anterior a la última (poco habitual): se inserta
+        # en orden y se rehacen las sumas desde ese punto
+        timestamp, day, value, cycles, technique = row
+        index = bisect_left(self._timestamps, timestamp + 1)
+        self._timestamps.insert(index, timestamp)
+        self._days.insert(index, day)
+        self._values.insert(index, value)
+        self._cycles.insert(index, cycles)
+        self._techniques.insert(index, technique)
+        del self._sums[index + 1:]
+        for current in self._values[index:]:
+            self._sums.append(self._sums[-1] + current)
+
+    def _update_streak(self, day: int):
+        if self._last_day is None or day > self._last_day + 1:
+            self._streak = 1
+        elif day == self._last_day + 1:
+            self._streak += 1
+        elif day < self._last_day:
+            # Día atrasado: la racha se recalcula sobre los días retenidos
+            self._streak = self._recount_streak()
+            return
+        else:
+            return
+        self._last_day = day
+        self._best_streak = max(self._best_streak, self._streak)
+
+    def _recount_streak(self) -> int:
+        days = sorted(set(self._days), reverse=True)
+        streak = 1
+        for previous, current in zip(days, days[1:]):
+            if previous - current != 1:
+                break
+            streak += 1
+        self._best_streak = max(self._best_streak, streak)
+        return streak
+
+    def _trim(self):
+        """Descarta de la vista lo anterior a la retención (el fichero no cambia)"""
+        if not self._days:
+            return
+        cutoff = self._days[-1] - self.retention_days
+        count = bisect_left(self._days, cutoff)
+        # Recortar en bloques para no copiar los arrays en cada alta
+        if count < 1024 and count < len(self._days) // 2:
+            return
+        for column in (self._timestamps, self._days, self._values, self._cycles, self._techniques):
+            del column[:count]
+        del self._sums[:count]
+
+    # --- Consultas ---
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __bool__(self) -> bool:
+        return len(self._timestamps) > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Sesiones retenidas (columnas resumidas, no el registro completo)"""
+        for i in range(len(self._timestamps)):
+            yield self._row(i)
+
+    def _row(self, i: int) -> Dict[str, Any]:
+        return {
+            'date': datetime.fromtimestamp(self._timestamps[i]).isoformat(),
+            'technique': self._technique_names[self._techniques[i]],
+            self.value_field: self._values[i],
+            'cycles_completed': self._cycles[i]
+        }
+
+    def _range(self, since: datetime, until: Optional[datetime] = None):
+        start = bisect_left(self._timestamps, int(since.timestamp()))
+        end = len(self._timestamps) if until is None else bisect_left(self._timestamps, int(until.timestamp()))
+        return start, end
+
+    def count_since(self, since: datetime, until: Optional[datetime] = None) -> int:
+        start, end = self._range(since, until)
+        return max(0, end - start)
+
+    def total_since(self, since: datetime, until: Optional[datetime] = None) -> float:
+        """Suma del valor principal en el rango, O(log n) con las sumas acumuladas"""
+        start, end = self._range(since, until)
+        return self._sums[end] - self._sums[start] if end > start else 0.0
+
+    def most_used_since(self, since: datetime, until: Optional[datetime] = None) -> Optional[str]:
+        start, end = self._range(since, until)
+        if end <= start:
+            return None
+        counts = {}
+        for technique in self._techniques[start:end]:
+            counts[technique] = counts.get(technique, 0) + 1
+        return self._technique_names[max(counts, key=counts.get)]
+
+    def current_streak(self, today: Optional[datetime] = None) -> int:
+        """Días consecutivos con sesiones que terminan hoy (0 si hoy no hay)"""
+        today = (today or datetime.now()).date().toordinal()
+        return self._streak if self._last_day == today else 0
+
+    @property
+    def best_streak(self) -> int:
+        return self._best_streak
+
+    def weekly_stats(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Sesiones, total y técnica más usada de los últimos 7 días"""
+        week_ago = (now or datetime.now()) - timedelta(days=7)
+        sessions = self.count_since(week_ago)
+        total = self.total_since(week_ago)
+        return {
+            'sessions': sessions,
+            'total': total,
+            'most_used_technique': self.most_used_since(week_ago)
+        }
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Línea de Tiempo de Fases
+Compila una técnica de estudio en un calendario inmutable de fases
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional
+
+class Phase(NamedTuple):
+    """Una fase del calendario (segundos desde el inicio de la sesión)"""
+    start: int
+    end: int
+    phase: str   # 'work', 'break', 'long_break'
+    cycle: int   # ciclo de trabajo al que pertenece (desde 1)
+
+class PhaseTimeline:
+    """
+    Calendario de fases de una técnica, con la misma cadencia que
+    StudyTimer.next_phase: tras cada trabajo hay descanso, y descanso largo
+    cuando el número de ciclos es múltiplo de cycles_for_long_break.
+
+    La secuencia es periódica, así que solo se guarda un periodo (de
+    cycles_for_long_break ciclos) como tuplas; la fase en un instante se
+    obtiene con divmod sobre el periodo y búsqueda binaria en los inicios.
+    Con `cycles` la sesión termina al acabar el trabajo de ese ciclo.
+    """
+
+    __slots__ = ('name', 'work', 'short_break', 'long_break', 'cycles_for_long_break',
+                 'cycles', 'period', '_phases', '_starts')
+
+    def __init__(self, work: int, short_break: int, long_break: int,
+                 cycles_for_long_break: int = 1, cycles: Optional[int] = None, name: str = None):
+        if work <= 0 or short_break < 0 or long_break < 0 or cycles_for_long_break < 1:
+            raise ValueError("Duraciones de la técnica no válidas")
+        if cycles is not None and cycles < 1:
+            raise ValueError("El número de ciclos debe ser mayor que 0")
+
+        self.name = name
+        self.work = work * 60
+        self.short_break = short_break * 60
+        self.long_break = long_break * 60
+        self.cycles_for_long_break = cycles_for_long_break
+        self.cycles = cycles
+
+        phases = []
+        offset = 0
+        for cycle in range(1, cycles_for_long_break + 1):
+            phases.append(Phase(offset, offset + self.work, 'work', cycle))
+            offset += self.work
+            if cycle == cycles_for_long_break:
+                phases.append(Phase(offset, offset + self.long_break, 'long_break', cycle))
+                offset += self.long_break
+            else:
+                phases.append(Phase(offset, offset + self.short_break, 'break', cycle))
+                offset += self.short_break
+
+        self.period = offset
+        # Fases de duración 0 no se pueden alcanzar por tiempo
+        self._phases = tuple(phase for phase in phases if phase.end > phase.start)
+        self._starts = tuple(phase.start for phase in self._phases)  # Asignado el último: congela la instancia
+
+    def __setattr__(self, name, value):
+        if hasattr(self, '_starts'):
+            raise AttributeError("PhaseTimeline es inmutable")
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_technique(cls, technique: Dict[str, Any], cycles: Optional[int] = None) -> 'PhaseTimeline':
+        """Compila una técnica de StudyTimer.techniques (incluidas las personalizadas)"""
+        return compile_timeline(
+            technique['work'],
+            technique['break'],
+            technique.get('long_break', technique['break']),
+            technique.get('cycles_for_long_break', 1),
+            cycles,
+            technique.get('name')
+        )
+
+    @property
+    def total_duration(self) -> Optional[int]:
+        """Duración total en segundos (None si la sesión no tiene fin)"""
+        if self.cycles is None:
+            return None
+        return self.cycle_start(self.cycles) + self.work
+
+    def cycle_start(self, cycle: int) -> int:
+        """Segundo en que empieza el trabajo del ciclo `cycle`"""
+        periods, index = divmod(cycle - 1, self.cycles_for_long_break)
+        return periods * self.period + index * (self.work + self.short_break)
+
+    def position_of(self, phase: str, cycles_completed: int, remaining_seconds: float) -> float:
+        """Inverso de phase_at: segundo del calendario para una fase y su tiempo restante"""
+        if phase == 'work':
+            start = self.cycle_start(cycles_completed + 1)
+            duration = self.work
+        else:
+            start = self.cycle_start(cycles_completed) + self.work
+            duration = self.long_break if phase == 'long_break' else self.short_break
+        return start + duration - remaining_seconds
+
+    def phase_at(self, seconds: float) -> Dict[str, Any]:
+        """Fase en curso `seconds` segundos después del inicio de la sesión"""
+        seconds = max(0, seconds)
+        total = self.total_duration
+        if total is not None and seconds >= total:
+            return {
+                'phase': 'completed',
+                'cycle': self.cycles,
+                'cycles_completed': self.cycles,
+                'elapsed_in_phase': 0,
+                'remaining_seconds': 0
+            }
+
+        periods, position = divmod(seconds, self.period)
+        phase = self._phases[bisect_right(self._starts, position) - 1]
+        cycle = int(periods) * self.cycles_for_long_break + phase.cycle
+        return {
+            'phase': phase.phase,
+            'cycle': cycle,
+            'cycles_completed': cycle if phase.phase != 'work' else cycle - 1,
+            'elapsed_in_phase': position - phase.start,
+            'remaining_seconds': phase.end - position
+        }
+
+    def phases(self, cycles: Optional[int] = None) -> List[Phase]:
+        """Fases en orden hasta `cycles` ciclos (por defecto los de la sesión)"""
+        cycles = cycles or self.cycles
+        if cycles is None:
+            raise ValueError("Indica cuántos ciclos exportar para una sesión sin fin")
+
+        # Una sesión con fin termina en trabajo; al exportar ciclos de una
+        # sesión sin fin se incluye el descanso del último ciclo
+        ends_with_work = self.cycles is not None
+        result = []
+        for periods in range((cycles - 1) // self.cycles_for_long_break + 1):
+            base = periods * self.period
+            for phase in self._phases:
+                cycle = periods * self.cycles_for_long_break + phase.cycle
+                if cycle > cycles or (cycle == cycles and phase.phase != 'work' and ends_with_work):
+                    break
+                result.append(Phase(base + phase.start, base + phase.end, phase.phase, cycle))
+        return result
+
+    def export(self, cycles: Optional[int] = None, start_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Calendario completo como lista de diccionarios, con horas si se da `start_time`"""
+        schedule = []
+        for phase in self.phases(cycles):
+            entry = phase._asdict()
+            entry['minutes'] = (phase.end - phase.start) // 60
+            if start_time:
+                entry['start_time'] = (start_time + timedelta(seconds=phase.start)).isoformat()
+                entry['end_time'] = (start_time + timedelta(seconds=phase.end)).isoformat()
+            schedule.append(entry)
+        return schedule
+
+@lru_cache(maxsize=256)
+def compile_timeline(work: int, short_break: int, long_break: int,
+                     cycles_for_long_break: int = 1, cycles: Optional[int] = None,
+                     name: str = None) -> PhaseTimeline:
+    """Compila (y reutiliza) el calendario para una configuración"""
+    return PhaseTimeline(work, short_break, long_break, cycles_for_long_break, cycles, name)
@@ -4,15 +4,81 @@ Técnicas de Meditación y Respiración Pre-Estudio
 Implementación de respiración 4-7-8, Box Breathing, Mindfulness
 """
 
-import time
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from datetime import timedelta
+from typing import Dict, Any, Optional, List, Tuple
+from bisect import bisect_right
+from functools import lru_cache
 import math
+try:
+    from .historial import SessionHistory
+    from .reloj import SYSTEM_CLOCK
+except ImportError:  # Ejecutado como script desde logica/
+    from historial import SessionHistory
+    from reloj import SYSTEM_CLOCK
+
+BREATHING_PHASES = ('inhale', 'hold', 'exhale', 'pause')
+
+BREATHING_LABELS = {
+    'inhale': 'Inhala suavemente...',
+    'hold': 'Mantén el aire...',
+    'exhale': 'Exhala lentamente...',
+    'pause': 'Pausa vacío...'
+}
+
+class BreathingTable:
+    """
+    Ciclo de respiración compilado: tabla de desplazamientos (segundo de
+    inicio, fase) de una respiración completa y la instrucción ya formateada
+    para cada segundo. El estado tras `n` segundos se obtiene con divmod
+    sobre la duración del ciclo y una búsqueda binaria, sin simular ticks.
+    """
+
+    __slots__ = ('period', 'offsets', 'phases', 'instructions')
+
+    def __init__(self, inhale: int, hold: int, exhale: int, pause: int):
+        durations = dict(zip(BREATHING_PHASES, (inhale, hold, exhale, pause)))
+        # Las fases de duración 0 se saltan, como en el ciclo por ticks
+        sequence = [(phase, durations[phase]) for phase in BREATHING_PHASES if durations[phase] > 0]
+
+        offsets = []
+        instructions = []
+        start = 0
+        for phase, duration in sequence:
+            offsets.append(start)
+            for count in range(duration):
+                instructions.append(f"{BREATHING_LABELS[phase]} ({count + 1}/{duration})")
+            start += duration
+
+        self.period = start
+        self.offsets = tuple(offsets)
+        self.phases = tuple(phase for phase, _ in sequence)
+        self.instructions = tuple(instructions)
+
+    def phase_at(self, elapsed: int) -> Tuple[str, int, int]:
+        """(fase, segundo dentro de la fase, ciclo) tras `elapsed` segundos"""
+        cycle, position = divmod(int(elapsed), self.period)
+        index = bisect_right(self.offsets, position) - 1
+        return self.phases[index], position - self.offsets[index], cycle
+
+    def instruction_at(self, elapsed: int) -> str:
+        """Instrucción (sin el ciclo) tras `elapsed` segundos, O(1)"""
+        return self.instructions[int(elapsed) % self.period]
+
+@lru_cache(maxsize=64)
+def compile_breathing_table(inhale: int, hold: int, exhale: int, pause: int) -> BreathingTable:
+    """Compila una vez la tabla de cada patrón de respiración"""
+    return BreathingTable(inhale, hold, exhale, pause)
+
+@lru_cache(maxsize=4096)
+def _render_instruction(base: str, cycle: int, cycles: int) -> str:
+    # Cachea las cadenas completas: se piden cada segundo y hay pocas distintas
+    return f"{base} | Ciclo: {cycle + 1}/{cycles}"
 
 class MeditationTimer:
     """Clase para manejar las técnicas de meditación y respiración"""
     
-    def __init__(self):
+    def __init__(self, history_path: Optional[str] = None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
         self.techniques = {
             'breathing_4_7_8': {
                 'name': 'Respiración 4-7-8 (Calmante)',
@@ -132,13 +198,16 @@ class MeditationTimer:
         
         # Estado actual
         self.current_technique = None
+        self.current_technique_key = None
         self.remaining_time = 0
         self.is_active = False
         self.start_time = None
         self.current_cycle = 0
         self.breathing_phase = 'inhale'  # 'inhale', 'hold', 'exhale', 'pause'
         self.breathing_count = 0
-        self.session_history = []
+        self.breathing_elapsed = 0  # segundos de respiración guiada transcurridos
+        self.breathing_table = None
+        self.session_history = SessionHistory(history_path, value_field='actual_duration')
     
     def get_available_techniques(self) -> Dict[str, Any]:
         """Retorna las técnicas disponibles"""
@@ -150,12 +219,15 @@ class MeditationTimer:
             raise ValueError(f"Técnica '{technique_key}' no encontrada")
         
         self.current_technique = self.techniques[technique_key]
+        self.current_technique_key = technique_key
         self.remaining_time = self.current_technique['duration'] * 60
         self.is_active = True
-        self.start_time = datetime.now()
+        self.start_time = self.clock.now()
         self.current_cycle = 0
         self.breathing_phase = 'inhale'
         self.breathing_count = 0
+        self.breathing_elapsed = 0
+        self.breathing_table = self.get_breathing_table(technique_key)
         
         print(f"🧘 Iniciando: {self.current_technique['name']}")
         print(f"📝 {self.current_technique['description']}")
@@ -185,48 +257,17 @@ class MeditationTimer:
         if self.current_technique['inhale'] > 0:
             self._handle_breathing_cycle()
     
-    def _handle_breathing_cycle(self):
-        """Maneja los ciclos de respiración estructurada"""
-        technique = self.current_technique
-        
-        # Duración de cada fase
-        phases = {
-            'inhale': technique['inhale'],
-            'hold': technique['hold'],
-            'exhale': technique['exhale'],
-            'pause': technique['pause']
-        }
-        
-        current_phase_duration = phases[self.breathing_phase]
-        
-        if current_phase_duration > 0:
-            self.breathing_count += 1
-            
-            # Cambiar de fase cuando se complete el tiempo
-            if self.breathing_count >= current_phase_duration:
-                self._next_breathing_phase()
+    def get_breathing_table(self, technique_key: str) -> Optional[BreathingTable]:
+        """Tabla compilada del patrón de respiración (None si es respiración natural)"""
+        technique = self.techniques[technique_key]
+        if technique['inhale'] == 0:
+            return None
+        return compile_breathing_table(technique['inhale'], technique['hold'], technique['exhale'], technique['pause'])
     
-    def _next_breathing_phase(self):
-        """Cambia a la siguiente fase de respiración"""
-        self.breathing_count = 0
-        
-        phase_order = ['inhale', 'hold', 'exhale', 'pause']
-        current_index = phase_order.index(self.breathing_phase)
-        
-        # Si hay pausa y es > 0, incluirla
-        if self.breathing_phase == 'exhale' and self.current_technique['pause'] > 0:
-            self.breathing_phase = 'pause'
-        elif self.breathing_phase == 'pause' or (self.breathing_phase == 'exhale' and self.current_technique['pause'] == 0):
-            self.breathing_phase = 'inhale'
-            self.current_cycle += 1
-        else:
-            next_index = (current_index + 1) % len(phase_order)
-            self.breathing_phase = phase_order[next_index]
-            
-            # Saltar fases con duración 0
-            while self.current_technique[self.breathing_phase] == 0 and self.breathing_phase != 'inhale':
-                next_index = (phase_order.index(self.breathing_phase) + 1) % len(phase_order)
-                self.breathing_phase = phase_order[next_index]
+    def _handle_breathing_cycle(self):
+        """Avanza un segundo en el ciclo de respiración usando la tabla compilada"""
+        self.breathing_elapsed += 1
+        self.breathing_phase, self.breathing_count, self.current_cycle = self.breathing_table.phase_at(self.breathing_elapsed)
     
     def get_breathing_instruction(self) -> Optional[str]:
         """Retorna la instrucción de respiración actual"""
@@ -237,22 +278,61 @@ class MeditationTimer:
         if self.current_technique['inhale'] == 0:
             return "Respira naturalmente y mantén la atención en el presente"
         
-        phase_instructions = {
-            'inhale': f"Inhala suavemente... ({self.breathing_count + 1}/{self.current_technique['inhale']})",
-            'hold': f"Mantén el aire... ({self.breathing_count + 1}/{self.current_technique['hold']})",
-            'exhale': f"Exhala lentamente... ({self.breathing_count + 1}/{self.current_technique['exhale']})",
-            'pause': f"Pausa vacío... ({self.breathing_count + 1}/{self.current_technique['pause']})"
-        }
-        
-        base_instruction = phase_instructions.get(self.breathing_phase, "")
-        cycle_info = f" | Ciclo: {self.current_cycle + 1}/{self.current_technique['cycles']}"
+        return self.get_breathing_instruction_at(self.breathing_elapsed)
+    
+    def get_breathing_instruction_at(self, elapsed: int, technique_key: Optional[str] = None) -> Optional[str]:
+        """
+        Instrucción de respiración tras `elapsed` segundos de sesión, sin
+        estado: sirve para muchos participantes que siguen el mismo patrón.
+        """
+        if technique_key is not None:
+            technique = self.techniques[technique_key]
+            table = self.get_breathing_table(technique_key)
+        else:
+            technique = self.current_technique
+            table = self.breathing_table
+        if not technique:
+            return None
+        if table is None:
+            return "Respira naturalmente y mantén la atención en el presente"
         
-        return base_instruction + cycle_info
+        cycle = int(elapsed) // table.period
+        return _render_instruction(table.instruction_at(elapsed), cycle, technique['cycles'])
     
     def get_remaining_time(self) -> int:
         """Retorna el tiempo restante en segundos"""
         return max(0, self.remaining_time)
     
+    def get_timeline_position(self) -> float:
+        """Segundos de sesión que representa el estado actual"""
+        return self.current_technique['duration'] * 60 - self.remaining_time
+    
+    def restore_state(self, technique_key: str, position: float, duration: Optional[int] = None):
+        """
+        Reconstruye la meditación `position` segundos después de empezar sin
+        simular ticks. `duration` (minutos) sustituye a la de la técnica.
+        """
+        if technique_key not in self.techniques:
+            raise ValueError(f"Técnica '{technique_key}' no encontrada")
+        
+        technique = self.techniques[technique_key]
+        if duration is not None and duration != technique['duration']:
+            technique = dict(technique, duration=duration)
+        total = technique['duration'] * 60
+        position = min(max(position, 0), total)
+        
+        self.current_technique = technique
+        self.current_technique_key = technique_key
+        self.remaining_time = math.ceil(total - position)
+        self.is_active = True
+        self.start_time = self.clock.now() - timedelta(seconds=position)
+        self.breathing_table = self.get_breathing_table(technique_key)
+        self.breathing_elapsed = int(position)
+        if self.breathing_table:
+            self.breathing_phase, self.breathing_count, self.current_cycle = self.breathing_table.phase_at(self.breathing_elapsed)
+        else:
+            self.breathing_phase, self.breathing_count, self.current_cycle = 'inhale', 0, 0
+    
     def pause(self):
         """Pausa la meditación"""
         self.is_active = False
@@ -270,6 +350,7 @@ class MeditationTimer:
             self.current_cycle = 0
             self.breathing_phase = 'inhale'
             self.breathing_count = 0
+            self.breathing_elapsed = 0
             self.is_active = True
             print("🔄 Meditación reiniciada")
     
@@ -286,7 +367,7 @@ class MeditationTimer:
         if not self.start_time:
             return {}
         
-        elapsed = datetime.now() - self.start_time
+        elapsed = self.clock.now() - self.start_time
         return {
             'technique': self.current_technique['name'] if self.current_technique else None,
             'elapsed_minutes': int(elapsed.total_seconds() / 60),
@@ -298,9 +379,9 @@ class MeditationTimer:
     def save_session_to_history(self):
         """Guarda la sesión al historial"""
         if self.start_time and self.current_technique:
-            duration = (datetime.now() - self.start_time).total_seconds() / 60
+            duration = (self.clock.now() - self.start_time).total_seconds() / 60
             session_data = {
-                'date': datetime.now().isoformat(),
+                'date': self.clock.now().isoformat(),
                 'technique': self.current_technique['name'],
                 'planned_duration': self.current_technique['duration'],
                 'actual_duration': duration,
@@ -318,7 +399,7 @@ class MeditationTimer:
     
     def get_pre_study_recommendation(self) -> str:
         """Recomienda una técnica basada en el momento del día y objetivos"""
-        now = datetime.now()
+        now = self.clock.now()
         hour = now.hour
         
         if 6 <= hour < 12:  # Mañana
@@ -330,33 +411,8 @@ class MeditationTimer:
     
     def get_daily_streak(self) -> int:
         """Calcula la racha diaria de meditación"""
-        if not self.session_history:
-            return 0
-        
-        # Ordenar sesiones por fecha
-        sorted_sessions = sorted(
-            self.session_history,
-            key=lambda x: datetime.fromisoformat(x['date']),
-            reverse=True
-        )
-        
-        streak = 0
-        current_date = datetime.now().date()
-        
-        for session in sorted_sessions:
-            session_date = datetime.fromisoformat(session['date']).date()
-            
-            if session_date == current_date:
-                if streak == 0:  # Primera sesión del día actual
-                    streak = 1
-                current_date -= timedelta(days=1)
-            elif session_date == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-        
-        return streak
+        # Se mantiene al guardar cada sesión: no hace falta ordenar el historial
+        return self.session_history.current_streak(self.clock.now())
     
     def get_mindfulness_quote(self) -> str:
         """Retorna una cita inspiracional sobre mindfulness"""
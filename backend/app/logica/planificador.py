@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Planificador de Temporizadores
+Aloja muchos StudyTimer y MeditationTimer en un único bucle asyncio
+"""
+
+import asyncio
+import heapq
+import itertools
+from typing import Dict, Any, Optional, Callable
+try:
+    from .estudio import StudyTimer
+    from .meditacion import MeditationTimer
+    from .reloj import SYSTEM_CLOCK
+except ImportError:  # Ejecutado como script desde logica/
+    from estudio import StudyTimer
+    from meditacion import MeditationTimer
+    from reloj import SYSTEM_CLOCK
+
+class TimerScheduler:
+    """
+    Planificador de temporizadores sobre un montículo de vencimientos.
+
+    En lugar de llamar a tick() cada segundo, guarda para cada temporizador
+    el instante (reloj monótono del bucle) en que termina su fase actual y
+    duerme hasta el más próximo. Al vencer, avanza el temporizador con sus
+    propios métodos y llama a los callbacks de cambio de fase. El tiempo
+    restante se calcula al consultarlo.
+    """
+
+    def __init__(self, on_phase_change: Optional[Callable] = None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.timers = {}  # id -> {'timer', 'type', 'deadline', 'turn', 'paused'}
+        self.callbacks = [on_phase_change] if on_phase_change else []
+        self._heap = []
+        self._turns = itertools.count()
+        self._ids = itertools.count(1)
+        self._wakeup = None
+        self._running = False
+
+    # --- Alta y baja de temporizadores ---
+
+    def add_study_timer(self, technique_key: str, timer_id: Any = None) -> Any:
+        """Inicia una técnica de estudio y la planifica"""
+        timer = StudyTimer(clock=self.clock)
+        timer.start_technique(technique_key)
+        return self.add_timer(timer, 'study', timer_id)
+
+    def add_meditation_timer(self, technique_key: str, timer_id: Any = None) -> Any:
+        """Inicia una técnica de meditación y la planifica"""
+        timer = MeditationTimer(clock=self.clock)
+        timer.start_technique(technique_key)
+        return self.add_timer(timer, 'meditation', timer_id)
+
+    def add_timer(self, timer, timer_type: str, timer_id: Any = None) -> Any:
+        """Planifica un temporizador ya iniciado a partir de su tiempo restante"""
+        if timer_type not in ('study', 'meditation'):
+            raise ValueError(f"Tipo de temporizador '{timer_type}' no válido")
+        if timer_id is None:
+            timer_id = next(self._ids)
+        if timer_id in self.timers:
+            raise ValueError(f"Temporizador '{timer_id}' ya existe")
+
+        self.timers[timer_id] = {
+            'timer': timer,
+            'type': timer_type,
+            'deadline': None,
+            'turn': None,
+            'paused': False
+        }
+        self._schedule(timer_id, timer.get_remaining_time())
+        return timer_id
+
+    def remove(self, timer_id: Any):
+        """Detiene un temporizador y lo saca del planificador"""
+        entry = self.timers.pop(timer_id, None)
+        if entry:
+            # La entrada del montículo queda obsoleta y se descarta al salir
+            entry['timer'].stop()
+
+    def on_phase_change(self, callback: Callable):
+        """
+        Registra un callback(timer_id, fase_anterior, fase_nueva, timer). Puede
+        ser una corrutina; en ese caso se lanza como tarea.
+        """
+        self.callbacks.append(callback)
+
+    # --- Control ---
+
+    def pause(self, timer_id: Any):
+        """Pausa un temporizador guardando su tiempo restante"""
+        entry = self.timers[timer_id]
+        if entry['paused']:
+            return
+        entry['timer'].remaining_time = self.get_remaining_time(timer_id)
+        entry['timer'].pause()
+        entry['paused'] = True
+        entry['turn'] = None
+
+    def resume(self, timer_id: Any):
+        """Reanuda un temporizador desde su tiempo restante"""
+        entry = self.timers[timer_id]
+        if not entry['paused']:
+            return
+        entry['timer'].resume()
+        entry['paused'] = False
+        self._schedule(timer_id, entry['timer'].get_remaining_time())
+
+    def get_remaining_time(self, timer_id: Any) -> int:
+        """Tiempo restante de la fase en segundos, calculado desde el vencimiento"""
+        entry = self.timers[timer_id]
+        if entry['paused']:
+            return entry['timer'].get_remaining_time()
+        return max(0, round(entry['deadline'] - self._now()))
+
+    def get_status(self, timer_id: Any) -> Dict[str, Any]:
+        """Estado del temporizador sin avanzar ningún contador"""
+        entry = self.timers[timer_id]
+        timer = entry['timer']
+        return {
+            'type': entry['type'],
+            'technique': timer.current_technique['name'] if timer.current_technique else None,
+            'phase': self._phase(entry),
+            'remaining_seconds': self.get_remaining_time(timer_id),
+            'paused': entry['paused']
+        }
+
+    # --- Bucle ---
+
+    def _now(self) -> float:
+        # Con el reloj del sistema es el mismo reloj monótono que usa asyncio
+        return self.clock.monotonic()
+
+    def _phase(self, entry) -> str:
+        if entry['type'] == 'study':
+            return entry['timer'].get_current_phase()
+        return 'session' if entry['timer'].current_technique else 'completed'
+
+    def _schedule(self, timer_id: Any, seconds: float):
+        entry = self.timers[timer_id]
+        entry['deadline'] = self._now() + seconds
+        entry['turn'] = next(self._turns)
+        heapq.heappush(self._heap, (entry['deadline'], entry['turn'], timer_id))
+        # Despertar el bucle si este vencimiento es ahora el más próximo
+        if self._wakeup and self._heap[0][1] == entry['turn']:
+            self._wakeup.set()
+
+    def _advance(self, timer_id: Any):
+        """Lleva el temporizador al final de su fase y pasa a la siguiente"""
+        entry = self.timers[timer_id]
+        timer = entry['timer']
+        previous = self._phase(entry)
+        timer.remaining_time = 0
+
+        if entry['type'] == 'study' and timer.has_next_phase():
+            timer.next_phase()
+            self._schedule(timer_id, timer.get_remaining_time())
+        else:
+            timer.stop()
+            del self.timers[timer_id]
+
+        current = 'completed' if timer_id not in self.timers else self._phase(entry)
+        for callback in self.callbacks:
+            result = callback(timer_id, previous, current, timer)
+            if asyncio.iscoroutine(result):
+                asyncio.get_running_loop().create_task(result)
+
+    def _next_deadline(self) -> Optional[float]:
+        """Vencimiento más próximo, descartando entradas obsoletas"""
+        # Entradas de temporizadores eliminados, pausados o replanificados
+        while self._heap and self.timers.get(self._heap[0][2], {}).get('turn') != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self) -> int:
+        """
+        Procesa de forma síncrona los vencimientos ya alcanzados. Con un reloj
+        simulado permite avanzar el tiempo y planificar sin bucle asyncio.
+        """
+        processed = 0
+        while True:
+            deadline = self._next_deadline()
+            if deadline is None or deadline > self._now():
+                return processed
+            _, _, timer_id = heapq.heappop(self._heap)
+            self._advance(timer_id)
+            processed += 1
+
+    async def run(self, until_empty: bool = False):
+        """
+        Ejecuta el planificador. Con until_empty=True termina cuando no quedan
+        temporizadores pendientes; si no, sigue hasta stop(). Espera en tiempo
+        real: con un reloj simulado se usa run_pending().
+        """
+        self._wakeup = asyncio.Event()
+        self._running = True
+        try:
+            while self._running:
+                self.run_pending()
+                deadline = self._next_deadline()
+                if deadline is None and until_empty:
+                    break
+                timeout = None if deadline is None else max(0, deadline - self._now())
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._running = False
+            self._wakeup = None
+
+    def stop(self):
+        """Detiene el bucle en la siguiente iteración"""
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
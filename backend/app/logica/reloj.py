@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Relojes para los Temporizadores
+Reloj del sistema y reloj simulado para ejecuciones sin espera real
+"""
+
+import time
+from datetime import datetime, timedelta
+
+class SystemClock:
+    """Reloj real: hora local, reloj monótono y espera bloqueante"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class SimulatedClock:
+    """
+    Reloj simulado: el tiempo solo avanza con sleep() o advance(), sin
+    esperar. Permite reproducir días de sesiones en segundos.
+    """
+
+    def __init__(self, start: datetime = None):
+        self.start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("El reloj simulado no puede retroceder")
+        self.elapsed += seconds
+
+    def advance_to(self, moment: datetime):
+        """Avanza hasta `moment` (no hace nada si ya pasó)"""
+        self.advance(max(0.0, (moment - self.now()).total_seconds()))
+
+# Reloj por defecto compartido por los temporizadores
+SYSTEM_CLOCK = SystemClock()
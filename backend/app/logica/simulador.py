@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Simulador sin Interfaz
+Reproduce días de sesiones con un reloj simulado y mide el coste por tick
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+from typing import Dict, Any
+try:
+    from .base import TimerManager
+    from .linea_tiempo import PhaseTimeline
+    from .reloj import SimulatedClock
+except ImportError:  # Ejecutado como script desde logica/
+    from base import TimerManager
+    from linea_tiempo import PhaseTimeline
+    from reloj import SimulatedClock
+
+class HeadlessRunner:
+    """
+    Ejecuta sesiones completas con TimerManager sobre un SimulatedClock: cada
+    segundo de sesión es un tick sin espera real y los huecos entre sesiones
+    se saltan avanzando el reloj.
+    """
+
+    def __init__(self, seed: int = None):
+        self.clock = SimulatedClock()
+        self.manager = TimerManager(clock=self.clock)
+        self.random = random.Random(seed)
+        self.stats = {
+            'sessions': 0,
+            'ticks': 0,
+            'tick_seconds': 0.0,
+            'phase_transitions': 0,
+            'breathing_transitions': 0
+        }
+
+    def run_session(self, session_type: str, technique_key: str, seconds: int):
+        """Ejecuta una sesión como run_timer_session, sin pantalla ni espera"""
+        manager = self.manager
+        if session_type == 'study':
+            timer = manager.study_timer
+        else:
+            timer = manager.meditation_timer
+        manager.current_session = timer.start_technique(technique_key)
+
+        ticks = 0
+        transitions = 0
+        breathing = 0
+        started = time.perf_counter()
+        while ticks < seconds:
+            if timer.get_remaining_time() <= 0:
+                if not manager.advance_phase(session_type):
+                    break
+                transitions += 1
+                continue
+
+            previous = getattr(timer, 'breathing_phase', None)
+            self.clock.sleep(1)
+            manager.step(session_type)
+            if previous is not None and timer.breathing_phase != previous:
+                breathing += 1
+            ticks += 1
+        self.stats['tick_seconds'] += time.perf_counter() - started
+
+        if session_type == 'study':
+            timer.save_session_to_history()
+            timer.stop()
+        else:
+            timer.stop()
+        manager.complete_session()
+
+        self.stats['sessions'] += 1
+        self.stats['ticks'] += ticks
+        self.stats['phase_transitions'] += transitions
+        self.stats['breathing_transitions'] += breathing
+
+    def run_day(self, sessions: int):
+        """Un día: sesiones de estudio y meditación repartidas desde las 8:00"""
+        day_start = self.clock.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        if day_start < self.clock.now():
+            day_start += timedelta(days=1)
+        self.clock.advance_to(day_start)
+
+        study_keys = list(self.manager.study_timer.get_available_techniques())
+        meditation_keys = list(self.manager.meditation_timer.get_available_techniques())
+
+        for i in range(sessions):
+            if i % 2 == 0:
+                key = self.random.choice(study_keys)
+                technique = self.manager.study_timer.techniques[key]
+                cycles = self.random.randint(1, 4)
+                self.run_session('study', key, PhaseTimeline.from_technique(technique, cycles).total_duration)
+            else:
+                key = self.random.choice(meditation_keys)
+                self.run_session('meditation', key, self.manager.meditation_timer.techniques[key]['duration'] * 60)
+            # Hueco entre sesiones
+            self.clock.advance(self.random.randint(5, 60) * 60)
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        stats = self.stats
+        simulated = self.clock.monotonic()
+        return {
+            'sessions': stats['sessions'],
+            'simulated_hours': round(simulated / 3600, 1),
+            'wall_seconds': round(wall_seconds, 3),
+            'speedup': round(simulated / wall_seconds) if wall_seconds else None,
+            'ticks': stats['ticks'],
+            'tick_cost_us': round(stats['tick_seconds'] / stats['ticks'] * 1e6, 3) if stats['ticks'] else 0,
+            'phase_transitions': stats['phase_transitions'],
+            'breathing_transitions': stats['breathing_transitions']
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulación acelerada de sesiones de temporizador')
+    parser.add_argument('--dias', type=int, default=1, help='Días simulados')
+    parser.add_argument('--sesiones', type=int, default=8, help='Sesiones por día')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla para reproducir la simulación')
+    parser.add_argument('--sin-memoria', action='store_true', help='No medir asignaciones (tracemalloc ralentiza)')
+    parser.add_argument('--top', type=int, default=5, help='Líneas con más memoria asignada a mostrar')
+    args = parser.parse_args()
+
+    if args.dias < 1 or args.sesiones < 1:
+        parser.error('Los valores deben ser mayores que 0')
+
+    runner = HeadlessRunner(args.semilla)
+    if not args.sin_memoria:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(args.dias):
+            runner.run_day(args.sesiones)
+    wall = time.perf_counter() - started
+
+    report = runner.report(wall)
+    print("📊 SIMULACIÓN")
+    print("-"*40)
+    print(f"✅ Sesiones: {report['sessions']} ({report['simulated_hours']}h simuladas)")
+    print(f"🕒 Tiempo real: {report['wall_seconds']}s (x{report['speedup']})")
+    print(f"⏱️  Ticks: {report['ticks']} ({report['tick_cost_us']}µs por tick)")
+    print(f"🔄 Cambios de fase: {report['phase_transitions']}")
+    print(f"🫁 Cambios de fase de respiración: {report['breathing_transitions']}")
+
+    if not args.sin_memoria:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"💾 Memoria: {current / 1024:.1f} KiB actual, {peak / 1024:.1f} KiB pico")
+        for stat in snapshot.statistics('lineno')[:args.top]:
+            print(f"   {stat}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import sys
+import os
+import argparse
+import time
+
+# Asegurarse de que el directorio backend esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db, SesionEstado, SesionTecnicaParam
+
+def _booleano(valor):
+    return valor.strip().lower() in ('true', '1', 'si', 'sí')
+
+# Parámetro clave/valor antiguo -> (columna de SesionEstado, conversión)
+CAMPOS_POMODORO = {
+    'duracion_trabajo': ('duracion_trabajo', int),
+    'duracion_descanso': ('duracion_descanso', int),
+    'ciclos_objetivo': ('ciclos_objetivo', int),
+    'ciclos_completados': ('ciclos_completados', int),
+    'fase_actual': ('fase_actual', str),
+    'tiempo_inicio_fase': (None, None),  # La fase se deriva del inicio de la sesión
+    'modo_no_distraccion': ('modo_no_distraccion', _booleano)
+}
+CAMPOS_MEDITACION = {
+    'duracion_planificada': ('duracion_planificada', int),
+    'tipo_meditacion': ('tipo_meditacion', str),
+    'calificacion': ('calificacion', int),
+    'tiempo_inicio': (None, None)  # Coincide con Sesion.fecha_inicio
+}
+CLAVES = set(CAMPOS_POMODORO) | set(CAMPOS_MEDITACION)
+
+def convertir(id_sesion, parametros):
+    """Construye el estado tipado a partir de los parámetros de una sesión"""
+    es_pomodoro = any(clave in CAMPOS_POMODORO for clave in parametros)
+    campos = CAMPOS_POMODORO if es_pomodoro else CAMPOS_MEDITACION
+    estado = SesionEstado(
+        id_sesion=id_sesion,
+        tecnica='pomodoro' if es_pomodoro else 'meditacion',
+        ciclos_completados=0,
+        modo_no_distraccion=False
+    )
+    if es_pomodoro:
+        # Mismos valores por defecto que usaba el servicio al leer los parámetros
+        estado.duracion_trabajo = 25
+        estado.duracion_descanso = 5
+        estado.ciclos_objetivo = 4
+        estado.fase_actual = 'trabajo'
+    for clave, valor in parametros.items():
+        columna, conversion = campos.get(clave, (None, None))
+        if columna is None:
+            continue
+        try:
+            setattr(estado, columna, conversion(valor))
+        except ValueError:
+            print(f"⚠️  Sesión {id_sesion}: valor inválido para {clave} ({valor!r}), se omite")
+    return estado
+
+def migrar_estado_sesiones(tamano_lote, conservar):
+    # Cada lote de sesiones se migra y confirma por separado; las sesiones que
+    # ya tienen estado se saltan, así que el script se puede relanzar
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        inicio = time.perf_counter()
+        total = 0
+
+        while True:
+            sin_estado = ~db.exists().where(SesionEstado.id_sesion == SesionTecnicaParam.id_sesion)
+            ids = [fila[0] for fila in db.session.query(SesionTecnicaParam.id_sesion).filter(
+                SesionTecnicaParam.parametro.in_(CLAVES),
+                sin_estado
+            ).distinct().limit(tamano_lote).all()]
+            if not ids:
+                break
+
+            parametros = {}
+            for id_sesion, parametro, valor in db.session.query(
+                SesionTecnicaParam.id_sesion,
+                SesionTecnicaParam.parametro,
+                SesionTecnicaParam.valor
+            ).filter(
+                SesionTecnicaParam.id_sesion.in_(ids),
+                SesionTecnicaParam.parametro.in_(CLAVES)
+            ):
+                parametros.setdefault(id_sesion, {})[parametro] = valor
+
+            db.session.add_all(convertir(id_sesion, valores) for id_sesion, valores in parametros.items())
+            if not conservar:
+                SesionTecnicaParam.query.filter(
+                    SesionTecnicaParam.id_sesion.in_(ids),
+                    SesionTecnicaParam.parametro.in_(CLAVES)
+                ).delete(synchronize_session=False)
+            db.session.commit()
+
+            total += len(ids)
+            print(f"✓ {total} sesiones migradas")
+
+        print(f"🎉 Migración completada: {total} sesiones en {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migra el estado de Pomodoro y meditación de SesionTecnicaParam a SesionEstado')
+    parser.add_argument('--tamano-lote', type=int, default=500, help='Sesiones migradas por transacción')
+    parser.add_argument('--conservar', action='store_true', help='No borrar los parámetros antiguos tras migrarlos')
+    args = parser.parse_args()
+
+    if args.tamano_lote < 1:
+        parser.error('--tamano-lote debe ser mayor que 0')
+
+    migrar_estado_sesiones(args.tamano_lote, args.conservar)
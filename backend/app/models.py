@@ -35,6 +35,7 @@ class Usuario(db.Model):
     ultimo_acceso = db.Column(db.DateTime(6), nullable=True)
     rol_id = db.Column(db.Integer, db.ForeignKey('rol.id'), nullable=False)
     activo = db.Column(db.Boolean, default=True, nullable=False)
+    zona_horaria = db.Column(db.String(50), default='UTC', server_default='UTC', nullable=False)  # IANA, p. ej. 'America/Bogota'
 
     tareas = db.relationship('Tarea', backref='usuario_tarea', lazy=True)
     sesiones = db.relationship('Sesion', backref='usuario_sesion', lazy=True)
@@ -50,7 +51,8 @@ class Usuario(db.Model):
             'fecha_registro': self.fecha_registro.isoformat() if self.fecha_registro else None,
             'ultimo_acceso': self.ultimo_acceso.isoformat() if self.ultimo_acceso else None,
             'rol_id': self.rol_id,
-            'activo': self.activo
+            'activo': self.activo,
+            'zona_horaria': self.zona_horaria
         }
 
 class UsuarioSala(db.Model):
@@ -106,6 +108,16 @@ class Sala(db.Model):
 # Modelo Tarea
 class Tarea(db.Model):
     __tablename__ = 'tarea'
+    __table_args__ = (
+        db.Index('ix_tarea_usuario_dia_estado', 'usuario_id', 'dia', 'estado'),
+        db.Index('ix_tarea_usuario_creacion', 'usuario_id', 'fecha_creacion', 'id_tarea'),  # Paginación por clave
+        db.Index('ix_tarea_sala_creacion', 'sala_id', 'fecha_creacion', 'id_tarea'),  # Tablero de la sala
+        db.Index('ix_tarea_usuario_estado_prioridad', 'usuario_id', 'estado', 'prioridad', 'fecha_vencimiento'),  # Estadísticas (índice cubriente)
+        db.Index('ix_tarea_usuario_anticipacion', 'usuario_id', 'dias_anticipados'),  # Completadas a tiempo / anticipadas
+        db.Index('ix_tarea_usuario_completada', 'usuario_id', 'fecha_completada'),
+        # Búsqueda de texto completo (MariaDB/MySQL); en SQLite la cubre la tabla FTS5 tarea_fts
+        db.Index('ft_tarea_texto', 'titulo', 'descripcion', 'comentario', mysql_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb')),
+    )
 
     id_tarea = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), nullable=False)
@@ -118,6 +130,9 @@ class Tarea(db.Model):
     fecha_vencimiento = db.Column(db.Date, nullable=True)
     prioridad = db.Column(db.String(20), default='baja', nullable=False)
     comentario = db.Column(db.Text, nullable=True)
+    dia = db.Column(db.Date, nullable=True)  # Día local de creación según la zona horaria del usuario
+    fecha_completada = db.Column(db.Date, nullable=True)  # Día local en que pasó a 'Completado'
+    dias_anticipados = db.Column(db.Integer, nullable=True)  # Vencimiento - fecha_completada (negativo si se completó tarde)
 
     sala = db.relationship('Sala', backref='tareas', lazy=True)
 
@@ -133,7 +148,9 @@ class Tarea(db.Model):
             'fecha_vencimiento': self.fecha_vencimiento.isoformat() if self.fecha_vencimiento else None,
             'prioridad': self.prioridad,
             'comentario': self.comentario,
-            'sala_id': self.sala_id
+            'sala_id': self.sala_id,
+            'fecha_completada': self.fecha_completada.isoformat() if self.fecha_completada else None,
+            'dias_anticipados': self.dias_anticipados
         }
 
 # Modelo Tecnica
@@ -161,6 +178,11 @@ class Tecnica(db.Model):
 # Modelo Sesion
 class Sesion(db.Model):
     __tablename__ = 'sesion'
+    __table_args__ = (
+        db.Index('ix_sesion_usuario_dia_estado', 'usuario_id', 'dia', 'estado'),
+        db.Index('ix_sesion_usuario_inicio', 'usuario_id', 'fecha_inicio', 'id_sesion'),  # Paginación por clave
+        db.Index('ix_sesion_estado_latido', 'estado', 'ultimo_latido'),  # Cierre de sesiones inactivas
+    )
 
     id_sesion = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), nullable=False)
@@ -171,7 +193,18 @@ class Sesion(db.Model):
     duracion_real = db.Column(db.Integer, nullable=False)  
     estado = db.Column(db.String(20), nullable=False) 
     es_grupal = db.Column(db.Boolean, default=False)
+    dia = db.Column(db.Date, nullable=True)  # Día local de inicio según la zona horaria del usuario
+    ultimo_latido = db.Column(db.DateTime(6), default=datetime.utcnow, nullable=True)  # Última señal del cliente
+
+    parametros = db.relationship('SesionTecnicaParam', backref='sesion', lazy=True)
+    estado_tecnica = db.relationship(
+        'SesionEstado', backref='sesion', uselist=False, lazy=True, cascade='all, delete-orphan'
+    )
 
+    def registrar_latido(self, ahora):
+        """Marca la sesión como viva si sigue en ejecución (sin confirmar)"""
+        if self.estado == 'EnEjecucion':
+            self.ultimo_latido = ahora
 
     def to_dict(self):
         return {
@@ -183,7 +216,8 @@ class Sesion(db.Model):
             'completada': self.completada,
             'duracion_real': self.duracion_real,
             'estado': self.estado,
-            'es_grupal': self.es_grupal
+            'es_grupal': self.es_grupal,
+            'ultimo_latido': self.ultimo_latido.isoformat() if self.ultimo_latido else None
         }
 
 # Modelo SalaSesion
@@ -216,6 +250,78 @@ class SesionTecnicaParam(db.Model):
             'valor': self.valor
         }
 
+# Modelo SesionEstado (estado tipado del temporizador, una fila por sesión)
+class SesionEstado(db.Model):
+    __tablename__ = 'sesion_estado'
+
+    id_sesion = db.Column(db.String(36), db.ForeignKey('sesion.id_sesion'), primary_key=True)
+    tecnica = db.Column(db.String(20), nullable=False)  # 'pomodoro' | 'meditacion' | 'estudio'
+
+    # Pomodoro: la fase en curso se deriva del inicio de la sesión, la
+    # configuración y las pausas; ciclos_completados y fase_actual solo se
+    # fijan al pausar o finalizar
+    duracion_trabajo = db.Column(db.Integer, nullable=True)  # minutos
+    duracion_descanso = db.Column(db.Integer, nullable=True)  # minutos
+    ciclos_objetivo = db.Column(db.Integer, nullable=True)
+    ciclos_completados = db.Column(db.Integer, default=0, nullable=False)
+    fase_actual = db.Column(db.String(20), nullable=True)  # 'trabajo' | 'descanso' | 'completado'
+    modo_no_distraccion = db.Column(db.Boolean, default=False, nullable=False)
+    pausas = db.Column(db.JSON, nullable=True)  # [[inicio, fin], ...] en ISO 8601 (UTC)
+    pausado_desde = db.Column(db.DateTime(6), nullable=True)
+
+    # Meditación
+    duracion_planificada = db.Column(db.Integer, nullable=True)  # minutos
+    tipo_meditacion = db.Column(db.String(30), nullable=True)
+    calificacion = db.Column(db.SmallInteger, nullable=True)  # 1-5
+
+    # Temporizadores del motor de logica/: la posición en el calendario de la
+    # técnica es el tiempo activo (sin pausas) más el desfase por fases saltadas
+    tecnica_clave = db.Column(db.String(50), nullable=True)  # clave en StudyTimer/MeditationTimer.techniques
+    duracion_descanso_largo = db.Column(db.Integer, nullable=True)  # minutos
+    ciclos_descanso_largo = db.Column(db.Integer, nullable=True)
+    desfase = db.Column(db.Integer, default=0, nullable=False)  # segundos
+
+    # --- Intervalos de pausa (compartidos por todas las técnicas) ---
+
+    def segundos_pausados(self, ahora):
+        """Tiempo total en pausa hasta `ahora`, incluida la pausa en curso"""
+        total = sum(
+            (datetime.fromisoformat(fin) - datetime.fromisoformat(inicio)).total_seconds()
+            for inicio, fin in (self.pausas or [])
+        )
+        if self.pausado_desde:
+            total += (ahora - self.pausado_desde).total_seconds()
+        return total
+
+    def cerrar_pausa(self, ahora):
+        """Cierra la pausa en curso (si la hay) como intervalo [pausado_desde, ahora]"""
+        if not self.pausado_desde:
+            return
+        # Se reasigna la lista para que el cambio en la columna JSON se detecte
+        self.pausas = (self.pausas or []) + [[self.pausado_desde.isoformat(), ahora.isoformat()]]
+        self.pausado_desde = None
+
+    def to_dict(self):
+        return {
+            'id_sesion': self.id_sesion,
+            'tecnica': self.tecnica,
+            'duracion_trabajo': self.duracion_trabajo,
+            'duracion_descanso': self.duracion_descanso,
+            'ciclos_objetivo': self.ciclos_objetivo,
+            'ciclos_completados': self.ciclos_completados,
+            'fase_actual': self.fase_actual,
+            'modo_no_distraccion': self.modo_no_distraccion,
+            'pausas': self.pausas or [],
+            'pausado_desde': self.pausado_desde.isoformat() if self.pausado_desde else None,
+            'duracion_planificada': self.duracion_planificada,
+            'tipo_meditacion': self.tipo_meditacion,
+            'calificacion': self.calificacion,
+            'tecnica_clave': self.tecnica_clave,
+            'duracion_descanso_largo': self.duracion_descanso_largo,
+            'ciclos_descanso_largo': self.ciclos_descanso_largo,
+            'desfase': self.desfase
+        }
+
 # Modelo Recompensa
 class Recompensa(db.Model):
     __tablename__ = 'recompensa'
@@ -262,6 +368,10 @@ class RecompensaUsuario(db.Model):
 # Modelo Progreso
 class Progreso(db.Model):
     __tablename__ = 'progreso'
+    __table_args__ = (
+        # Una fila por usuario y día: destino de los incrementos atómicos
+        db.UniqueConstraint('usuario_id', 'fecha', name='uq_progreso_usuario_fecha'),
+    )
 
     id_progreso = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), nullable=False)
@@ -282,4 +392,115 @@ class Progreso(db.Model):
             'puntos_acumulados': self.puntos_acumulados,
             'minutos_estudio': self.minutos_estudio,  # Asegúrate de que también esté en el diccionario
             'sesiones_realizadas': self.sesiones_realizadas  # Este también
-        }
\ No newline at end of file
+        }
+
+# Modelo ProgresoSemana (agregado semanal mantenido junto a Progreso)
+class ProgresoSemana(db.Model):
+    __tablename__ = 'progreso_semana'
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'inicio_semana', name='uq_progreso_semana_usuario_inicio'),
+    )
+
+    id_progreso_semana = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), nullable=False)
+    inicio_semana = db.Column(db.Date, nullable=False)  # Lunes
+    minutos_estudio = db.Column(db.Integer, default=0, nullable=False)
+    tareas_completadas = db.Column(db.Integer, default=0, nullable=False)
+    sesiones_realizadas = db.Column(db.Integer, default=0, nullable=False)
+    # Vector por día: [[minutos, tareas, sesiones], ...] de lunes a domingo
+    dias = db.Column(db.JSON, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id_progreso_semana': self.id_progreso_semana,
+            'usuario_id': self.usuario_id,
+            'inicio_semana': self.inicio_semana.isoformat(),
+            'minutos_estudio': self.minutos_estudio,
+            'tareas_completadas': self.tareas_completadas,
+            'sesiones_realizadas': self.sesiones_realizadas,
+            'dias': self.dias
+        }
+
+# Modelo ProgresoMes (agregado mensual mantenido junto a Progreso)
+class ProgresoMes(db.Model):
+    __tablename__ = 'progreso_mes'
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'anio', 'mes', name='uq_progreso_mes_usuario_anio_mes'),
+    )
+
+    id_progreso_mes = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), nullable=False)
+    anio = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    minutos_estudio = db.Column(db.Integer, default=0, nullable=False)
+    tareas_completadas = db.Column(db.Integer, default=0, nullable=False)
+    sesiones_realizadas = db.Column(db.Integer, default=0, nullable=False)
+    dias_activos = db.Column(db.Integer, default=0, nullable=False)
+    racha_dias = db.Column(db.Integer, default=0, nullable=False)  # Racha más larga dentro del mes
+    # Vector por día del mes: [[minutos, tareas, sesiones], ...]
+    dias = db.Column(db.JSON, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id_progreso_mes': self.id_progreso_mes,
+            'usuario_id': self.usuario_id,
+            'anio': self.anio,
+            'mes': self.mes,
+            'minutos_estudio': self.minutos_estudio,
+            'tareas_completadas': self.tareas_completadas,
+            'sesiones_realizadas': self.sesiones_realizadas,
+            'dias_activos': self.dias_activos,
+            'racha_dias': self.racha_dias,
+            'dias': self.dias
+        }
+
+# Modelo RachaUsuario (índice persistente de rachas de días con actividad)
+class RachaUsuario(db.Model):
+    __tablename__ = 'racha_usuario'
+
+    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), primary_key=True)
+    racha_actual = db.Column(db.Integer, default=0, nullable=False)  # Racha que termina en ultima_fecha_activa
+    mejor_racha = db.Column(db.Integer, default=0, nullable=False)
+    ultima_fecha_activa = db.Column(db.Date, nullable=True)
+
+    def racha_vigente(self, hoy):
+        """La racha solo cuenta si hoy ya hubo actividad"""
+        return self.racha_actual if self.ultima_fecha_activa == hoy else 0
+
+    def to_dict(self):
+        return {
+            'usuario_id': self.usuario_id,
+            'racha_actual': self.racha_actual,
+            'mejor_racha': self.mejor_racha,
+            'ultima_fecha_activa': self.ultima_fecha_activa.isoformat() if self.ultima_fecha_activa else None
+        }
+
+# Modelo SesionActiva (sesión en ejecución de cada usuario; la clave primaria impide tener dos)
+class SesionActiva(db.Model):
+    __tablename__ = 'sesion_activa'
+
+    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), primary_key=True)
+    id_sesion = db.Column(db.String(36), db.ForeignKey('sesion.id_sesion'), unique=True, nullable=False)
+    desde = db.Column(db.DateTime(6), default=datetime.utcnow, nullable=False)
+
+    sesion = db.relationship('Sesion', lazy=True)
+
+    def to_dict(self):
+        return {
+            'usuario_id': self.usuario_id,
+            'id_sesion': self.id_sesion,
+            'desde': self.desde.isoformat()
+        }
+
+# Modelo ActividadAnual (mapa de calor compacto por usuario y año)
+class ActividadAnual(db.Model):
+    __tablename__ = 'actividad_anual'
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'anio', name='uq_actividad_anual_usuario_anio'),
+    )
+
+    id_actividad = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id_usuario'), nullable=False)
+    anio = db.Column(db.Integer, nullable=False)
+    minutos = db.Column(db.LargeBinary(732), nullable=True)    # uint16 little-endian por día del año (366)
+    actividad = db.Column(db.LargeBinary(46), nullable=True)   # bitset de días con actividad (bit 0 = 1 de enero)
@@ -0,0 +1,78 @@
+import sys
+import os
+import argparse
+import time
+from datetime import datetime, date, timedelta
+
+# Asegurarse de que el directorio backend esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db
+from app.services.progreso_service import ProgresoService
+from app.services.racha_service import RachaService
+
+def parsear_fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Fecha inválida '{valor}' (YYYY-MM-DD)")
+
+def recalcular_progreso(desde, hasta, dias_por_lote, reconstruir_rachas=True):
+    # Cada lote se confirma por separado: si el proceso se interrumpe basta
+    # con relanzarlo con --desde igual al primer día del lote que falló
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        # Sesiones y tareas anteriores a la columna `dia` se asignan primero a su día local
+        pendientes = ProgresoService.rellenar_dias_pendientes()
+        if pendientes:
+            print(f"✓ Día local calculado para {pendientes} sesiones y tareas")
+
+        total_dias = (hasta - desde).days + 1
+        total_filas = 0
+        inicio_total = time.perf_counter()
+
+        lote_desde = desde
+        while lote_desde <= hasta:
+            lote_hasta = min(lote_desde + timedelta(days=dias_por_lote - 1), hasta)
+            inicio_lote = time.perf_counter()
+            try:
+                filas = ProgresoService.recalcular_periodo(lote_desde, lote_hasta)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                print(f"❌ Error en el lote {lote_desde} - {lote_hasta}. "
+                      f"Reanudar con: --desde {lote_desde.isoformat()} --hasta {hasta.isoformat()}")
+                raise
+
+            duracion = time.perf_counter() - inicio_lote
+            total_filas += filas
+            procesados = (lote_hasta - desde).days + 1
+            print(f"✓ {lote_desde} - {lote_hasta}: {filas} filas en {duracion:.2f}s "
+                  f"({filas / duracion if duracion > 0 else 0:.0f} filas/s) "
+                  f"[{procesados}/{total_dias} días, {procesados * 100 // total_dias}%]")
+            lote_desde = lote_hasta + timedelta(days=1)
+
+        if reconstruir_rachas:
+            usuarios = RachaService.reconstruir()
+            db.session.commit()
+            print(f"✓ Rachas reconstruidas para {usuarios} usuarios")
+
+        duracion_total = time.perf_counter() - inicio_total
+        print(f"🎉 Progreso recalculado: {total_filas} filas en {duracion_total:.2f}s "
+              f"({total_filas / duracion_total if duracion_total > 0 else 0:.0f} filas/s)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recalcula el progreso diario de todos los usuarios en un rango de fechas')
+    parser.add_argument('--desde', type=parsear_fecha, required=True, help='Primer día (YYYY-MM-DD)')
+    parser.add_argument('--hasta', type=parsear_fecha, default=date.today(), help='Último día (YYYY-MM-DD), por defecto hoy')
+    parser.add_argument('--dias-por-lote', type=int, default=31, help='Días que se recalculan por transacción')
+    parser.add_argument('--sin-rachas', action='store_true', help='No reconstruir el índice de rachas al terminar')
+    args = parser.parse_args()
+
+    if args.hasta < args.desde:
+        parser.error('--hasta debe ser posterior a --desde')
+    if args.dias_por_lote < 1:
+        parser.error('--dias-por-lote debe ser mayor que 0')
+
+    recalcular_progreso(args.desde, args.hasta, args.dias_por_lote, not args.sin_rachas)
@@ -0,0 +1,26 @@
+import sys
+import os
+import argparse
+import time
+
+# Asegurarse de que el directorio backend esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db
+from app.services.racha_service import RachaService
+
+def reconstruir_rachas(usuario_id=None):
+    # Recalcula el índice de rachas en una sola pasada sobre el progreso diario
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        inicio = time.perf_counter()
+        total = RachaService.reconstruir(usuario_id)
+        db.session.commit()
+        print(f"Rachas reconstruidas para {total} usuarios en {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reconstruye el índice de rachas de días con actividad')
+    parser.add_argument('--usuario', help='Reconstruir solo este usuario (id_usuario)')
+    args = parser.parse_args()
+    reconstruir_rachas(args.usuario)
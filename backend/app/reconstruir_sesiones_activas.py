@@ -0,0 +1,22 @@
+import sys
+import os
+import time
+
+# Asegurarse de que el directorio backend esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db
+from app.services.sesion_activa_service import SesionActivaService
+
+def reconstruir_sesiones_activas():
+    # Regenera el registro de sesiones en ejecución (una por usuario)
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        inicio = time.perf_counter()
+        total = SesionActivaService.reconstruir()
+        db.session.commit()
+        print(f"Registro de sesiones activas reconstruido: {total} usuarios en {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == '__main__':
+    reconstruir_sesiones_activas()
@@ -0,0 +1,28 @@
+import argparse
+import sys
+import os
+import time
+
+# Asegurarse de que el directorio backend esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.services.todo_service import TodoService
+
+def rellenar_finalizacion_tareas(tamano_lote):
+    # Traslada la anticipación guardada en el comentario a las columnas tipadas
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        inicio = time.perf_counter()
+        total = TodoService.rellenar_finalizacion_tareas(tamano_lote)
+        print(f"✓ Fecha de finalización rellenada en {total} tareas en {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rellena fecha_completada y dias_anticipados de tareas ya completadas')
+    parser.add_argument('--tamano-lote', type=int, default=1000, help='Tareas revisadas por transacción')
+    args = parser.parse_args()
+
+    if args.tamano_lote < 1:
+        parser.error('--tamano-lote debe ser mayor que 0')
+
+    rellenar_finalizacion_tareas(args.tamano_lote)
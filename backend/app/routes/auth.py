@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db, Usuario, Rol
+from app.utils.fechas import zona_valida
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -28,12 +29,18 @@ def register():
         if not rol_usuario:
             return jsonify({'error': 'Rol de usuario no encontrado'}), 500
 
+        # Zona horaria opcional (IANA), usada para agrupar la actividad por día local
+        zona_horaria = data.get('zona_horaria') or 'UTC'
+        if not zona_valida(zona_horaria):
+            return jsonify({'error': 'Zona horaria no válida'}), 400
+
         # Crear nuevo usuario
         nuevo_usuario = Usuario(
             Username=data['Username'],
             correo=data['correo'],
             password=generate_password_hash(data['password']),
-            rol_id=rol_usuario.id
+            rol_id=rol_usuario.id,
+            zona_horaria=zona_horaria
         )
 
         db.session.add(nuevo_usuario)
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import db, Progreso, Sesion, Tarea
+from app.models import db, Progreso, Usuario
+from app.services.progreso_service import ProgresoService
+from app.services.estadisticas_service import EstadisticasService
+from app.services.mapa_actividad_service import MapaActividadService
+from app.utils.fechas import hoy_usuario, dia_local, zona_usuario
+from app.utils.upsert import upsert
+from app.utils.paginacion import Pagina, campos_solicitados, cargar_solo, serializar
 from datetime import datetime, date, timedelta
-from sqlalchemy import func
 
 progreso_bp = Blueprint('progreso', __name__)
 
@@ -32,9 +37,16 @@ def get_progreso():
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_fin inválido (YYYY-MM-DD)'}), 400
         
-        progreso = query.order_by(Progreso.fecha.desc()).all()
+        try:
+            pagina = Pagina.desde_peticion(request.args, Progreso.fecha, Progreso.id_progreso)
+            campos = campos_solicitados(request.args, Progreso)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify([p.to_dict() for p in progreso]), 200
+        query = cargar_solo(query, Progreso, campos, pagina)
+        progreso = pagina.recortar(pagina.aplicar(query).all())
+        
+        return jsonify([serializar(p, campos) for p in progreso]), 200, pagina.cabeceras()
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -44,7 +56,7 @@ def get_progreso():
 def get_progreso_hoy():
     try:
         usuario_id = get_jwt_identity()
-        hoy = date.today()
+        hoy = hoy_usuario(usuario_id)
         
         progreso_hoy = Progreso.query.filter_by(
             usuario_id=usuario_id,
@@ -52,16 +64,24 @@ def get_progreso_hoy():
         ).first()
         
         if not progreso_hoy:
-            # Crear registro de progreso para hoy si no existe
-            progreso_hoy = Progreso(
-                usuario_id=usuario_id,
-                fecha=hoy,
-                minutos_estudio=0,
-                tareas_completadas=0,
-                sesiones_realizadas=0
-            )
-            db.session.add(progreso_hoy)
+            # Crear registro de progreso para hoy si no existe (atómico frente a
+            # otra petición o a un evento de progreso simultáneos)
+            db.session.execute(upsert(
+                Progreso,
+                {
+                    'usuario_id': usuario_id,
+                    'fecha': hoy,
+                    'minutos_estudio': 0,
+                    'tareas_completadas': 0,
+                    'sesiones_realizadas': 0
+                },
+                claves=('usuario_id', 'fecha')
+            ))
             db.session.commit()
+            progreso_hoy = Progreso.query.filter_by(
+                usuario_id=usuario_id,
+                fecha=hoy
+            ).one()
         
         return jsonify(progreso_hoy.to_dict()), 200
         
@@ -70,51 +90,13 @@ def get_progreso_hoy():
 @progreso_bp.route('/actualizar', methods=['POST'])
 @jwt_required()
 def actualizar_progreso():
+    # El progreso se mantiene con cada evento de sesiones y tareas; este
+    # endpoint solo reconcilia el día por si algún cambio quedó fuera
     try:
         usuario_id = get_jwt_identity()
-        hoy = date.today()
-        
-        # Calcular estadísticas del día actual
-        minutos_estudio = db.session.query(
-            func.sum(Sesion.duracion_real)
-        ).filter(
-            Sesion.usuario_id == usuario_id,
-            func.date(Sesion.fecha_inicio) == hoy,  # Cambié 'inicio' por 'fecha_inicio'
-            Sesion.estado == 'Completado'
-        ).scalar() or 0
-        
-        tareas_completadas = Tarea.query.filter(
-            Tarea.usuario_id == usuario_id,
-            func.date(Tarea.fecha_creacion) == hoy,
-            Tarea.estado == 'Completado'
-        ).count()
-        
-        sesiones_realizadas = Sesion.query.filter(
-            Sesion.usuario_id == usuario_id,
-            func.date(Sesion.fecha_inicio) == hoy,  # Cambié 'inicio' por 'fecha_inicio'
-            Sesion.estado == 'Completado'
-        ).count()
-        
-        # Buscar o crear registro de progreso
-        progreso = Progreso.query.filter_by(
-            usuario_id=usuario_id,
-            fecha=hoy
-        ).first()
-        
-        if progreso:
-            progreso.minutos_estudio = minutos_estudio
-            progreso.tareas_completadas = tareas_completadas
-            progreso.sesiones_realizadas = sesiones_realizadas
-        else:
-            progreso = Progreso(
-                usuario_id=usuario_id,
-                fecha=hoy,
-                minutos_estudio=minutos_estudio,
-                tareas_completadas=tareas_completadas,
-                sesiones_realizadas=sesiones_realizadas
-            )
-            db.session.add(progreso)
+        hoy = hoy_usuario(usuario_id)
         
+        progreso = ProgresoService.reconciliar_dia(usuario_id, hoy)
         db.session.commit()
         
         return jsonify({
@@ -132,49 +114,32 @@ def actualizar_progreso():
 def get_progreso_semana():
     try:
         usuario_id = get_jwt_identity()
-        hoy = date.today()
-        inicio_semana = hoy - timedelta(days=hoy.weekday())  # Lunes
-        fin_semana = inicio_semana + timedelta(days=6)  # Domingo
-        
-        # Obtener progreso de la semana
-        progreso_semana = Progreso.query.filter(
-            Progreso.usuario_id == usuario_id,
-            Progreso.fecha >= inicio_semana,
-            Progreso.fecha <= fin_semana
-        ).order_by(Progreso.fecha).all()
-        
-        # Crear estructura completa de la semana (7 días)
-        dias_semana = []
-        for i in range(7):
-            fecha_dia = inicio_semana + timedelta(days=i)
-            progreso_dia = next((p for p in progreso_semana if p.fecha == fecha_dia), None)
-            
-            if progreso_dia:
-                dias_semana.append(progreso_dia.to_dict())
-            else:
-                dias_semana.append({
-                    'progreso_id': None,
-                    'usuario_id': usuario_id,
-                    'fecha': fecha_dia.isoformat(),
-                    'minutos_estudio': 0,
-                    'tareas_completadas': 0,
-                    'sesiones_realizadas': 0
-                })
-        
-        # Calcular totales de la semana
-        total_minutos = sum(dia['minutos_estudio'] for dia in dias_semana)
-        total_tareas = sum(dia['tareas_completadas'] for dia in dias_semana)
-        total_sesiones = sum(dia['sesiones_realizadas'] for dia in dias_semana)
+        hoy = hoy_usuario(usuario_id)
+        inicio_semana, fin_semana = ProgresoService.limites_semana(hoy)
+        
+        # Un único registro agregado con el vector de los 7 días
+        semana = ProgresoService.obtener_semana(usuario_id, inicio_semana)
+        
+        dias_semana = [
+            {
+                'usuario_id': usuario_id,
+                'fecha': (inicio_semana + timedelta(days=i)).isoformat(),
+                'minutos_estudio': minutos,
+                'tareas_completadas': tareas,
+                'sesiones_realizadas': sesiones
+            }
+            for i, (minutos, tareas, sesiones) in enumerate(semana.dias)
+        ]
         
         return jsonify({
             'inicio_semana': inicio_semana.isoformat(),
             'fin_semana': fin_semana.isoformat(),
             'dias': dias_semana,
             'totales': {
-                'minutos_estudio': total_minutos,
-                'horas_estudio': round(total_minutos / 60, 2),
-                'tareas_completadas': total_tareas,
-                'sesiones_realizadas': total_sesiones
+                'minutos_estudio': semana.minutos_estudio,
+                'horas_estudio': round(semana.minutos_estudio / 60, 2),
+                'tareas_completadas': semana.tareas_completadas,
+                'sesiones_realizadas': semana.sesiones_realizadas
             }
         }), 200
         
@@ -187,32 +152,32 @@ def get_progreso_mes():
     try:
         usuario_id = get_jwt_identity()
         
-        # Obtener año y mes (por defecto el actual)
-        año = int(request.args.get('año', datetime.now().year))
-        mes = int(request.args.get('mes', datetime.now().month))
+        # Obtener año y mes (por defecto el actual en la zona del usuario)
+        hoy = hoy_usuario(usuario_id)
+        año = int(request.args.get('año', hoy.year))
+        mes = int(request.args.get('mes', hoy.month))
         
         # Primer y último día del mes
-        primer_dia = date(año, mes, 1)
-        if mes == 12:
-            ultimo_dia = date(año + 1, 1, 1) - timedelta(days=1)
-        else:
-            ultimo_dia = date(año, mes + 1, 1) - timedelta(days=1)
-        
-        # Obtener progreso del mes
-        progreso_mes = Progreso.query.filter(
-            Progreso.usuario_id == usuario_id,
-            Progreso.fecha >= primer_dia,
-            Progreso.fecha <= ultimo_dia
-        ).order_by(Progreso.fecha).all()
-        
-        # Calcular estadísticas del mes
-        total_minutos = sum(p.minutos_estudio for p in progreso_mes)
-        total_tareas = sum(p.tareas_completadas for p in progreso_mes)
-        total_sesiones = sum(p.sesiones_realizadas for p in progreso_mes)
-        dias_activos = len([p for p in progreso_mes if p.minutos_estudio > 0 or p.sesiones_realizadas > 0])
+        primer_dia, ultimo_dia = ProgresoService.limites_mes(año, mes)
+        
+        # Un único registro agregado con el vector de días del mes
+        progreso_mes = ProgresoService.obtener_mes(usuario_id, año, mes)
+        
+        progreso_diario = [
+            {
+                'usuario_id': usuario_id,
+                'fecha': (primer_dia + timedelta(days=i)).isoformat(),
+                'minutos_estudio': minutos,
+                'tareas_completadas': tareas,
+                'sesiones_realizadas': sesiones
+            }
+            for i, (minutos, tareas, sesiones) in enumerate(progreso_mes.dias)
+            if minutos or tareas or sesiones
+        ]
         
         # Promedio diario
-        dias_en_mes = (ultimo_dia - primer_dia).days + 1
+        dias_en_mes = len(progreso_mes.dias)
+        total_minutos = progreso_mes.minutos_estudio
         promedio_minutos = total_minutos / dias_en_mes if dias_en_mes > 0 else 0
         
         return jsonify({
@@ -220,16 +185,16 @@ def get_progreso_mes():
             'mes': mes,
             'primer_dia': primer_dia.isoformat(),
             'ultimo_dia': ultimo_dia.isoformat(),
-            'progreso_diario': [p.to_dict() for p in progreso_mes],
+            'progreso_diario': progreso_diario,
             'estadisticas': {
                 'total_minutos': total_minutos,
                 'total_horas': round(total_minutos / 60, 2),
-                'total_tareas': total_tareas,
-                'total_sesiones': total_sesiones,
-                'dias_activos': dias_activos,
+                'total_tareas': progreso_mes.tareas_completadas,
+                'total_sesiones': progreso_mes.sesiones_realizadas,
+                'dias_activos': progreso_mes.dias_activos,
                 'dias_en_mes': dias_en_mes,
                 'promedio_minutos_dia': round(promedio_minutos, 2),
-                'racha_dias': calcular_racha_dias(progreso_mes)
+                'racha_dias': progreso_mes.racha_dias
             }
         }), 200
         
@@ -242,106 +207,44 @@ def get_estadisticas_generales():
     try:
         usuario_id = get_jwt_identity()
         
-        # Estadísticas de todas las sesiones
-        total_sesiones = Sesion.query.filter_by(
-            usuario_id=usuario_id, 
-            estado='Completado'
-        ).count()
-        
-        tiempo_total = db.session.query(
-            func.sum(Sesion.duracion_real)
-        ).filter_by(usuario_id=usuario_id, estado='Completado').scalar() or 0
-        
-        # Estadísticas de tareas
-        total_tareas = Tarea.query.filter_by(usuario_id=usuario_id).count()
-        tareas_completadas = Tarea.query.filter_by(
-            usuario_id=usuario_id, 
-            estado='Completado'
-        ).count()
-        
-        # Racha actual de días estudiando
-        progreso_reciente = Progreso.query.filter_by(
-            usuario_id=usuario_id
-        ).order_by(Progreso.fecha.desc()).limit(30).all()
-        
-        racha_actual = calcular_racha_actual(progreso_reciente)
-        
-        # Día con más minutos de estudio
-        mejor_dia = Progreso.query.filter_by(
-            usuario_id=usuario_id
-        ).order_by(Progreso.minutos_estudio.desc()).first()
-        
-        # Técnica más utilizada
-        tecnica_favorita = db.session.query(
-            func.count(Sesion.id_sesion).label('total'),
-            Sesion.tecnica_id
-        ).filter_by(usuario_id=usuario_id).group_by(
-            Sesion.tecnica_id
-        ).order_by(db.desc('total')).first()
-        
-        tecnica_nombre = None
-        if tecnica_favorita:
-            from models import Tecnica
-            tecnica = Tecnica.query.get(tecnica_favorita.tecnica_id)
-            tecnica_nombre = tecnica.nombre if tecnica else None
+        # Instantánea cacheada; se invalida con cada cambio de sesiones, tareas o progreso
+        return jsonify(EstadisticasService.obtener_generales(usuario_id)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@progreso_bp.route('/heatmap', methods=['GET'])
+@jwt_required()
+def get_heatmap():
+    try:
+        usuario_id = get_jwt_identity()
+        
+        # Un año (año) o un rango de años (desde/hasta), por defecto el actual
+        anio_actual = hoy_usuario(usuario_id).year
+        try:
+            desde = int(request.args.get('desde', request.args.get('año', anio_actual)))
+            hasta = int(request.args.get('hasta', request.args.get('año', desde)))
+        except ValueError:
+            return jsonify({'error': 'Los años deben ser números enteros'}), 400
+        
+        if hasta < desde or hasta - desde >= 10:
+            return jsonify({'error': 'Rango de años inválido (máximo 10 años)'}), 400
+        
+        # Solo años entre el registro del usuario y el actual
+        fecha_registro = db.session.query(Usuario.fecha_registro).filter_by(id_usuario=usuario_id).scalar()
+        if fecha_registro is None:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
+        primer_anio = dia_local(fecha_registro, zona_usuario(usuario_id)).year
+        if desde < primer_anio or hasta > anio_actual:
+            return jsonify({'error': f'Los años deben estar entre {primer_anio} y {anio_actual}'}), 400
         
         return jsonify({
-            'sesiones': {
-                'total': total_sesiones,
-                'tiempo_total_minutos': tiempo_total,
-                'tiempo_total_horas': round(tiempo_total / 60, 2),
-                'promedio_duracion': round(tiempo_total / total_sesiones, 2) if total_sesiones > 0 else 0
-            },
-            'tareas': {
-                'total': total_tareas,
-                'completadas': tareas_completadas,
-                'porcentaje_completadas': round((tareas_completadas / total_tareas) * 100, 2) if total_tareas > 0 else 0
+            'formato': {
+                'minutos': 'base64 de uint16 little-endian, un valor por día desde el 1 de enero',
+                'actividad': 'base64 de bitset, bit menos significativo primero (bit 0 = 1 de enero)'
             },
-            'racha_dias_actual': racha_actual,
-            'mejor_dia': {
-                'fecha': mejor_dia.fecha.isoformat() if mejor_dia else None,
-                'minutos': mejor_dia.minutos_estudio if mejor_dia else 0
-            },
-            'tecnica_favorita': tecnica_nombre,
-            'total_dias_registrados': Progreso.query.filter_by(usuario_id=usuario_id).count()
+            'años': MapaActividadService.obtener_anios(usuario_id, list(range(desde, hasta + 1)))
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
-def calcular_racha_dias(progreso_mes):
-    """Calcula la racha de días consecutivos con actividad"""
-    if not progreso_mes:
-        return 0
-    
-    racha_maxima = 0
-    racha_actual = 0
-    
-    for p in progreso_mes:
-        if p.minutos_estudio > 0 or p.sesiones_realizadas > 0:
-            racha_actual += 1
-            racha_maxima = max(racha_maxima, racha_actual)
-        else:
-            racha_actual = 0
-    
-    return racha_maxima
-
-def calcular_racha_actual(progreso_reciente):
-    """Calcula la racha actual de días consecutivos"""
-    if not progreso_reciente:
-        return 0
-    
-    # Ordenar por fecha descendente
-    progreso_ordenado = sorted(progreso_reciente, key=lambda x: x.fecha, reverse=True)
-    
-    racha = 0
-    fecha_esperada = date.today()
-    
-    for p in progreso_ordenado:
-        if p.fecha == fecha_esperada and (p.minutos_estudio > 0 or p.sesiones_realizadas > 0):
-            racha += 1
-            fecha_esperada = fecha_esperada - timedelta(days=1)
-        else:
-            break
-    
-    return racha
\ No newline at end of file
@@ -1,7 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, Sesion, SalaSesion, SesionTecnicaParam, Tecnica, Sala, UsuarioSala
+from app.services.progreso_service import ProgresoService
+from app.services.tecnica_service import TecnicaService
+from app.services.sesion_activa_service import SesionActivaService
+from app.services.sesion_inactiva_service import SesionInactivaService
 from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+from app.utils.paginacion import Pagina, campos_solicitados, cargar_solo, serializar
 
 sesion_bp = Blueprint('sesion', __name__)
 
@@ -32,35 +38,66 @@ def get_sesiones():
         if fecha_inicio:
             try:
                 fecha_inicio_dt = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-                query = query.filter(Sesion.inicio >= fecha_inicio_dt)
+                query = query.filter(Sesion.fecha_inicio >= fecha_inicio_dt)
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_inicio inválido (YYYY-MM-DD)'}), 400
         
         if fecha_fin:
             try:
                 fecha_fin_dt = datetime.strptime(fecha_fin, '%Y-%m-%d') + timedelta(days=1)
-                query = query.filter(Sesion.inicio < fecha_fin_dt)
+                query = query.filter(Sesion.fecha_inicio < fecha_fin_dt)
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_fin inválido (YYYY-MM-DD)'}), 400
         
-        # Ordenar por fecha de inicio (más recientes primero)
-        sesiones = query.order_by(Sesion.inicio.desc()).all()
+        # Página ordenada por fecha de inicio (más recientes primero)
+        try:
+            pagina = Pagina.desde_peticion(request.args, Sesion.fecha_inicio, Sesion.id_sesion)
+            campos = campos_solicitados(request.args, Sesion, extra=('tecnica', 'parametros'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        incluir_tecnica = campos is None or 'tecnica' in campos
+        incluir_parametros = campos is None or 'parametros' in campos
+        
+        query = cargar_solo(query, Sesion, campos, pagina, necesarias=('tecnica_id',) if incluir_tecnica else ())
+        if incluir_parametros:
+            # Los parámetros de toda la página se cargan con una consulta IN
+            query = query.options(selectinload(Sesion.parametros))
+        sesiones = pagina.recortar(pagina.aplicar(query).all())
         
         # Incluir información adicional
         sesiones_completas = []
         for sesion in sesiones:
-            sesion_dict = sesion.to_dict()
+            sesion_dict = serializar(sesion, campos)
             
-            # Agregar información de la técnica
-            if sesion.tecnica_sesion:
-                sesion_dict['tecnica'] = sesion.tecnica_sesion.to_dict()
+            # Agregar información de la técnica (catálogo en memoria)
+            if incluir_tecnica:
+                tecnica = TecnicaService.obtener(sesion.tecnica_id)
+                if tecnica:
+                    sesion_dict['tecnica'] = tecnica
             
             # Agregar parámetros de la sesión
-            sesion_dict['parametros'] = [param.to_dict() for param in sesion.parametros]
+            if incluir_parametros:
+                sesion_dict['parametros'] = [param.to_dict() for param in sesion.parametros]
             
             sesiones_completas.append(sesion_dict)
         
-        return jsonify(sesiones_completas), 200
+        return jsonify(sesiones_completas), 200, pagina.cabeceras()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@sesion_bp.route('/activa', methods=['GET'])
+@jwt_required()
+def get_sesion_activa():
+    try:
+        usuario_id = get_jwt_identity()
+        
+        # Lectura por clave primaria (cacheada) en el registro de sesiones activas
+        id_sesion = SesionActivaService.obtener_id(usuario_id)
+        if not id_sesion:
+            return jsonify({'sesion': None}), 200
+        
+        sesion = Sesion.query.get(id_sesion)
+        return jsonify({'sesion': sesion.to_dict() if sesion else None}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -87,6 +124,10 @@ def get_sesion(sesion_id):
         parametros = SesionTecnicaParam.query.filter_by(id_sesion=sesion.id_sesion).all()
         sesion_dict['parametros'] = [param.to_dict() for param in parametros]
         
+        # Estado del temporizador (Pomodoro o meditación), si lo tiene
+        if sesion.estado_tecnica:
+            sesion_dict['estado_tecnica'] = sesion.estado_tecnica.to_dict()
+        
         # Si es grupal, agregar información de salas
         if sesion.es_grupal:
             salas_info = []
@@ -172,10 +213,14 @@ def create_sesion():
                     )
                     db.session.add(sala_sesion)
         
+        SesionActivaService.sincronizar(nueva_sesion)
+        ProgresoService.registrar_sesion(nueva_sesion)
         db.session.commit()
         
         return jsonify(nueva_sesion.to_dict()), 201
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -193,6 +238,8 @@ def update_sesion(sesion_id):
         
         # Obtener los datos de la solicitud
         data = request.get_json()
+        aporte_anterior = ProgresoService.aporte_sesion(sesion)
+        estado_anterior = sesion.estado
 
         # Actualizar campos permitidos
         if 'estado' in data and data['estado'] in ['EnEjecucion', 'Completado', 'Cancelado', 'EnPausa']:
@@ -228,11 +275,16 @@ def update_sesion(sesion_id):
                     )
                     db.session.add(sesion_param)
         
+        SesionActivaService.sincronizar(sesion, estado_anterior)
+        ProgresoService.registrar_sesion(sesion, aporte_anterior)
+
         # Confirmar cambios en la base de datos
         db.session.commit()
 
         return jsonify(sesion.to_dict()), 200
-        
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -255,6 +307,8 @@ def delete_sesion(id_sesion):
         SalaSesion.query.filter_by(id_sesion=id_sesion).delete()
 
         # Eliminar la sesión
+        SesionActivaService.liberar(sesion)
+        ProgresoService.retirar_sesion(sesion)
         db.session.delete(sesion)
         db.session.commit()
 
@@ -275,38 +329,37 @@ def iniciar_sesion():
         if not data.get('tecnica_id'):
             return jsonify({'error': 'ID de técnica es requerido'}), 400
         
-        # Verificar que no hay otra sesión en ejecución
-        sesion_activa = Sesion.query.filter_by(
-            usuario_id=usuario_id,
-            estado='EnEjecucion'
-        ).first()
-        
-        if sesion_activa:
-            return jsonify({'error': 'Ya tienes una sesión en ejecución'}), 400
-        
         # Crear nueva sesión en ejecución
         nueva_sesion = Sesion(
             usuario_id=usuario_id,
             tecnica_id=data['tecnica_id'],
-            inicio=datetime.utcnow(),
+            fecha_inicio=datetime.utcnow(),
+            duracion_real=0,
             es_grupal=data.get('es_grupal', False),
             estado='EnEjecucion'
         )
         
         db.session.add(nueva_sesion)
-        db.session.flush()
         
-        # Agregar parámetros iniciales si se proporcionan
+        # Registrar la sesión activa: falla si ya hay otra en ejecución
+        try:
+            SesionActivaService.tomar(nueva_sesion)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Agregar parámetros libres si se proporcionan (el estado de los
+        # temporizadores de Pomodoro y meditación vive en SesionEstado)
         parametros = data.get('parametros', [])
         for param in parametros:
             if param.get('codigo') and param.get('cantidad'):
                 sesion_param = SesionTecnicaParam(
-                    sesion_id=nueva_sesion.sesion_id,
-                    codigo=param['codigo'],
-                    cantidad=str(param['cantidad'])
+                    id_sesion=nueva_sesion.id_sesion,
+                    parametro=param['codigo'],
+                    valor=str(param['cantidad'])
                 )
                 db.session.add(sesion_param)
         
+        ProgresoService.registrar_sesion(nueva_sesion)
         db.session.commit()
         
         return jsonify(nueva_sesion.to_dict()), 201
@@ -340,6 +393,8 @@ def finalizar_sesion(id_sesion):
         sesion.fecha_fin = ahora  # Asegúrate de que 'fecha_fin' es la columna correcta
         sesion.duracion_real = int((ahora - sesion.fecha_inicio).total_seconds() / 60)  # Duración en minutos
         sesion.estado = 'Completado'  # Actualizar el estado de la sesión
+        SesionActivaService.liberar(sesion)
+        ProgresoService.registrar_sesion(sesion)
         
         # Guardar los cambios en la base de datos
         db.session.commit()
@@ -355,6 +410,22 @@ def finalizar_sesion(id_sesion):
         # Si ocurre un error, devolverlo
         return jsonify({'error': str(e)}), 500
 
+@sesion_bp.route('/<string:id_sesion>/latido', methods=['PATCH'])
+@jwt_required()
+def latido_sesion(id_sesion):
+    try:
+        usuario_id = get_jwt_identity()
+        
+        # El cliente lo envía periódicamente; sin latidos la sesión se cierra sola
+        ultimo_latido = SesionInactivaService.registrar_latido(usuario_id, id_sesion)
+        
+        return jsonify({'ultimo_latido': ultimo_latido.isoformat()}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @sesion_bp.route('/estadisticas', methods=['GET'])
 @jwt_required()
 def get_estadisticas_sesiones():
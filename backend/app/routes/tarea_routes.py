@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, Tarea, Usuario, Sala, UsuarioSala
-from datetime import datetime, date
+from app.services.progreso_service import ProgresoService
+from app.services.estadisticas_service import EstadisticasService
+from app.services.busqueda_tarea_service import BusquedaTareaService
+from app.utils.paginacion import Pagina, LIMITE_MAXIMO, campos_solicitados, cargar_solo, serializar
+from datetime import datetime
 
 tarea_bp = Blueprint('tarea', __name__)
 
@@ -27,10 +31,17 @@ def get_tareas():
         if prioridad:
             query = query.filter_by(prioridad=prioridad)
         
-        # Ordenar por fecha de creación (más recientes primero)
-        tareas = query.order_by(Tarea.fecha_creacion.desc()).all()
+        # Página ordenada por fecha de creación (más recientes primero)
+        try:
+            pagina = Pagina.desde_peticion(request.args, Tarea.fecha_creacion, Tarea.id_tarea)
+            campos = campos_solicitados(request.args, Tarea)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify([tarea.to_dict() for tarea in tareas]), 200
+        query = cargar_solo(query, Tarea, campos, pagina)
+        tareas = pagina.recortar(pagina.aplicar(query).all())
+        
+        return jsonify([serializar(tarea, campos) for tarea in tareas]), 200, pagina.cabeceras()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -96,6 +107,8 @@ def create_tarea():
         )
 
         db.session.add(nueva_tarea)
+        db.session.flush()
+        ProgresoService.registrar_tarea(nueva_tarea)
         db.session.commit()
 
         return jsonify(nueva_tarea.to_dict()), 201
@@ -116,6 +129,7 @@ def update_tarea(id_tarea):
             return jsonify({'error': 'Tarea no encontrada'}), 404
 
         data = request.get_json()
+        aporte_anterior = ProgresoService.aporte_tarea(tarea)
 
         # Actualizar campos permitidos
         if 'titulo' in data:
@@ -153,6 +167,7 @@ def update_tarea(id_tarea):
                     return jsonify({'error': 'No perteneces a esta sala'}), 403
             tarea.sala_id = nueva_sala_id
 
+        ProgresoService.registrar_tarea(tarea, aporte_anterior)
         db.session.commit()
 
         return jsonify(tarea.to_dict()), 200
@@ -171,6 +186,7 @@ def delete_tarea(id_tarea):
         if not tarea:
             return jsonify({'error': 'Tarea no encontrada'}), 404
 
+        ProgresoService.retirar_tarea(tarea)
         db.session.delete(tarea)
         db.session.commit()
 
@@ -188,40 +204,46 @@ def get_estadisticas_tareas():
     try:
         usuario_id = get_jwt_identity()
         
-        # Contar tareas por estado
-        stats = {
-            'total': Tarea.query.filter_by(usuario_id=usuario_id).count(),
-            'pendientes': Tarea.query.filter_by(usuario_id=usuario_id, estado='Pendiente').count(),
-            'en_progreso': Tarea.query.filter_by(usuario_id=usuario_id, estado='EnProgreso').count(),
-            'en_espera': Tarea.query.filter_by(usuario_id=usuario_id, estado='EnEspera').count(),
-            'completadas': Tarea.query.filter_by(usuario_id=usuario_id, estado='Completado').count()
-        }
-        
-        # Tareas por prioridad
-        stats['por_prioridad'] = {
-            'alta': Tarea.query.filter_by(usuario_id=usuario_id, prioridad='alta').count(),
-            'media': Tarea.query.filter_by(usuario_id=usuario_id, prioridad='media').count(),
-            'baja': Tarea.query.filter_by(usuario_id=usuario_id, prioridad='baja').count()
-        }
-        
-        # Tareas vencidas (solo las no completadas)
-        hoy = date.today()
-        stats['vencidas'] = Tarea.query.filter(
-            Tarea.usuario_id == usuario_id,
-            Tarea.estado != 'Completado',
-            Tarea.fecha_vencimiento < hoy
-        ).count()
-        
-        # Tareas de hoy
-        stats['hoy'] = Tarea.query.filter(
-            Tarea.usuario_id == usuario_id,
-            Tarea.fecha_vencimiento == hoy
-        ).count()
+        # Una consulta agregada, cacheada hasta la siguiente escritura de tareas
+        stats = EstadisticasService.obtener_tareas(usuario_id)
         
         return jsonify(stats), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@tarea_bp.route('/buscar', methods=['GET'])
+@jwt_required()
+def buscar_tareas():
+    try:
+        usuario_id = get_jwt_identity()
+        sala_id = request.args.get('sala_id')
+
+        try:
+            limite = int(request.args.get('limit', 20))
+        except ValueError:
+            return jsonify({'error': 'El parámetro limit debe ser un número entero'}), 400
+        if limite < 1 or limite > LIMITE_MAXIMO:
+            return jsonify({'error': f'El parámetro limit debe estar entre 1 y {LIMITE_MAXIMO}'}), 400
+
+        # Con sala_id se busca en todas las tareas de la sala: hay que pertenecer a ella
+        if sala_id:
+            usuario_sala = UsuarioSala.query.filter_by(
+                id_usuario=usuario_id,
+                id_sala=sala_id,
+                activo=True
+            ).first()
+            if not usuario_sala:
+                return jsonify({'error': 'No tienes acceso a esta sala'}), 403
+
+        tareas = BusquedaTareaService.buscar(usuario_id, request.args.get('q'), sala_id, limite)
+
+        return jsonify(tareas), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @tarea_bp.route('/sala/<string:sala_id>', methods=['GET'])
 @jwt_required()
 def get_tareas_sala(sala_id):
@@ -238,22 +260,31 @@ def get_tareas_sala(sala_id):
         if not usuario_sala:
             return jsonify({'error': 'No tienes acceso a esta sala'}), 403
 
-        # Obtener tareas de la sala (de todos los usuarios)
-        tareas = Tarea.query.filter_by(sala_id=sala_id).order_by(Tarea.fecha_creacion.desc()).all()
+        try:
+            pagina = Pagina.desde_peticion(request.args, Tarea.fecha_creacion, Tarea.id_tarea)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Tareas de la sala (de todos los usuarios) con las columnas del autor
+        # en la misma consulta
+        query = db.session.query(
+            Tarea, Usuario.id_usuario, Usuario.Username, Usuario.correo
+        ).outerjoin(
+            Usuario, Usuario.id_usuario == Tarea.usuario_id
+        ).filter(Tarea.sala_id == sala_id)
+        filas = pagina.recortar(pagina.aplicar(query).all())
 
-        # Incluir información del usuario para cada tarea
         tareas_con_usuario = []
-        for tarea in tareas:
+        for tarea, id_autor, username, correo in filas:
             tarea_dict = tarea.to_dict()
-            usuario = Usuario.query.get(tarea.usuario_id)
             tarea_dict['usuario'] = {
-                'id_usuario': usuario.id_usuario,
-                'Username': usuario.Username,
-                'correo': usuario.correo
-            } if usuario else None
+                'id_usuario': id_autor,
+                'Username': username,
+                'correo': correo
+            } if id_autor else None
             tareas_con_usuario.append(tarea_dict)
 
-        return jsonify(tareas_con_usuario), 200
+        return jsonify(tareas_con_usuario), 200, pagina.cabeceras()
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app.models import db, Tecnica
+from app.services.tecnica_service import TecnicaService
 
 tecnica_bp = Blueprint('tecnica', __name__)
 
@@ -81,6 +82,7 @@ def create_tecnica():
         
         db.session.add(nueva_tecnica)
         db.session.commit()
+        TecnicaService.invalidar()
         
         return jsonify(nueva_tecnica.to_dict()), 201
         
@@ -108,6 +110,7 @@ def update_tecnica(tecnica_id):
             tecnica.categoria = data['categoria']
         
         db.session.commit()
+        TecnicaService.invalidar()
         
         return jsonify(tecnica.to_dict()), 200
         
@@ -129,6 +132,7 @@ def delete_tecnica(tecnica_id):
         
         db.session.delete(tecnica)
         db.session.commit()
+        TecnicaService.invalidar()
         
         return jsonify({'message': 'Técnica eliminada exitosamente'}), 200
         
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, Usuario, Rol
+from app.utils.fechas import zona_valida, invalidar_zona_usuario
 from werkzeug.security import generate_password_hash
 
 usuario_bp = Blueprint('usuario', __name__)
@@ -92,10 +93,17 @@ def update_usuario(usuario_id):
         if 'activo' in data:
             usuario.activo = data['activo']
         
+        if 'zona_horaria' in data:
+            # Solo afecta a las sesiones y tareas que se registren a partir de ahora
+            if not zona_valida(data['zona_horaria']):
+                return jsonify({'error': 'Zona horaria no válida'}), 400
+            usuario.zona_horaria = data['zona_horaria']
+        
         if 'password' in data and data['password']:
             usuario.password = generate_password_hash(data['password'])
         
         db.session.commit()
+        invalidar_zona_usuario(usuario_id)
         
         return jsonify(usuario.to_dict()), 200
         
@@ -0,0 +1,159 @@
+# services/busqueda_tarea_service.py
+from ..models import db, Tarea
+from sqlalchemy import text, table, column, literal, literal_column, or_, and_
+from sqlalchemy.dialects.mysql import match
+import re
+
+class BusquedaTareaService:
+    """
+    Búsqueda de texto completo sobre título, descripción y comentario de las
+    tareas usando el índice invertido del motor: FULLTEXT en MariaDB/MySQL y
+    una tabla virtual FTS5 mantenida por triggers en SQLite. Los términos se
+    buscan por prefijo y todos deben aparecer; los resultados se ordenan por
+    relevancia.
+    """
+
+    TABLA_FTS = 'tarea_fts'
+    MAX_TERMINOS = 10
+
+    # InnoDB no indexa palabras más cortas que innodb_ft_min_token_size ni
+    # las de su lista de stopwords por defecto: exigirlas vaciaría el resultado
+    LONGITUD_MINIMA_MYSQL = 3
+    STOPWORDS_MYSQL = frozenset((
+        'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en',
+        'for', 'from', 'how', 'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or',
+        'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'who',
+        'will', 'with', 'und', 'www'
+    ))
+
+    _DDL_SQLITE = (
+        # Copia indexada del texto; id_tarea sin indexar para unir con tarea
+        """CREATE VIRTUAL TABLE IF NOT EXISTS tarea_fts USING fts5(
+            id_tarea UNINDEXED, titulo, descripcion, comentario,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS tarea_fts_ai AFTER INSERT ON tarea BEGIN
+            INSERT INTO tarea_fts (rowid, id_tarea, titulo, descripcion, comentario)
+            VALUES (new.rowid, new.id_tarea, new.titulo, new.descripcion, new.comentario);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tarea_fts_ad AFTER DELETE ON tarea BEGIN
+            DELETE FROM tarea_fts WHERE rowid = old.rowid;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tarea_fts_au AFTER UPDATE OF titulo, descripcion, comentario ON tarea BEGIN
+            DELETE FROM tarea_fts WHERE rowid = old.rowid;
+            INSERT INTO tarea_fts (rowid, id_tarea, titulo, descripcion, comentario)
+            VALUES (new.rowid, new.id_tarea, new.titulo, new.descripcion, new.comentario);
+        END"""
+    )
+
+    @staticmethod
+    def _dialecto():
+        return db.session.get_bind().dialect.name
+
+    # --- Índice ---
+
+    @classmethod
+    def asegurar_indice(cls):
+        """
+        Crea la tabla FTS5 y sus triggers en SQLite si faltan (idempotente; se
+        llama al arrancar) y la llena con las tareas existentes al crearla.
+        Tras un VACUUM conviene usar reconstruir_indice(). En MariaDB/MySQL el
+        índice FULLTEXT está declarado en el modelo Tarea.
+        """
+        if cls._dialecto() != 'sqlite':
+            return
+        existe = db.session.execute(text(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = :tabla"
+        ), {'tabla': cls.TABLA_FTS}).scalar()
+        for sentencia in cls._DDL_SQLITE:
+            db.session.execute(text(sentencia))
+        if not existe:
+            cls.reconstruir_indice()
+        db.session.commit()
+
+    @classmethod
+    def reconstruir_indice(cls):
+        """Vuelve a llenar la tabla FTS de SQLite desde tarea"""
+        if cls._dialecto() != 'sqlite':
+            return
+        db.session.execute(text("DELETE FROM tarea_fts"))
+        db.session.execute(text(
+            "INSERT INTO tarea_fts (rowid, id_tarea, titulo, descripcion, comentario) "
+            "SELECT rowid, id_tarea, titulo, descripcion, comentario FROM tarea"
+        ))
+
+    # --- Búsqueda ---
+
+    @classmethod
+    def terminos(cls, texto):
+        """Palabras de la consulta (sin operadores del motor)"""
+        return re.findall(r'\w+', (texto or '').lower())[:cls.MAX_TERMINOS]
+
+    @classmethod
+    def _consulta_sqlite(cls, terminos):
+        fts = table(cls.TABLA_FTS, column('id_tarea'))
+        # bm25 devuelve valores menores cuanto más relevante; el título pesa más
+        relevancia = literal_column('-bm25(tarea_fts, 0.0, 10.0, 2.0, 1.0)')
+        expresion = ' '.join(f'"{termino}"*' for termino in terminos)
+        query = db.session.query(Tarea, relevancia.label('relevancia')).select_from(fts).join(
+            Tarea, Tarea.id_tarea == fts.c.id_tarea
+        ).filter(text('tarea_fts MATCH :expresion').bindparams(expresion=expresion))
+        return query, relevancia
+
+    @classmethod
+    def _indexable_mysql(cls, termino):
+        return len(termino) >= cls.LONGITUD_MINIMA_MYSQL and termino not in cls.STOPWORDS_MYSQL
+
+    @classmethod
+    def _consulta_mysql(cls, terminos):
+        # Modo booleano: +término* exige cada palabra indexable y acepta
+        # prefijos; las que InnoDB no indexa no pueden exigirse
+        expresion = ' '.join(f'+{termino}*' for termino in terminos if cls._indexable_mysql(termino))
+        relevancia = match(Tarea.titulo, Tarea.descripcion, Tarea.comentario, against=expresion).in_boolean_mode()
+        query = db.session.query(Tarea, relevancia.label('relevancia')).filter(relevancia > 0)
+        return query, relevancia
+
+    @classmethod
+    def _consulta_like(cls, terminos):
+        # Motores sin índice de texto (o consultas solo con palabras que el
+        # índice no contiene): recorrido de las tareas del ámbito, sin ranking
+        relevancia = literal(0.0)
+        query = db.session.query(Tarea, relevancia.label('relevancia')).filter(and_(*[
+            or_(
+                Tarea.titulo.like(f'%{termino}%'),
+                Tarea.descripcion.like(f'%{termino}%'),
+                Tarea.comentario.like(f'%{termino}%')
+            )
+            for termino in terminos
+        ]))
+        return query, relevancia
+
+    @classmethod
+    def buscar(cls, usuario_id, texto, sala_id=None, limite=20):
+        """
+        Tareas del usuario (o de la sala si se indica `sala_id`) que contienen
+        todos los términos de `texto`, de más a menos relevante. El acceso a
+        la sala se comprueba antes de llamar.
+        """
+        terminos = cls.terminos(texto)
+        if not terminos:
+            raise ValueError("El parámetro q es obligatorio")
+
+        dialecto = cls._dialecto()
+        if dialecto == 'sqlite':
+            query, relevancia = cls._consulta_sqlite(terminos)
+        elif dialecto in ('mysql', 'mariadb') and any(cls._indexable_mysql(t) for t in terminos):
+            query, relevancia = cls._consulta_mysql(terminos)
+        else:
+            query, relevancia = cls._consulta_like(terminos)
+
+        if sala_id:
+            query = query.filter(Tarea.sala_id == sala_id)
+        else:
+            query = query.filter(Tarea.usuario_id == usuario_id)
+
+        filas = query.order_by(relevancia.desc(), Tarea.fecha_creacion.desc()).limit(limite).all()
+        return [
+            dict(tarea.to_dict(), relevancia=round(float(puntuacion or 0), 6))
+            for tarea, puntuacion in filas
+        ]
@@ -0,0 +1,170 @@
+# services/difusor_pomodoro.py
+from ..models import db, SesionEstado
+from .pomodoro_service import PomodoroService
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import heapq
+import itertools
+import queue
+import threading
+
+class Suscripcion:
+    """Un cliente conectado al flujo de una sesión"""
+
+    def __init__(self, sesion_id, foto):
+        self.sesion_id = sesion_id
+        self.foto = foto
+        self.cola = queue.Queue()
+        self.ultima_fase = None
+        self.proximo_sync = None
+        self.turno = None  # Entrada vigente en el montículo
+        self.activa = True
+
+class DifusorPomodoro:
+    """
+    Despachador único por proceso para los flujos de Pomodoro. Mantiene un
+    montículo con el próximo instante en que cada suscripción necesita un
+    evento (cambio de fase o sincronización periódica) y duerme hasta el
+    primero. Los hilos de las peticiones solo esperan en su cola.
+    """
+
+    INTERVALO_SYNC = 30  # segundos
+
+    _condicion = threading.Condition()
+    _monticulo = []
+    _secuencia = itertools.count()
+    _suscripciones = {}  # sesion_id -> set(Suscripcion)
+    _hilo = None
+
+    # --- Fotos del estado (sin acceso a la base de datos) ---
+
+    @staticmethod
+    def foto(sesion):
+        """Copia desacoplada de la sesión con lo necesario para calcular la fase"""
+        estado = sesion.estado_tecnica
+        return SimpleNamespace(
+            estado=sesion.estado,
+            fecha_inicio=sesion.fecha_inicio,
+            fecha_fin=sesion.fecha_fin,
+            # Instancia transitoria (fuera de la sesión) para reutilizar sus cálculos de pausa
+            estado_tecnica=SesionEstado(
+                duracion_trabajo=estado.duracion_trabajo,
+                duracion_descanso=estado.duracion_descanso,
+                ciclos_objetivo=estado.ciclos_objetivo,
+                pausas=list(estado.pausas or []),
+                pausado_desde=estado.pausado_desde
+            )
+        )
+
+    @classmethod
+    def cargar(cls, usuario_id, sesion_id):
+        """
+        Lee la sesión una vez y devuelve (respuesta formateada, foto). Suelta la
+        conexión para no retenerla mientras el flujo siga abierto. Lanza
+        ValueError si la sesión no existe.
+        """
+        try:
+            sesion = PomodoroService._obtener_sesion(usuario_id, sesion_id, solo_en_ejecucion=False)
+            return PomodoroService._formatear_respuesta_pomodoro(sesion), cls.foto(sesion)
+        finally:
+            db.session.remove()
+
+    @staticmethod
+    def clave_foto(foto):
+        """Lo que cambia al pausar, reanudar o finalizar"""
+        return (foto.estado, foto.fecha_fin, len(foto.estado_tecnica.pausas), foto.estado_tecnica.pausado_desde)
+
+    # --- Suscripciones ---
+
+    @classmethod
+    def suscribir(cls, sesion_id, foto):
+        suscripcion = Suscripcion(sesion_id, foto)
+        ahora = datetime.utcnow()
+        # El cliente ya recibió el estado inicial: solo se avisa de lo que cambie
+        suscripcion.ultima_fase = PomodoroService.calcular_estado(foto, ahora)['fase_actual']
+        suscripcion.proximo_sync = ahora + timedelta(seconds=cls.INTERVALO_SYNC)
+        with cls._condicion:
+            cls._suscripciones.setdefault(sesion_id, set()).add(suscripcion)
+            cls._programar(suscripcion, ahora)
+            cls._arrancar()
+        return suscripcion
+
+    @classmethod
+    def cancelar(cls, suscripcion):
+        with cls._condicion:
+            suscripcion.activa = False
+            suscriptores = cls._suscripciones.get(suscripcion.sesion_id)
+            if suscriptores:
+                suscriptores.discard(suscripcion)
+                if not suscriptores:
+                    del cls._suscripciones[suscripcion.sesion_id]
+
+    @classmethod
+    def actualizar(cls, suscripcion, foto):
+        """Sustituye la foto tras una recarga y recalcula el próximo evento"""
+        with cls._condicion:
+            suscripcion.foto = foto
+            cls._programar(suscripcion, datetime.utcnow())
+
+    @classmethod
+    def notificar(cls, sesion_id):
+        """
+        Avisa a los suscriptores de este proceso de que la sesión cambió
+        (pausa, reanudación o fin) para que recarguen su estado. Los de otros
+        procesos lo detectan en la siguiente sincronización.
+        """
+        with cls._condicion:
+            for suscripcion in cls._suscripciones.get(sesion_id, ()):
+                suscripcion.cola.put({'tipo': 'recarga'})
+
+    # --- Despachador ---
+
+    @classmethod
+    def _arrancar(cls):
+        if cls._hilo is None or not cls._hilo.is_alive():
+            cls._hilo = threading.Thread(target=cls._bucle, name='difusor-pomodoro', daemon=True)
+            cls._hilo.start()
+
+    @classmethod
+    def _programar(cls, suscripcion, ahora):
+        """Calcula cuándo necesita su próximo evento y lo mete en el montículo"""
+        calculado = PomodoroService.calcular_estado(suscripcion.foto, ahora)
+        if suscripcion.ultima_fase != calculado['fase_actual']:
+            suscripcion.ultima_fase = calculado['fase_actual']
+            suscripcion.cola.put({'tipo': 'fase', 'estado': calculado})
+            suscripcion.proximo_sync = ahora + timedelta(seconds=cls.INTERVALO_SYNC)
+        elif suscripcion.proximo_sync is None or ahora >= suscripcion.proximo_sync:
+            suscripcion.cola.put({'tipo': 'sync', 'estado': calculado})
+            suscripcion.proximo_sync = ahora + timedelta(seconds=cls.INTERVALO_SYNC)
+
+        proximo = suscripcion.proximo_sync
+        en_curso = suscripcion.foto.estado == 'EnEjecucion' and not calculado['pausado']
+        if en_curso and calculado['fase_actual'] != 'completado':
+            fin_fase = ahora + timedelta(seconds=calculado['segundos_restantes_fase'])
+            proximo = min(proximo, fin_fase)
+
+        suscripcion.turno = next(cls._secuencia)
+        heapq.heappush(cls._monticulo, (proximo, suscripcion.turno, suscripcion))
+        cls._condicion.notify()
+
+    @classmethod
+    def _bucle(cls):
+        with cls._condicion:
+            while True:
+                # Descartar entradas de suscripciones canceladas o reprogramadas
+                while cls._monticulo and (
+                    not cls._monticulo[0][2].activa or cls._monticulo[0][1] != cls._monticulo[0][2].turno
+                ):
+                    heapq.heappop(cls._monticulo)
+                if not cls._monticulo:
+                    cls._condicion.wait()
+                    continue
+
+                cuando, _, suscripcion = cls._monticulo[0]
+                espera = (cuando - datetime.utcnow()).total_seconds()
+                if espera > 0:
+                    cls._condicion.wait(timeout=espera)
+                    continue
+
+                heapq.heappop(cls._monticulo)
+                cls._programar(suscripcion, datetime.utcnow())
@@ -0,0 +1,180 @@
+# services/estadisticas_service.py
+from ..models import db, Sesion, Tarea, Progreso, Tecnica, RachaUsuario
+from ..utils.cache import CacheUsuario
+from ..utils.fechas import hoy_usuario
+from sqlalchemy import select, func, case, event
+
+class EstadisticasService:
+    """
+    Instantánea de estadísticas generales y de tareas por usuario. Cada una se
+    calcula con una sola consulta agregada y se guarda en caché hasta que
+    cambian sus sesiones, tareas o progreso.
+    """
+
+    ESTADOS_TAREA = {
+        'Pendiente': 'pendientes',
+        'EnProgreso': 'en_progreso',
+        'EnEspera': 'en_espera',
+        'Completado': 'completadas'
+    }
+    PRIORIDADES_TAREA = ('alta', 'media', 'baja')
+
+    _cache = CacheUsuario(ttl=300)
+    _cache_tareas = CacheUsuario(ttl=300)
+
+    # Usuarios con cambios pendientes de confirmar, guardados en session.info
+    _PENDIENTES = 'estadisticas_invalidar'
+
+    @classmethod
+    def invalidar(cls, usuario_id):
+        cls._cache.invalidar(usuario_id)
+        cls._cache_tareas.invalidar(usuario_id)
+
+    @classmethod
+    def invalidar_al_confirmar(cls, usuario_id):
+        """
+        Invalida la caché del usuario cuando la transacción actual se confirme.
+        Hacerlo antes dejaría que una lectura concurrente guardase datos
+        anteriores al commit; si hay rollback no se invalida nada.
+        """
+        db.session.info.setdefault(cls._PENDIENTES, set()).add(usuario_id)
+
+    @classmethod
+    def _tras_confirmar(cls, session):
+        for usuario_id in session.info.pop(cls._PENDIENTES, ()):
+            cls.invalidar(usuario_id)
+
+    @classmethod
+    def _tras_deshacer(cls, session):
+        session.info.pop(cls._PENDIENTES, None)
+
+    @classmethod
+    def obtener_tareas(cls, usuario_id):
+        """
+        Conteos de tareas por estado y prioridad, vencidas y de hoy. Vencidas
+        y hoy dependen de la fecha local, así que la entrada de caché solo
+        vale para el día en que se calculó.
+        """
+        hoy = hoy_usuario(usuario_id)
+        entrada = cls._cache_tareas.obtener(usuario_id)
+        if entrada is None or entrada[0] != hoy:
+            entrada = (hoy, cls._calcular_tareas(usuario_id, hoy))
+            cls._cache_tareas.guardar(usuario_id, entrada)
+        return entrada[1]
+
+    @classmethod
+    def _calcular_tareas(cls, usuario_id, hoy):
+        # Una pasada sobre ix_tarea_usuario_estado_prioridad: un grupo por
+        # combinación (estado, prioridad) con sumas condicionales por fecha
+        filas = db.session.execute(select(
+            Tarea.estado,
+            Tarea.prioridad,
+            func.count().label('total'),
+            func.count(case((
+                (Tarea.estado != 'Completado') & (Tarea.fecha_vencimiento < hoy), 1
+            ))).label('vencidas'),
+            func.count(case((Tarea.fecha_vencimiento == hoy, 1))).label('hoy')
+        ).where(
+            Tarea.usuario_id == usuario_id
+        ).group_by(Tarea.estado, Tarea.prioridad)).all()
+
+        stats = dict.fromkeys(('total', *cls.ESTADOS_TAREA.values()), 0)
+        stats['por_prioridad'] = dict.fromkeys(cls.PRIORIDADES_TAREA, 0)
+        stats['vencidas'] = 0
+        stats['hoy'] = 0
+        for fila in filas:
+            stats['total'] += fila.total
+            if fila.estado in cls.ESTADOS_TAREA:
+                stats[cls.ESTADOS_TAREA[fila.estado]] += fila.total
+            if fila.prioridad in stats['por_prioridad']:
+                stats['por_prioridad'][fila.prioridad] += fila.total
+            stats['vencidas'] += fila.vencidas
+            stats['hoy'] += fila.hoy
+        return stats
+
+    @classmethod
+    def obtener_generales(cls, usuario_id):
+        estadisticas = cls._cache.obtener(usuario_id)
+        if estadisticas is None:
+            estadisticas = cls._calcular_generales(usuario_id)
+            cls._cache.guardar(usuario_id, estadisticas)
+        return estadisticas
+
+    @classmethod
+    def _calcular_generales(cls, usuario_id):
+        completada = Sesion.estado == 'Completado'
+
+        sesiones = select(
+            func.count(case((completada, 1))).label('total'),
+            func.coalesce(func.sum(case((completada, Sesion.duracion_real), else_=0)), 0).label('minutos')
+        ).where(Sesion.usuario_id == usuario_id).subquery()
+
+        tareas = select(
+            func.count(Tarea.id_tarea).label('total'),
+            func.count(case((Tarea.estado == 'Completado', 1))).label('completadas')
+        ).where(Tarea.usuario_id == usuario_id).subquery()
+
+        progreso = select(
+            func.count(Progreso.id_progreso).label('dias')
+        ).where(Progreso.usuario_id == usuario_id).subquery()
+
+        mejor_dia = select(Progreso.fecha, Progreso.minutos_estudio).where(
+            Progreso.usuario_id == usuario_id
+        ).order_by(Progreso.minutos_estudio.desc()).limit(1)
+
+        tecnica_favorita = select(Tecnica.nombre).join(
+            Sesion, Sesion.tecnica_id == Tecnica.id_tecnica
+        ).where(
+            Sesion.usuario_id == usuario_id
+        ).group_by(Tecnica.id_tecnica, Tecnica.nombre).order_by(
+            func.count(Sesion.id_sesion).desc()
+        ).limit(1)
+
+        racha = select(RachaUsuario).where(RachaUsuario.usuario_id == usuario_id)
+
+        # Cada subconsulta agregada devuelve exactamente una fila: el producto
+        # cartesiano es una sola fila con todo lo necesario
+        fila = db.session.execute(select(
+            sesiones.c.total.label('sesiones_total'),
+            sesiones.c.minutos.label('sesiones_minutos'),
+            tareas.c.total.label('tareas_total'),
+            tareas.c.completadas.label('tareas_completadas'),
+            progreso.c.dias.label('dias_registrados'),
+            mejor_dia.with_only_columns(Progreso.fecha).scalar_subquery().label('mejor_dia_fecha'),
+            mejor_dia.with_only_columns(Progreso.minutos_estudio).scalar_subquery().label('mejor_dia_minutos'),
+            tecnica_favorita.scalar_subquery().label('tecnica_favorita'),
+            racha.with_only_columns(RachaUsuario.racha_actual).scalar_subquery().label('racha_actual'),
+            racha.with_only_columns(RachaUsuario.mejor_racha).scalar_subquery().label('mejor_racha'),
+            racha.with_only_columns(RachaUsuario.ultima_fecha_activa).scalar_subquery().label('ultima_fecha_activa')
+        ).select_from(sesiones).join(tareas, db.true()).join(progreso, db.true())).one()
+
+        total_sesiones = fila.sesiones_total
+        tiempo_total = int(fila.sesiones_minutos or 0)
+        total_tareas = fila.tareas_total
+        tareas_completadas = fila.tareas_completadas
+        racha_actual = fila.racha_actual if fila.ultima_fecha_activa == hoy_usuario(usuario_id) else 0
+
+        return {
+            'sesiones': {
+                'total': total_sesiones,
+                'tiempo_total_minutos': tiempo_total,
+                'tiempo_total_horas': round(tiempo_total / 60, 2),
+                'promedio_duracion': round(tiempo_total / total_sesiones, 2) if total_sesiones > 0 else 0
+            },
+            'tareas': {
+                'total': total_tareas,
+                'completadas': tareas_completadas,
+                'porcentaje_completadas': round((tareas_completadas / total_tareas) * 100, 2) if total_tareas > 0 else 0
+            },
+            'racha_dias_actual': racha_actual or 0,
+            'mejor_racha_dias': fila.mejor_racha or 0,
+            'mejor_dia': {
+                'fecha': fila.mejor_dia_fecha.isoformat() if fila.mejor_dia_fecha else None,
+                'minutos': fila.mejor_dia_minutos or 0
+            },
+            'tecnica_favorita': fila.tecnica_favorita,
+            'total_dias_registrados': fila.dias_registrados
+        }
+
+event.listen(db.session, 'after_commit', EstadisticasService._tras_confirmar)
+event.listen(db.session, 'after_rollback', EstadisticasService._tras_deshacer)
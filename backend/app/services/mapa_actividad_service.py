@@ -0,0 +1,162 @@
+# services/mapa_actividad_service.py
+from ..models import db, Progreso, ActividadAnual
+from sqlalchemy import extract
+from ..utils.upsert import upsert
+from array import array
+from datetime import date
+import base64
+import sys
+
+DIAS_ANIO = 366
+MAX_MINUTOS = 0xFFFF
+
+class MapaActividadService:
+    """
+    Mapa de calor anual por usuario: un array empaquetado de minutos por día
+    (uint16 little-endian) y un bitset de días con actividad, ambos en una sola
+    fila por (usuario, año). Se actualiza con cada evento de progreso.
+    """
+
+    # --- Codificación ---
+
+    @staticmethod
+    def _desempaquetar_minutos(datos):
+        minutos = array('H')
+        if datos:
+            minutos.frombytes(datos)
+            if sys.byteorder == 'big':
+                minutos.byteswap()
+        else:
+            minutos.extend([0] * DIAS_ANIO)
+        return minutos
+
+    @staticmethod
+    def _empaquetar_minutos(minutos):
+        if sys.byteorder == 'big':
+            minutos = array('H', minutos)
+            minutos.byteswap()
+        return minutos.tobytes()
+
+    @staticmethod
+    def _indice(fecha):
+        return fecha.timetuple().tm_yday - 1
+
+    # --- Escritura ---
+
+    @classmethod
+    def registrar_dia(cls, usuario_id, fecha, minutos, activo):
+        """Fija los minutos y el bit de actividad de un día"""
+        fila = cls._bloquear(usuario_id, fecha.year)
+        if fila.minutos is None:
+            # Fila nueva: incluye el historial previo del año (y este día)
+            cls._rellenar(fila)
+            return
+
+        indice = cls._indice(fecha)
+        valores = cls._desempaquetar_minutos(fila.minutos)
+        valores[indice] = min(max(minutos, 0), MAX_MINUTOS)
+        fila.minutos = cls._empaquetar_minutos(valores)
+
+        bits = bytearray(fila.actividad)
+        if activo:
+            bits[indice >> 3] |= 1 << (indice & 7)
+        else:
+            bits[indice >> 3] &= ~(1 << (indice & 7)) & 0xFF
+        fila.actividad = bytes(bits)
+
+    @classmethod
+    def _bloquear(cls, usuario_id, anio):
+        db.session.execute(upsert(
+            ActividadAnual,
+            {'usuario_id': usuario_id, 'anio': anio},
+            claves=('usuario_id', 'anio')
+        ))
+        return ActividadAnual.query.filter_by(
+            usuario_id=usuario_id,
+            anio=anio
+        ).populate_existing().with_for_update().one()
+
+    @classmethod
+    def _rellenar(cls, fila):
+        """Construye el mapa de un año a partir del progreso diario"""
+        filas = db.session.query(
+            Progreso.fecha,
+            Progreso.minutos_estudio,
+            Progreso.sesiones_realizadas
+        ).filter(
+            Progreso.usuario_id == fila.usuario_id,
+            Progreso.fecha >= date(fila.anio, 1, 1),
+            Progreso.fecha <= date(fila.anio, 12, 31)
+        ).all()
+
+        valores = cls._desempaquetar_minutos(None)
+        bits = bytearray((DIAS_ANIO + 7) // 8)
+        for fecha, minutos, sesiones in filas:
+            indice = cls._indice(fecha)
+            valores[indice] = min(max(minutos, 0), MAX_MINUTOS)
+            if minutos > 0 or sesiones > 0:
+                bits[indice >> 3] |= 1 << (indice & 7)
+
+        fila.minutos = cls._empaquetar_minutos(valores)
+        fila.actividad = bytes(bits)
+
+    # --- Lectura ---
+
+    @classmethod
+    def obtener_anios(cls, usuario_id, anios):
+        """
+        Devuelve los mapas de los años pedidos con una lectura indexada. Los
+        años sin progreso se devuelven vacíos sin guardar ninguna fila.
+        """
+        filas = {
+            fila.anio: fila
+            for fila in ActividadAnual.query.filter(
+                ActividadAnual.usuario_id == usuario_id,
+                ActividadAnual.anio.in_(anios)
+            ).all()
+        }
+
+        faltantes = [anio for anio in anios if anio not in filas or filas[anio].minutos is None]
+        if faltantes:
+            anio_progreso = extract('year', Progreso.fecha)
+            con_progreso = {
+                anio for (anio,) in db.session.query(anio_progreso).filter(
+                    Progreso.usuario_id == usuario_id,
+                    Progreso.fecha >= date(min(faltantes), 1, 1),
+                    Progreso.fecha <= date(max(faltantes), 12, 31)
+                ).distinct()
+            }
+            # Años con progreso anterior a este índice: se materializan una única vez
+            for anio in faltantes:
+                if anio in con_progreso:
+                    fila = cls._bloquear(usuario_id, anio)
+                    if fila.minutos is None:
+                        cls._rellenar(fila)
+                else:
+                    fila = cls._vacio(usuario_id, anio)
+                filas[anio] = fila
+            if con_progreso:
+                db.session.commit()
+
+        return [cls._serializar(filas[anio]) for anio in anios]
+
+    @classmethod
+    def _vacio(cls, usuario_id, anio):
+        """Mapa sin actividad, fuera de la sesión de base de datos"""
+        return ActividadAnual(
+            usuario_id=usuario_id,
+            anio=anio,
+            minutos=cls._empaquetar_minutos(cls._desempaquetar_minutos(None)),
+            actividad=bytes((DIAS_ANIO + 7) // 8)
+        )
+
+    @staticmethod
+    def _serializar(fila):
+        dias = 366 if date(fila.anio, 12, 31).timetuple().tm_yday == 366 else 365
+        return {
+            'año': fila.anio,
+            'inicio': date(fila.anio, 1, 1).isoformat(),
+            'dias': dias,
+            'minutos': base64.b64encode(fila.minutos[:dias * 2]).decode('ascii'),
+            'actividad': base64.b64encode(fila.actividad).decode('ascii')
+        }
@@ -1,9 +1,15 @@
 # services/meditacion_service.py
-from ..models import db, Sesion, Tecnica, SesionTecnicaParam
+from ..models import db, Sesion, SesionEstado
+from .progreso_service import ProgresoService
+from .tecnica_service import TecnicaService
+from .sesion_activa_service import SesionActivaService
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 class MeditacionService:
-    
+
+    TECNICA_MEDITACION = 'Meditación'
+
     TIPOS_MEDITACION = [
         {'id': 'mindfulness', 'nombre': 'Mindfulness', 'descripcion': 'Meditación de atención plena'},
         {'id': 'respiracion', 'nombre': 'Respiración', 'descripcion': 'Enfoque en la respiración'},
@@ -11,161 +17,132 @@ class MeditacionService:
         {'id': 'loving_kindness', 'nombre': 'Amor y Bondad', 'descripcion': 'Cultivo de compasión'},
         {'id': 'concentracion', 'nombre': 'Concentración', 'descripcion': 'Enfoque en un objeto específico'}
     ]
-    
+
     @classmethod
     def iniciar_meditacion(cls, usuario_id, duracion, tipo_meditacion='mindfulness'):
         """Inicia una nueva sesión de meditación"""
-        
-        # Verificar que no hay otra sesión activa
-        sesion_activa = Sesion.query.filter_by(
-            usuario_id=usuario_id,
-            estado='EnEjecucion'
-        ).first()
-        
-        if sesion_activa:
-            raise ValueError("Ya tienes una sesión en ejecución")
-        
+
         # Validar tipo de meditación
         if not any(tipo['id'] == tipo_meditacion for tipo in cls.TIPOS_MEDITACION):
             raise ValueError("Tipo de meditación no válido")
-        
-        # Obtener o crear técnica Meditación
-        tecnica_meditacion = Tecnica.query.filter_by(nombre='Meditación').first()
-        if not tecnica_meditacion:
-            tecnica_meditacion = Tecnica(
-                nombre='Meditación',
-                categoria='bienestar'
-            )
-            db.session.add(tecnica_meditacion)
-            db.session.flush()
-        
+
         # Crear sesión
         nueva_sesion = Sesion(
             usuario_id=usuario_id,
-            tecnica_id=tecnica_meditacion.tecnica_id,
-            inicio=datetime.utcnow(),
+            tecnica_id=TecnicaService.obtener_id_por_nombre(cls.TECNICA_MEDITACION, 'bienestar'),
+            fecha_inicio=datetime.utcnow(),
+            duracion_real=0,
             es_grupal=False,
             estado='EnEjecucion'
         )
-        
+
+        # Estado específico de la meditación en una sola fila tipada
+        nueva_sesion.estado_tecnica = SesionEstado(
+            tecnica='meditacion',
+            duracion_planificada=int(duracion),
+            tipo_meditacion=tipo_meditacion
+        )
+
         db.session.add(nueva_sesion)
-        db.session.flush()
-        
-        # Agregar parámetros específicos de la meditación
-        parametros = [
-            {'codigo': 'duracion_planificada', 'cantidad': str(duracion)},
-            {'codigo': 'tipo_meditacion', 'cantidad': tipo_meditacion},
-            {'codigo': 'tiempo_inicio', 'cantidad': datetime.utcnow().isoformat()}
-        ]
-        
-        for param in parametros:
-            sesion_param = SesionTecnicaParam(
-                sesion_id=nueva_sesion.sesion_id,
-                codigo=param['codigo'],
-                cantidad=param['cantidad']
-            )
-            db.session.add(sesion_param)
-        
+        # Inserta el registro de sesión activa: falla si el usuario ya tiene una
+        SesionActivaService.tomar(nueva_sesion)
+        ProgresoService.registrar_sesion(nueva_sesion)
         db.session.commit()
-        
+
         return cls._formatear_respuesta_meditacion(nueva_sesion)
-    
+
     @classmethod
     def finalizar_meditacion(cls, usuario_id, sesion_id, completada=True, calificacion=None):
         """Finaliza una sesión de meditación"""
-        
-        sesion = Sesion.query.filter_by(
-            sesion_id=sesion_id,
+
+        sesion = Sesion.query.options(joinedload(Sesion.estado_tecnica)).filter_by(
+            id_sesion=sesion_id,
             usuario_id=usuario_id,
             estado='EnEjecucion'
         ).first()
-        
-        if not sesion:
+
+        if not sesion or not sesion.estado_tecnica or sesion.estado_tecnica.tecnica != 'meditacion':
             raise ValueError("Sesión no encontrada o no está en ejecución")
-        
+        estado = sesion.estado_tecnica
+
         ahora = datetime.utcnow()
-        duracion_real = int((ahora - sesion.inicio).total_seconds() / 60)
-        
+        duracion_real = int((ahora - sesion.fecha_inicio).total_seconds() / 60)
+
         # Actualizar sesión
-        sesion.fin = ahora
+        sesion.fecha_fin = ahora
         sesion.duracion_real = duracion_real
         sesion.estado = 'Completado' if completada else 'Cancelado'
-        
+        SesionActivaService.liberar(sesion)
+
         # Agregar calificación si se proporciona
         if calificacion is not None and 1 <= calificacion <= 5:
-            calificacion_param = SesionTecnicaParam(
-                sesion_id=sesion_id,
-                codigo='calificacion',
-                cantidad=str(calificacion)
-            )
-            db.session.add(calificacion_param)
-        
+            estado.calificacion = calificacion
+
+        ProgresoService.registrar_sesion(sesion)
         db.session.commit()
-        
-        # Obtener parámetros para la respuesta
-        parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-        duracion_planificada = int(parametros.get('duracion_planificada', 0))
-        tipo_meditacion = parametros.get('tipo_meditacion', 'mindfulness')
-        
+
+        duracion_planificada = estado.duracion_planificada or 0
+
         return {
             'message': 'Meditación finalizada exitosamente',
             'sesion_id': sesion_id,
             'completada': completada,
             'duracion_planificada': duracion_planificada,
             'duracion_real': duracion_real,
-            'tipo_meditacion': tipo_meditacion,
-            'calificacion': calificacion,
+            'tipo_meditacion': estado.tipo_meditacion,
+            'calificacion': estado.calificacion,
             'porcentaje_completado': round((duracion_real / duracion_planificada) * 100, 2) if duracion_planificada > 0 else 0
         }
-    
+
     @classmethod
     def obtener_tipos_meditacion(cls):
         """Obtiene los tipos de meditación disponibles"""
         return cls.TIPOS_MEDITACION
-    
+
     @classmethod
     def obtener_historial_meditaciones(cls, usuario_id, limite=20):
         """Obtiene el historial de meditaciones del usuario"""
-        
+
         # Obtener técnica de meditación
-        tecnica_meditacion = Tecnica.query.filter_by(nombre='Meditación').first()
-        if not tecnica_meditacion:
+        tecnica_id = TecnicaService.id_por_nombre(cls.TECNICA_MEDITACION)
+        if not tecnica_id:
             return []
-        
-        sesiones = Sesion.query.filter_by(
-            usuario_id=usuario_id,
-            tecnica_id=tecnica_meditacion.tecnica_id
-        ).order_by(Sesion.inicio.desc()).limit(limite).all()
-        
+
+        # Sesiones y estado en una sola consulta
+        filas = db.session.query(Sesion, SesionEstado).outerjoin(
+            SesionEstado, SesionEstado.id_sesion == Sesion.id_sesion
+        ).filter(
+            Sesion.usuario_id == usuario_id,
+            Sesion.tecnica_id == tecnica_id
+        ).order_by(Sesion.fecha_inicio.desc()).limit(limite).all()
+
         historial = []
-        for sesion in sesiones:
-            parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-            
+        for sesion, estado in filas:
             historial.append({
-                'sesion_id': sesion.sesion_id,
-                'fecha': sesion.inicio.date().isoformat(),
-                'hora_inicio': sesion.inicio.time().strftime('%H:%M'),
+                'sesion_id': sesion.id_sesion,
+                'fecha': sesion.fecha_inicio.date().isoformat(),
+                'hora_inicio': sesion.fecha_inicio.time().strftime('%H:%M'),
                 'duracion_real': sesion.duracion_real,
                 'estado': sesion.estado,
-                'tipo_meditacion': parametros.get('tipo_meditacion', 'mindfulness'),
-                'calificacion': int(parametros['calificacion']) if parametros.get('calificacion') else None
+                'tipo_meditacion': estado.tipo_meditacion if estado else 'mindfulness',
+                'calificacion': estado.calificacion if estado else None
             })
-        
+
         return historial
-    
+
     @classmethod
     def _formatear_respuesta_meditacion(cls, sesion):
         """Formatea la respuesta con información de la meditación"""
-        parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-        
+        estado = sesion.estado_tecnica
+
         ahora = datetime.utcnow()
-        tiempo_transcurrido = (ahora - sesion.inicio).total_seconds() / 60
-        
+        tiempo_transcurrido = (ahora - sesion.fecha_inicio).total_seconds() / 60
+
         return {
-            'sesion_id': sesion.sesion_id,
+            'sesion_id': sesion.id_sesion,
             'estado': sesion.estado,
-            'inicio': sesion.inicio.isoformat(),
-            'duracion_planificada': int(parametros.get('duracion_planificada', 10)),
-            'tipo_meditacion': parametros.get('tipo_meditacion', 'mindfulness'),
+            'inicio': sesion.fecha_inicio.isoformat(),
+            'duracion_planificada': estado.duracion_planificada,
+            'tipo_meditacion': estado.tipo_meditacion,
             'tiempo_transcurrido': round(tiempo_transcurrido, 2)
-        }
\ No newline at end of file
+        }
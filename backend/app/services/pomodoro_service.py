@@ -1,213 +1,240 @@
 # services/pomodoro_service.py
-from ..models import db, Sesion, Tecnica, SesionTecnicaParam
-from datetime import datetime, timedelta
-import uuid
+from ..models import db, Sesion, SesionEstado
+from .progreso_service import ProgresoService
+from .tecnica_service import TecnicaService
+from .sesion_activa_service import SesionActivaService
+from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 class PomodoroService:
-    TECNICA_POMODORO_ID = 'pomodoro'  # Asegúrate de que esta técnica exista en tu DB
-    
+    """
+    Motor de Pomodoro sin escrituras por fase. Solo se guardan el inicio de la
+    sesión, la configuración y los intervalos de pausa; la fase en curso, los
+    ciclos completados y el tiempo restante se calculan a partir del reloj.
+    Se escribe únicamente al iniciar, pausar, reanudar y finalizar.
+    """
+
+    TECNICA_POMODORO = 'Pomodoro'
+
     @classmethod
     def iniciar_pomodoro(cls, usuario_id, duracion_trabajo=25, duracion_descanso=5, ciclos_objetivo=4, modo_no_distraccion=False):
         """Inicia una nueva sesión de Pomodoro"""
-        
-        # Verificar que no hay otra sesión activa
-        sesion_activa = Sesion.query.filter_by(
-            usuario_id=usuario_id,
-            estado='EnEjecucion'
-        ).first()
-        
-        if sesion_activa:
-            raise ValueError("Ya tienes una sesión en ejecución")
-        
-        # Obtener o crear técnica Pomodoro
-        tecnica_pomodoro = Tecnica.query.filter_by(nombre='Pomodoro').first()
-        if not tecnica_pomodoro:
-            tecnica_pomodoro = Tecnica(
-                nombre='Pomodoro',
-                categoria='productividad'
-            )
-            db.session.add(tecnica_pomodoro)
-            db.session.flush()
-        
+
+        if int(duracion_trabajo) <= 0 or int(duracion_descanso) < 0 or int(ciclos_objetivo) <= 0:
+            raise ValueError("Configuración de Pomodoro no válida")
+
         # Crear sesión
         nueva_sesion = Sesion(
             usuario_id=usuario_id,
-            tecnica_id=tecnica_pomodoro.tecnica_id,
-            inicio=datetime.utcnow(),
+            tecnica_id=TecnicaService.obtener_id_por_nombre(cls.TECNICA_POMODORO, 'productividad'),
+            fecha_inicio=datetime.utcnow(),
+            duracion_real=0,
             es_grupal=False,
             estado='EnEjecucion'
         )
-        
+
+        # Configuración del temporizador en una sola fila tipada
+        nueva_sesion.estado_tecnica = SesionEstado(
+            tecnica='pomodoro',
+            duracion_trabajo=int(duracion_trabajo),
+            duracion_descanso=int(duracion_descanso),
+            ciclos_objetivo=int(ciclos_objetivo),
+            ciclos_completados=0,
+            fase_actual='trabajo',
+            modo_no_distraccion=bool(modo_no_distraccion),
+            pausas=[]
+        )
+
         db.session.add(nueva_sesion)
-        db.session.flush()
-        
-        # Agregar parámetros específicos del Pomodoro
-        parametros = [
-            {'codigo': 'duracion_trabajo', 'cantidad': str(duracion_trabajo)},
-            {'codigo': 'duracion_descanso', 'cantidad': str(duracion_descanso)},
-            {'codigo': 'ciclos_objetivo', 'cantidad': str(ciclos_objetivo)},
-            {'codigo': 'ciclos_completados', 'cantidad': '0'},
-            {'codigo': 'fase_actual', 'cantidad': 'trabajo'},
-            {'codigo': 'tiempo_inicio_fase', 'cantidad': datetime.utcnow().isoformat()},
-            {'codigo': 'modo_no_distraccion', 'cantidad': str(modo_no_distraccion)}
-        ]
-        
-        for param in parametros:
-            sesion_param = SesionTecnicaParam(
-                sesion_id=nueva_sesion.sesion_id,
-                codigo=param['codigo'],
-                cantidad=param['cantidad']
-            )
-            db.session.add(sesion_param)
-        
+        # Inserta el registro de sesión activa: falla si el usuario ya tiene una
+        SesionActivaService.tomar(nueva_sesion)
+        ProgresoService.registrar_sesion(nueva_sesion)
         db.session.commit()
-        
+
         return cls._formatear_respuesta_pomodoro(nueva_sesion)
-    
+
+    # --- Motor ---
+
+    @classmethod
+    def calcular_estado(cls, sesion, ahora=None):
+        """
+        Deriva la fase de un Pomodoro en un instante. Cálculo puro: no consulta
+        ni modifica la base de datos.
+        """
+        estado = sesion.estado_tecnica
+        if sesion.estado != 'EnEjecucion' and sesion.fecha_fin:
+            ahora = sesion.fecha_fin
+        ahora = ahora or datetime.utcnow()
+
+        trabajo = estado.duracion_trabajo * 60
+        descanso = estado.duracion_descanso * 60
+        ciclos_objetivo = estado.ciclos_objetivo
+        # El último ciclo termina con el trabajo: no hay descanso final
+        duracion_total = ciclos_objetivo * trabajo + (ciclos_objetivo - 1) * descanso
+
+        activo = (ahora - sesion.fecha_inicio).total_seconds() - estado.segundos_pausados(ahora)
+        activo = min(max(activo, 0), duracion_total)
+
+        if activo >= duracion_total:
+            fase = 'completado'
+            ciclos_completados = ciclos_objetivo
+            transcurrido_fase = 0
+            restante_fase = 0
+        else:
+            ciclo, posicion = divmod(activo, trabajo + descanso)
+            if posicion < trabajo:
+                fase = 'trabajo'
+                ciclos_completados = int(ciclo)
+                transcurrido_fase = posicion
+                restante_fase = trabajo - posicion
+            else:
+                fase = 'descanso'
+                ciclos_completados = int(ciclo) + 1
+                transcurrido_fase = posicion - trabajo
+                restante_fase = trabajo + descanso - posicion
+
+        return {
+            'fase_actual': fase,
+            'ciclos_completados': ciclos_completados,
+            'segundos_transcurridos_fase': round(transcurrido_fase, 1),
+            'segundos_restantes_fase': round(restante_fase, 1),
+            'segundos_activos': round(activo, 1),
+            'segundos_restantes_total': round(duracion_total - activo, 1),
+            'pausado': estado.pausado_desde is not None
+        }
+
+    # --- Operaciones ---
+
+    @classmethod
+    def _obtener_sesion(cls, usuario_id, sesion_id, solo_en_ejecucion=True):
+        """Sesión y estado del temporizador en una única consulta"""
+        query = Sesion.query.options(joinedload(Sesion.estado_tecnica)).filter_by(
+            id_sesion=sesion_id,
+            usuario_id=usuario_id
+        )
+        if solo_en_ejecucion:
+            query = query.filter_by(estado='EnEjecucion')
+        sesion = query.first()
+
+        if not sesion or not sesion.estado_tecnica or sesion.estado_tecnica.tecnica != 'pomodoro':
+            if solo_en_ejecucion:
+                raise ValueError("Sesión no encontrada o no está en ejecución")
+            raise ValueError("Sesión no encontrada")
+        return sesion
+
     @classmethod
     def completar_ciclo(cls, usuario_id, sesion_id, tipo_ciclo):
-        """Completa un ciclo de trabajo o descanso"""
-        
-        sesion = Sesion.query.filter_by(
-            sesion_id=sesion_id,
-            usuario_id=usuario_id,
-            estado='EnEjecucion'
-        ).first()
-        
-        if not sesion:
-            raise ValueError("Sesión no encontrada o no está en ejecución")
-        
-        # Obtener parámetros actuales
-        parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-        
-        ahora = datetime.utcnow()
-        tiempo_inicio_fase = datetime.fromisoformat(parametros['tiempo_inicio_fase'])
-        tiempo_transcurrido = (ahora - tiempo_inicio_fase).total_seconds() / 60  # minutos
-        
-        resultado = {
-            'ciclo_completado': False,
-            'fase_siguiente': None,
-            'tiempo_transcurrido': tiempo_transcurrido,
-            'ciclos_completados': int(parametros.get('ciclos_completados', 0))
+        """
+        Indica si la fase `tipo_ciclo` ya terminó. Las fases avanzan solas con
+        el reloj, así que no se escribe nada.
+        """
+        sesion = cls._obtener_sesion(usuario_id, sesion_id)
+        calculado = cls.calcular_estado(sesion)
+
+        return {
+            'ciclo_completado': calculado['fase_actual'] != tipo_ciclo,
+            'fase_siguiente': calculado['fase_actual'] if calculado['fase_actual'] != tipo_ciclo else None,
+            'tiempo_transcurrido': round(calculado['segundos_transcurridos_fase'] / 60, 2),
+            'ciclos_completados': calculado['ciclos_completados']
         }
-        
-        if tipo_ciclo == 'trabajo':
-            # Completar fase de trabajo
-            ciclos_completados = int(parametros['ciclos_completados']) + 1
-            
-            # Actualizar ciclos completados
-            param_ciclos = next((p for p in sesion.parametros if p.codigo == 'ciclos_completados'), None)
-            if param_ciclos:
-                param_ciclos.cantidad = str(ciclos_completados)
-            
-            # Cambiar a fase de descanso
-            param_fase = next((p for p in sesion.parametros if p.codigo == 'fase_actual'), None)
-            if param_fase:
-                param_fase.cantidad = 'descanso'
-            
-            # Actualizar tiempo de inicio de fase
-            param_tiempo = next((p for p in sesion.parametros if p.codigo == 'tiempo_inicio_fase'), None)
-            if param_tiempo:
-                param_tiempo.cantidad = ahora.isoformat()
-            
-            resultado.update({
-                'ciclo_completado': True,
-                'fase_siguiente': 'descanso',
-                'ciclos_completados': ciclos_completados
-            })
-            
-        elif tipo_ciclo == 'descanso':
-            # Completar fase de descanso, volver a trabajo
-            param_fase = next((p for p in sesion.parametros if p.codigo == 'fase_actual'), None)
-            if param_fase:
-                param_fase.cantidad = 'trabajo'
-            
-            # Actualizar tiempo de inicio de fase
-            param_tiempo = next((p for p in sesion.parametros if p.codigo == 'tiempo_inicio_fase'), None)
-            if param_tiempo:
-                param_tiempo.cantidad = ahora.isoformat()
-            
-            resultado.update({
-                'fase_siguiente': 'trabajo'
-            })
-        
+
+    @classmethod
+    def congelar(cls, estado, calculado):
+        """Guarda la fase calculada para consultas sobre sesiones no activas"""
+        estado.ciclos_completados = calculado['ciclos_completados']
+        estado.fase_actual = calculado['fase_actual']
+
+    @classmethod
+    def pausar_pomodoro(cls, usuario_id, sesion_id):
+        """Pausa el temporizador (el tiempo en pausa no cuenta para las fases)"""
+        sesion = cls._obtener_sesion(usuario_id, sesion_id)
+        estado = sesion.estado_tecnica
+        if estado.pausado_desde:
+            raise ValueError("El Pomodoro ya está en pausa")
+
+        ahora = datetime.utcnow()
+        cls.congelar(estado, cls.calcular_estado(sesion, ahora))
+        estado.pausado_desde = ahora
+        sesion.registrar_latido(ahora)
+        db.session.commit()
+
+        return cls._formatear_respuesta_pomodoro(sesion, ahora)
+
+    @classmethod
+    def reanudar_pomodoro(cls, usuario_id, sesion_id):
+        """Reanuda el temporizador cerrando el intervalo de pausa"""
+        sesion = cls._obtener_sesion(usuario_id, sesion_id)
+        estado = sesion.estado_tecnica
+        if not estado.pausado_desde:
+            raise ValueError("El Pomodoro no está en pausa")
+
+        ahora = datetime.utcnow()
+        estado.cerrar_pausa(ahora)
+        sesion.registrar_latido(ahora)
         db.session.commit()
-        return resultado
-    
+
+        return cls._formatear_respuesta_pomodoro(sesion, ahora)
+
     @classmethod
     def finalizar_pomodoro(cls, usuario_id, sesion_id, completado_totalmente=False):
         """Finaliza una sesión de Pomodoro"""
-        
-        sesion = Sesion.query.filter_by(
-            sesion_id=sesion_id,
-            usuario_id=usuario_id,
-            estado='EnEjecucion'
-        ).first()
-        
-        if not sesion:
-            raise ValueError("Sesión no encontrada o no está en ejecución")
-        
+
+        sesion = cls._obtener_sesion(usuario_id, sesion_id)
+        estado = sesion.estado_tecnica
+
         ahora = datetime.utcnow()
-        duracion_total = int((ahora - sesion.inicio).total_seconds() / 60)
-        
+        estado.cerrar_pausa(ahora)
+        calculado = cls.calcular_estado(sesion, ahora)
+        cls.congelar(estado, calculado)
+
+        # La duración cuenta solo el tiempo activo (sin pausas)
+        duracion_total = int(calculado['segundos_activos'] / 60)
+
         # Actualizar sesión
-        sesion.fin = ahora
+        sesion.fecha_fin = ahora
         sesion.duracion_real = duracion_total
         sesion.estado = 'Completado' if completado_totalmente else 'Cancelado'
-        
+        SesionActivaService.liberar(sesion)
+
+        ProgresoService.registrar_sesion(sesion)
         db.session.commit()
-        
-        # Obtener estadísticas finales
-        parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-        ciclos_completados = int(parametros.get('ciclos_completados', 0))
-        ciclos_objetivo = int(parametros.get('ciclos_objetivo', 4))
-        modo_no_distraccion = parametros.get('modo_no_distraccion', 'False') == 'True'
-        
+
         return {
             'message': 'Pomodoro finalizado exitosamente',
             'sesion_id': sesion_id,
             'completado_totalmente': completado_totalmente,
-            'ciclos_completados': ciclos_completados,
-            'ciclos_objetivo': ciclos_objetivo,
+            'ciclos_completados': estado.ciclos_completados,
+            'ciclos_objetivo': estado.ciclos_objetivo,
             'duracion_total_minutos': duracion_total,
-            'modo_no_distraccion': modo_no_distraccion,
-            'porcentaje_completado': round((ciclos_completados / ciclos_objetivo) * 100, 2)
+            'modo_no_distraccion': estado.modo_no_distraccion,
+            'porcentaje_completado': round((estado.ciclos_completados / estado.ciclos_objetivo) * 100, 2) if estado.ciclos_objetivo else 0
         }
-    
+
     @classmethod
     def obtener_estado_pomodoro(cls, usuario_id, sesion_id):
-        """Obtiene el estado actual de un Pomodoro en ejecución"""
-        
-        sesion = Sesion.query.filter_by(
-            sesion_id=sesion_id,
-            usuario_id=usuario_id
-        ).first()
-        
-        if not sesion:
-            raise ValueError("Sesión no encontrada")
-        
+        """Obtiene el estado actual de un Pomodoro (solo lectura)"""
+
+        sesion = cls._obtener_sesion(usuario_id, sesion_id, solo_en_ejecucion=False)
         return cls._formatear_respuesta_pomodoro(sesion)
-    
+
     @classmethod
-    def _formatear_respuesta_pomodoro(cls, sesion):
+    def _formatear_respuesta_pomodoro(cls, sesion, ahora=None):
         """Formatea la respuesta con información del Pomodoro"""
-        parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-        
-        ahora = datetime.utcnow()
-        tiempo_transcurrido = 0
-        if parametros.get('tiempo_inicio_fase'):
-            tiempo_inicio_fase = datetime.fromisoformat(parametros['tiempo_inicio_fase'])
-            tiempo_transcurrido = (ahora - tiempo_inicio_fase).total_seconds() / 60
-        
+        estado = sesion.estado_tecnica
+        calculado = cls.calcular_estado(sesion, ahora)
+
         return {
-            'sesion_id': sesion.sesion_id,
+            'sesion_id': sesion.id_sesion,
             'estado': sesion.estado,
-            'inicio': sesion.inicio.isoformat(),
-            'duracion_trabajo': int(parametros.get('duracion_trabajo', 25)),
-            'duracion_descanso': int(parametros.get('duracion_descanso', 5)),
-            'ciclos_objetivo': int(parametros.get('ciclos_objetivo', 4)),
-            'ciclos_completados': int(parametros.get('ciclos_completados', 0)),
-            'fase_actual': parametros.get('fase_actual', 'trabajo'),
-            'tiempo_transcurrido_fase': round(tiempo_transcurrido, 2),
-            'modo_no_distraccion': parametros.get('modo_no_distraccion', 'False') == 'True'
-        }
\ No newline at end of file
+            'inicio': sesion.fecha_inicio.isoformat(),
+            'duracion_trabajo': estado.duracion_trabajo,
+            'duracion_descanso': estado.duracion_descanso,
+            'ciclos_objetivo': estado.ciclos_objetivo,
+            'ciclos_completados': calculado['ciclos_completados'],
+            'fase_actual': calculado['fase_actual'],
+            'tiempo_transcurrido_fase': round(calculado['segundos_transcurridos_fase'] / 60, 2),
+            'tiempo_restante_fase': round(calculado['segundos_restantes_fase'] / 60, 2),
+            'segundos_restantes_fase': calculado['segundos_restantes_fase'],
+            'pausado': calculado['pausado'],
+            'modo_no_distraccion': estado.modo_no_distraccion
+        }
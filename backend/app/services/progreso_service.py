@@ -0,0 +1,469 @@
+# services/progreso_service.py
+from ..models import db, Progreso, ProgresoSemana, ProgresoMes, ActividadAnual, Sesion, Tarea, Usuario
+from ..utils.upsert import upsert, upsert_desde_select, uuid_sql
+from ..utils.fechas import asegurar_dia, dia_local
+from .racha_service import RachaService
+from .estadisticas_service import EstadisticasService
+from .mapa_actividad_service import MapaActividadService
+from datetime import date, timedelta
+from sqlalchemy import func, select, update, literal, union_all, true
+
+class ProgresoService:
+    """
+    Mantiene el progreso diario a partir de los eventos que cambian el estado
+    de sesiones y tareas. Cada evento aplica un incremento atómico sobre la fila
+    (usuario_id, fecha) dentro de la misma transacción que el cambio original.
+    """
+
+    @classmethod
+    def registrar_delta(cls, usuario_id, fecha, minutos=0, tareas=0, sesiones=0):
+        """Aplica un incremento atómico al progreso de un usuario en un día"""
+        # Todo evento de sesiones o tareas deja obsoletas las estadísticas generales
+        EstadisticasService.invalidar_al_confirmar(usuario_id)
+        if not (minutos or tareas or sesiones):
+            return
+
+        db.session.execute(upsert(
+            Progreso,
+            {
+                'usuario_id': usuario_id,
+                'fecha': fecha,
+                'minutos_estudio': minutos,
+                'tareas_completadas': tareas,
+                'sesiones_realizadas': sesiones
+            },
+            claves=('usuario_id', 'fecha'),
+            sumar=('minutos_estudio', 'tareas_completadas', 'sesiones_realizadas')
+        ))
+        _, mes = cls.actualizar_agregados(usuario_id, fecha)
+
+        dia = mes.dias[fecha.day - 1]
+        anterior = [dia[0] - minutos, dia[1] - tareas, dia[2] - sesiones]
+        RachaService.registrar_dia(usuario_id, fecha, cls.dia_activo(anterior), cls.dia_activo(dia))
+        MapaActividadService.registrar_dia(usuario_id, fecha, dia[0], cls.dia_activo(dia))
+
+    # --- Agregados semanales y mensuales ---
+
+    @staticmethod
+    def limites_semana(fecha):
+        inicio = fecha - timedelta(days=fecha.weekday())  # Lunes
+        return inicio, inicio + timedelta(days=6)
+
+    @staticmethod
+    def limites_mes(anio, mes):
+        primer_dia = date(anio, mes, 1)
+        if mes == 12:
+            siguiente = date(anio + 1, 1, 1)
+        else:
+            siguiente = date(anio, mes + 1, 1)
+        return primer_dia, siguiente - timedelta(days=1)
+
+    @staticmethod
+    def dia_activo(valores):
+        """valores = [minutos, tareas, sesiones]"""
+        return valores[0] > 0 or valores[2] > 0
+
+    @classmethod
+    def racha_maxima(cls, dias):
+        """Racha más larga de días consecutivos con actividad dentro de un vector de días"""
+        racha_maxima = 0
+        racha = 0
+        for d in dias:
+            if cls.dia_activo(d):
+                racha += 1
+                racha_maxima = max(racha_maxima, racha)
+            else:
+                racha = 0
+        return racha_maxima
+
+    @classmethod
+    def actualizar_agregados(cls, usuario_id, fecha):
+        """
+        Recalcula las filas de semana y mes que contienen `fecha` a partir de
+        los (como mucho 37) registros diarios de ese rango. Las filas agregadas
+        se bloquean primero para serializar escritores concurrentes del mismo
+        usuario y periodo.
+        """
+        inicio_semana, fin_semana = cls.limites_semana(fecha)
+        primer_dia, ultimo_dia = cls.limites_mes(fecha.year, fecha.month)
+
+        db.session.execute(upsert(
+            ProgresoSemana,
+            {'usuario_id': usuario_id, 'inicio_semana': inicio_semana},
+            claves=('usuario_id', 'inicio_semana')
+        ))
+        db.session.execute(upsert(
+            ProgresoMes,
+            {'usuario_id': usuario_id, 'anio': fecha.year, 'mes': fecha.month},
+            claves=('usuario_id', 'anio', 'mes')
+        ))
+
+        semana = ProgresoSemana.query.filter_by(
+            usuario_id=usuario_id,
+            inicio_semana=inicio_semana
+        ).populate_existing().with_for_update().one()
+        mes = ProgresoMes.query.filter_by(
+            usuario_id=usuario_id,
+            anio=fecha.year,
+            mes=fecha.month
+        ).populate_existing().with_for_update().one()
+
+        filas = db.session.query(
+            Progreso.fecha,
+            Progreso.minutos_estudio,
+            Progreso.tareas_completadas,
+            Progreso.sesiones_realizadas
+        ).filter(
+            Progreso.usuario_id == usuario_id,
+            Progreso.fecha >= min(inicio_semana, primer_dia),
+            Progreso.fecha <= max(fin_semana, ultimo_dia)
+        ).with_for_update().all()
+        por_fecha = {f: [m, t, s] for f, m, t, s in filas}
+
+        dias_semana = [
+            por_fecha.get(inicio_semana + timedelta(days=i), [0, 0, 0])
+            for i in range(7)
+        ]
+        semana.dias = dias_semana
+        semana.minutos_estudio = sum(d[0] for d in dias_semana)
+        semana.tareas_completadas = sum(d[1] for d in dias_semana)
+        semana.sesiones_realizadas = sum(d[2] for d in dias_semana)
+
+        dias_mes = [
+            por_fecha.get(primer_dia + timedelta(days=i), [0, 0, 0])
+            for i in range((ultimo_dia - primer_dia).days + 1)
+        ]
+        mes.dias = dias_mes
+        mes.minutos_estudio = sum(d[0] for d in dias_mes)
+        mes.tareas_completadas = sum(d[1] for d in dias_mes)
+        mes.sesiones_realizadas = sum(d[2] for d in dias_mes)
+        mes.dias_activos = sum(1 for d in dias_mes if cls.dia_activo(d))
+        mes.racha_dias = cls.racha_maxima(dias_mes)
+
+        return semana, mes
+
+    @classmethod
+    def obtener_semana(cls, usuario_id, inicio_semana):
+        """Devuelve el agregado semanal, materializándolo si aún no existe"""
+        semana = ProgresoSemana.query.filter_by(
+            usuario_id=usuario_id,
+            inicio_semana=inicio_semana
+        ).first()
+        if not semana:
+            semana, _ = cls.actualizar_agregados(usuario_id, inicio_semana)
+            db.session.commit()
+        return semana
+
+    @classmethod
+    def obtener_mes(cls, usuario_id, anio, mes):
+        """Devuelve el agregado mensual, materializándolo si aún no existe"""
+        progreso_mes = ProgresoMes.query.filter_by(
+            usuario_id=usuario_id,
+            anio=anio,
+            mes=mes
+        ).first()
+        if not progreso_mes:
+            _, progreso_mes = cls.actualizar_agregados(usuario_id, date(anio, mes, 1))
+            db.session.commit()
+        return progreso_mes
+
+    # --- Sesiones ---
+
+    @staticmethod
+    def aporte_sesion(sesion):
+        """Minutos y sesiones con los que una sesión contribuye al progreso"""
+        if sesion.estado == 'Completado':
+            return (sesion.duracion_real or 0, 1)
+        return (0, 0)
+
+    @staticmethod
+    def dia_sesion(sesion):
+        return asegurar_dia(sesion)
+
+    @classmethod
+    def registrar_sesion(cls, sesion, aporte_anterior=(0, 0)):
+        """Registra el cambio de aporte de una sesión respecto a su estado anterior"""
+        minutos, sesiones = cls.aporte_sesion(sesion)
+        cls.registrar_delta(
+            sesion.usuario_id,
+            cls.dia_sesion(sesion),
+            minutos=minutos - aporte_anterior[0],
+            sesiones=sesiones - aporte_anterior[1]
+        )
+
+    @classmethod
+    def retirar_sesion(cls, sesion):
+        """Descuenta el aporte de una sesión que se va a eliminar"""
+        minutos, sesiones = cls.aporte_sesion(sesion)
+        cls.registrar_delta(sesion.usuario_id, cls.dia_sesion(sesion), minutos=-minutos, sesiones=-sesiones)
+
+    # --- Tareas ---
+
+    @staticmethod
+    def aporte_tarea(tarea):
+        return 1 if tarea.estado == 'Completado' else 0
+
+    @staticmethod
+    def dia_tarea(tarea):
+        return asegurar_dia(tarea)
+
+    @classmethod
+    def registrar_tarea(cls, tarea, aporte_anterior=0):
+        """Registra el cambio de aporte de una tarea respecto a su estado anterior"""
+        cls.registrar_delta(
+            tarea.usuario_id,
+            cls.dia_tarea(tarea),
+            tareas=cls.aporte_tarea(tarea) - aporte_anterior
+        )
+
+    @classmethod
+    def retirar_tarea(cls, tarea):
+        """Descuenta el aporte de una tarea que se va a eliminar"""
+        cls.registrar_delta(tarea.usuario_id, cls.dia_tarea(tarea), tareas=-cls.aporte_tarea(tarea))
+
+    # --- Reconciliación ---
+
+    @classmethod
+    def reconciliar_dia(cls, usuario_id, fecha):
+        """
+        Recalcula el progreso de un día desde sesiones y tareas y corrige la
+        diferencia. Solo es necesaria si algún cambio no pasó por los eventos.
+        """
+        # Búsquedas por igualdad sobre los índices (usuario_id, dia, estado)
+        minutos, sesiones = db.session.query(
+            func.coalesce(func.sum(Sesion.duracion_real), 0),
+            func.count(Sesion.id_sesion)
+        ).filter(
+            Sesion.usuario_id == usuario_id,
+            Sesion.dia == fecha,
+            Sesion.estado == 'Completado'
+        ).one()
+
+        tareas = db.session.query(func.count(Tarea.id_tarea)).filter(
+            Tarea.usuario_id == usuario_id,
+            Tarea.dia == fecha,
+            Tarea.estado == 'Completado'
+        ).scalar()
+
+        actual = Progreso.query.filter_by(usuario_id=usuario_id, fecha=fecha).first()
+        actual_minutos = actual.minutos_estudio if actual else 0
+        actual_tareas = actual.tareas_completadas if actual else 0
+        actual_sesiones = actual.sesiones_realizadas if actual else 0
+
+        cls.registrar_delta(
+            usuario_id,
+            fecha,
+            minutos=int(minutos) - actual_minutos,
+            tareas=tareas - actual_tareas,
+            sesiones=sesiones - actual_sesiones
+        )
+
+        if actual:
+            db.session.refresh(actual)
+            return actual
+
+        progreso = Progreso.query.filter_by(usuario_id=usuario_id, fecha=fecha).first()
+        if not progreso:
+            # Día sin actividad: se materializa la fila vacía
+            progreso = Progreso(
+                usuario_id=usuario_id,
+                fecha=fecha,
+                minutos_estudio=0,
+                tareas_completadas=0,
+                sesiones_realizadas=0
+            )
+            db.session.add(progreso)
+        return progreso
+
+    # --- Recálculo masivo ---
+
+    @classmethod
+    def recalcular_periodo(cls, desde, hasta):
+        """
+        Reconstruye el progreso diario de todos los usuarios entre `desde` y
+        `hasta` (incluidos) con sentencias agrupadas, sin recorrer usuarios.
+        Deja las semanas y meses que tocan el periodo recalculados y los mapas
+        de actividad de esos años pendientes de rellenar. No confirma la
+        transacción. Devuelve las filas de progreso escritas.
+        """
+        # 1. Poner a cero los contadores del periodo (días que ya no tienen actividad)
+        Progreso.query.filter(
+            Progreso.fecha >= desde,
+            Progreso.fecha <= hasta
+        ).update({
+            Progreso.minutos_estudio: 0,
+            Progreso.tareas_completadas: 0,
+            Progreso.sesiones_realizadas: 0
+        }, synchronize_session=False)
+
+        # 2. Un único INSERT ... SELECT agrupado por (usuario, día)
+        sesiones = select(
+            Sesion.usuario_id.label('usuario_id'),
+            Sesion.dia.label('fecha'),
+            func.sum(Sesion.duracion_real).label('minutos'),
+            literal(0).label('tareas'),
+            func.count(Sesion.id_sesion).label('sesiones')
+        ).where(
+            Sesion.estado == 'Completado',
+            Sesion.dia >= desde,
+            Sesion.dia <= hasta
+        ).group_by(Sesion.usuario_id, Sesion.dia)
+
+        tareas = select(
+            Tarea.usuario_id.label('usuario_id'),
+            Tarea.dia.label('fecha'),
+            literal(0).label('minutos'),
+            func.count(Tarea.id_tarea).label('tareas'),
+            literal(0).label('sesiones')
+        ).where(
+            Tarea.estado == 'Completado',
+            Tarea.dia >= desde,
+            Tarea.dia <= hasta
+        ).group_by(Tarea.usuario_id, Tarea.dia)
+
+        eventos = union_all(sesiones, tareas).subquery()
+        consulta = select(
+            uuid_sql(),
+            eventos.c.usuario_id,
+            eventos.c.fecha,
+            func.sum(eventos.c.minutos),
+            func.sum(eventos.c.tareas),
+            func.sum(eventos.c.sesiones)
+        ).where(true()).group_by(eventos.c.usuario_id, eventos.c.fecha)
+
+        resultado = db.session.execute(upsert_desde_select(
+            Progreso,
+            ['id_progreso', 'usuario_id', 'fecha', 'minutos_estudio', 'tareas_completadas', 'sesiones_realizadas'],
+            consulta,
+            claves=('usuario_id', 'fecha'),
+            reemplazar=('minutos_estudio', 'tareas_completadas', 'sesiones_realizadas')
+        ))
+
+        cls.reconstruir_agregados(desde, hasta)
+
+        # Los mapas anuales se rellenan de nuevo desde Progreso al usarse
+        ActividadAnual.query.filter(
+            ActividadAnual.anio >= desde.year,
+            ActividadAnual.anio <= hasta.year
+        ).update({
+            ActividadAnual.minutos: None,
+            ActividadAnual.actividad: None
+        }, synchronize_session=False)
+
+        return max(resultado.rowcount, 0)
+
+    @classmethod
+    def rellenar_dias_pendientes(cls, tamano_lote=1000):
+        """
+        Calcula la columna `dia` de las sesiones y tareas creadas antes de que
+        existiera, usando la zona horaria de cada usuario. Se ejecuta en lotes
+        y confirma cada uno. Devuelve el número de filas actualizadas.
+        """
+        total = 0
+        for modelo, clave, momento in (
+            (Sesion, Sesion.id_sesion, Sesion.fecha_inicio),
+            (Tarea, Tarea.id_tarea, Tarea.fecha_creacion)
+        ):
+            while True:
+                filas = db.session.query(clave, momento, Usuario.zona_horaria).join(
+                    Usuario, Usuario.id_usuario == modelo.usuario_id
+                ).filter(modelo.dia.is_(None)).limit(tamano_lote).all()
+                if not filas:
+                    break
+                db.session.execute(update(modelo), [
+                    {clave.key: id_fila, 'dia': dia_local(fecha, zona_horaria)}
+                    for id_fila, fecha, zona_horaria in filas
+                ])
+                db.session.commit()
+                total += len(filas)
+        return total
+
+    @classmethod
+    def reconstruir_agregados(cls, desde, hasta):
+        """
+        Recalcula en una pasada ordenada las semanas y meses de todos los
+        usuarios que se solapan con el periodo [desde, hasta].
+        """
+        inicio_semanas, _ = cls.limites_semana(desde)
+        _, fin_semanas = cls.limites_semana(hasta)
+        primer_dia, _ = cls.limites_mes(desde.year, desde.month)
+        _, ultimo_dia = cls.limites_mes(hasta.year, hasta.month)
+        rango_desde = min(inicio_semanas, primer_dia)
+        rango_hasta = max(fin_semanas, ultimo_dia)
+
+        filas = db.session.query(
+            Progreso.usuario_id,
+            Progreso.fecha,
+            Progreso.minutos_estudio,
+            Progreso.tareas_completadas,
+            Progreso.sesiones_realizadas
+        ).filter(
+            Progreso.fecha >= rango_desde,
+            Progreso.fecha <= rango_hasta
+        ).order_by(Progreso.usuario_id, Progreso.fecha).all()
+
+        semanas = {}
+        meses = {}
+        for usuario_id, fecha, minutos, tareas, sesiones in filas:
+            valores = [minutos, tareas, sesiones]
+
+            inicio_semana, _ = cls.limites_semana(fecha)
+            if inicio_semanas <= inicio_semana <= fin_semanas:
+                vector = semanas.setdefault((usuario_id, inicio_semana), [[0, 0, 0] for _ in range(7)])
+                vector[fecha.weekday()] = valores
+
+            if primer_dia <= fecha <= ultimo_dia:
+                clave = (usuario_id, fecha.year, fecha.month)
+                if clave not in meses:
+                    inicio_mes, fin_mes = cls.limites_mes(fecha.year, fecha.month)
+                    meses[clave] = [[0, 0, 0] for _ in range((fin_mes - inicio_mes).days + 1)]
+                meses[clave][fecha.day - 1] = valores
+
+        # Se reemplazan las filas del periodo; las que ya no tienen días desaparecen
+        ProgresoSemana.query.filter(
+            ProgresoSemana.inicio_semana >= inicio_semanas,
+            ProgresoSemana.inicio_semana <= fin_semanas
+        ).delete(synchronize_session=False)
+        ProgresoMes.query.filter(
+            ProgresoMes.anio * 12 + ProgresoMes.mes >= desde.year * 12 + desde.month,
+            ProgresoMes.anio * 12 + ProgresoMes.mes <= hasta.year * 12 + hasta.month
+        ).delete(synchronize_session=False)
+
+        filas_semana = [
+            {
+                'usuario_id': usuario_id,
+                'inicio_semana': inicio_semana,
+                'minutos_estudio': sum(d[0] for d in dias),
+                'tareas_completadas': sum(d[1] for d in dias),
+                'sesiones_realizadas': sum(d[2] for d in dias),
+                'dias': dias
+            }
+            for (usuario_id, inicio_semana), dias in semanas.items()
+        ]
+        filas_mes = [
+            {
+                'usuario_id': usuario_id,
+                'anio': anio,
+                'mes': mes,
+                'minutos_estudio': sum(d[0] for d in dias),
+                'tareas_completadas': sum(d[1] for d in dias),
+                'sesiones_realizadas': sum(d[2] for d in dias),
+                'dias_activos': sum(1 for d in dias if cls.dia_activo(d)),
+                'racha_dias': cls.racha_maxima(dias),
+                'dias': dias
+            }
+            for (usuario_id, anio, mes), dias in meses.items()
+        ]
+
+        columnas_semana = ('minutos_estudio', 'tareas_completadas', 'sesiones_realizadas', 'dias')
+        columnas_mes = columnas_semana + ('dias_activos', 'racha_dias')
+        for i in range(0, len(filas_semana), 1000):
+            db.session.execute(upsert(
+                ProgresoSemana, filas_semana[i:i + 1000],
+                claves=('usuario_id', 'inicio_semana'), reemplazar=columnas_semana
+            ))
+        for i in range(0, len(filas_mes), 1000):
+            db.session.execute(upsert(
+                ProgresoMes, filas_mes[i:i + 1000],
+                claves=('usuario_id', 'anio', 'mes'), reemplazar=columnas_mes
+            ))
@@ -0,0 +1,101 @@
+# services/racha_service.py
+from ..models import db, Progreso, RachaUsuario
+from ..utils.upsert import upsert
+from datetime import timedelta
+from sqlalchemy import or_
+
+class RachaService:
+    """
+    Índice de rachas por usuario. Los eventos de progreso lo actualizan en O(1)
+    cuando un día pasa a tener actividad; los casos raros (días que dejan de
+    estar activos o actividad registrada en el pasado) recalculan la racha del
+    usuario completo.
+    """
+
+    TAMANO_LOTE = 1000
+
+    @classmethod
+    def obtener(cls, usuario_id):
+        return RachaUsuario.query.get(usuario_id)
+
+    @classmethod
+    def registrar_dia(cls, usuario_id, fecha, activo_antes, activo_ahora):
+        """Actualiza la racha cuando un día cambia de estado de actividad"""
+        if activo_antes == activo_ahora:
+            return
+
+        db.session.execute(upsert(RachaUsuario, {'usuario_id': usuario_id}, claves=('usuario_id',)))
+        racha = RachaUsuario.query.filter_by(
+            usuario_id=usuario_id
+        ).populate_existing().with_for_update().one()
+        ultima = racha.ultima_fecha_activa
+
+        if not activo_ahora or (ultima and fecha <= ultima):
+            # Se rompe o se reordena el historial: recalcular al usuario
+            cls.reconstruir(usuario_id)
+            return
+
+        if ultima and fecha == ultima + timedelta(days=1):
+            racha.racha_actual += 1
+        else:
+            racha.racha_actual = 1
+        racha.ultima_fecha_activa = fecha
+        racha.mejor_racha = max(racha.mejor_racha, racha.racha_actual)
+
+    @classmethod
+    def reconstruir(cls, usuario_id=None):
+        """
+        Recalcula las rachas en una sola pasada ordenada sobre los días con
+        actividad. Sin usuario_id reconstruye todos los usuarios.
+        Devuelve el número de usuarios con racha.
+        """
+        consulta = db.session.query(Progreso.usuario_id, Progreso.fecha).filter(
+            or_(Progreso.minutos_estudio > 0, Progreso.sesiones_realizadas > 0)
+        )
+        borrado = RachaUsuario.query
+        if usuario_id:
+            consulta = consulta.filter(Progreso.usuario_id == usuario_id)
+            borrado = borrado.filter_by(usuario_id=usuario_id)
+        consulta = consulta.order_by(Progreso.usuario_id, Progreso.fecha)
+
+        borrado.delete(synchronize_session=False)
+
+        filas = []
+        actual = None  # [usuario_id, racha_actual, mejor_racha, ultima_fecha]
+
+        for fila_usuario, fecha in consulta.yield_per(cls.TAMANO_LOTE):
+            if actual and actual[0] == fila_usuario:
+                if fecha == actual[3] + timedelta(days=1):
+                    actual[1] += 1
+                else:
+                    actual[1] = 1
+                actual[2] = max(actual[2], actual[1])
+                actual[3] = fecha
+                continue
+
+            if actual:
+                filas.append(cls._fila(actual))
+            actual = [fila_usuario, 1, 1, fecha]
+
+        if actual:
+            filas.append(cls._fila(actual))
+
+        # Se inserta al terminar de leer: el cursor en streaming no admite
+        # otras sentencias en la misma conexión mientras está abierto
+        for i in range(0, len(filas), cls.TAMANO_LOTE):
+            db.session.execute(RachaUsuario.__table__.insert(), filas[i:i + cls.TAMANO_LOTE])
+
+        # Las instancias cargadas en la sesión ya no reflejan la tabla
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, RachaUsuario):
+                db.session.expire(obj)
+        return len(filas)
+
+    @staticmethod
+    def _fila(actual):
+        return {
+            'usuario_id': actual[0],
+            'racha_actual': actual[1],
+            'mejor_racha': actual[2],
+            'ultima_fecha_activa': actual[3]
+        }
@@ -1,5 +1,5 @@
 # services/recompensa_service.py
-from ..models import db, Recompensa, RecompensaUsuario, Usuario, Sesion, Tarea, SesionTecnicaParam
+from ..models import db, Recompensa, RecompensaUsuario, Usuario, Sesion, SesionEstado, Tarea, Tecnica
 from datetime import datetime, date, timedelta
 import json
 
@@ -74,15 +74,13 @@ class RecompensaService:
         """Verifica y otorga recompensas por completar meditación"""
         
         # Contar meditaciones completadas
-        from backend.models import Tecnica
-        
         tecnica_meditacion = Tecnica.query.filter_by(nombre='Meditación').first()
         if not tecnica_meditacion:
             return
         
         meditaciones_completadas = Sesion.query.filter_by(
             usuario_id=usuario_id,
-            tecnica_id=tecnica_meditacion.tecnica_id,
+            tecnica_id=tecnica_meditacion.id_tecnica,
             estado='Completado'
         ).count()
         
@@ -146,10 +144,12 @@ class RecompensaService:
         if not sesion:
             return
         
-        parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-        ciclos_completados = int(parametros.get('ciclos_completados', 0))
-        ciclos_objetivo = int(parametros.get('ciclos_objetivo', 4))
-        modo_no_distraccion = parametros.get('modo_no_distraccion', 'False') == 'True'
+        estado = sesion.estado_tecnica
+        if not estado:
+            return
+        ciclos_completados = estado.ciclos_completados
+        ciclos_objetivo = estado.ciclos_objetivo or 4
+        modo_no_distraccion = estado.modo_no_distraccion
         
         # Verificar pomodoro completo
         if ciclos_completados >= ciclos_objetivo:
@@ -222,52 +222,38 @@ class RecompensaService:
         """Obtiene estadísticas específicas para verificar recompensas"""
         
         # Meditaciones completadas
-        from backend.models import Tecnica
         tecnica_meditacion = Tecnica.query.filter_by(nombre='Meditación').first()
         meditaciones_completadas = 0
         if tecnica_meditacion:
             meditaciones_completadas = Sesion.query.filter_by(
                 usuario_id=usuario_id,
-                tecnica_id=tecnica_meditacion.tecnica_id,
+                tecnica_id=tecnica_meditacion.id_tecnica,
                 estado='Completado'
             ).count()
         
-        # Pomodoros completados
-        tecnica_pomodoro = Tecnica.query.filter_by(nombre='Pomodoro').first()
-        pomodoros_completos = 0
-        pomodoros_sin_distraccion = 0
-        
-        if tecnica_pomodoro:
-            sesiones_pomodoro = Sesion.query.filter_by(
-                usuario_id=usuario_id,
-                tecnica_id=tecnica_pomodoro.tecnica_id,
-                estado='Completado'
-            ).all()
-            
-            for sesion in sesiones_pomodoro:
-                parametros = {p.codigo: p.cantidad for p in sesion.parametros}
-                ciclos_completados = int(parametros.get('ciclos_completados', 0))
-                ciclos_objetivo = int(parametros.get('ciclos_objetivo', 4))
-                modo_no_distraccion = parametros.get('modo_no_distraccion', 'False') == 'True'
-                
-                if ciclos_completados >= ciclos_objetivo:
-                    pomodoros_completos += 1
-                    if modo_no_distraccion:
-                        pomodoros_sin_distraccion += 1
-        
-        # Tareas completadas a tiempo y anticipadas
-        hoy = date.today()
-        tareas_completadas_tiempo = Tarea.query.filter(
-            Tarea.usuario_id == usuario_id,
-            Tarea.estado == 'Completado',
-            Tarea.fecha_vencimiento >= hoy
-        ).count()
-        
-        tareas_anticipadas_mitad_tiempo = Tarea.query.filter(
+        # Pomodoros completados: se cuentan en la base de datos sobre el estado tipado
+        ciclo_completo = SesionEstado.ciclos_completados >= db.func.coalesce(SesionEstado.ciclos_objetivo, 4)
+        pomodoros_completos, pomodoros_sin_distraccion = db.session.query(
+            db.func.count(SesionEstado.id_sesion),
+            db.func.count(db.case((SesionEstado.modo_no_distraccion.is_(True), 1)))
+        ).join(
+            Sesion, Sesion.id_sesion == SesionEstado.id_sesion
+        ).filter(
+            Sesion.usuario_id == usuario_id,
+            Sesion.estado == 'Completado',
+            SesionEstado.tecnica == 'pomodoro',
+            ciclo_completo
+        ).one()
+        
+        # Tareas completadas a tiempo y anticipadas: un único recorrido del
+        # rango dias_anticipados >= 0 de ix_tarea_usuario_anticipacion
+        tareas_completadas_tiempo, tareas_anticipadas_mitad_tiempo = db.session.query(
+            db.func.count(Tarea.id_tarea),
+            db.func.count(db.case((Tarea.dias_anticipados > 0, 1)))
+        ).filter(
             Tarea.usuario_id == usuario_id,
-            Tarea.estado == 'Completado',
-            Tarea.comentario.like('%días antes de tiempo%')
-        ).count()
+            Tarea.dias_anticipados >= 0
+        ).one()
         
         return {
             'meditaciones_completadas': meditaciones_completadas,
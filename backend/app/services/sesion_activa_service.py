@@ -0,0 +1,98 @@
+# services/sesion_activa_service.py
+from ..models import db, Sesion, SesionActiva
+from ..utils.cache import CacheUsuario
+from sqlalchemy.exc import IntegrityError
+
+class SesionActivaService:
+    """
+    Registro de la sesión en ejecución de cada usuario. Una fila por usuario
+    (clave primaria usuario_id) que se inserta al iniciar y se borra al
+    finalizar: la base de datos rechaza el segundo inicio concurrente y la
+    consulta de "sesión actual" es una lectura por clave primaria.
+    """
+
+    ESTADO_EN_EJECUCION = 'EnEjecucion'
+
+    # id_sesion activa por usuario ('' = ninguna); solo para lecturas
+    _cache = CacheUsuario(ttl=30)
+
+    @classmethod
+    def obtener_id(cls, usuario_id):
+        """Id de la sesión en ejecución del usuario o None"""
+        id_sesion = cls._cache.obtener(usuario_id)
+        if id_sesion is None:
+            activa = SesionActiva.query.get(usuario_id)
+            id_sesion = activa.id_sesion if activa else ''
+            cls._cache.guardar(usuario_id, id_sesion)
+        return id_sesion or None
+
+    @classmethod
+    def tomar(cls, sesion):
+        """
+        Registra `sesion` como la sesión en ejecución de su usuario dentro de
+        la transacción actual. Si ya tiene una, deshace la transacción y lanza
+        ValueError.
+        """
+        db.session.add(SesionActiva(usuario_id=sesion.usuario_id, sesion=sesion))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            raise ValueError("Ya tienes una sesión en ejecución")
+        finally:
+            cls._cache.invalidar(sesion.usuario_id)
+
+    @classmethod
+    def liberar(cls, sesion):
+        """Quita `sesion` del registro si era la sesión en ejecución de su usuario"""
+        SesionActiva.query.filter_by(
+            usuario_id=sesion.usuario_id,
+            id_sesion=sesion.id_sesion
+        ).delete(synchronize_session=False)
+        cls._cache.invalidar(sesion.usuario_id)
+
+    @classmethod
+    def liberar_lote(cls, sesiones):
+        """Quita varias sesiones del registro con una sola sentencia"""
+        if not sesiones:
+            return
+        SesionActiva.query.filter(
+            SesionActiva.id_sesion.in_([sesion.id_sesion for sesion in sesiones])
+        ).delete(synchronize_session=False)
+        for sesion in sesiones:
+            cls._cache.invalidar(sesion.usuario_id)
+
+    @classmethod
+    def sincronizar(cls, sesion, estado_anterior=None):
+        """Toma o libera el registro según el cambio de estado de la sesión"""
+        en_ejecucion = sesion.estado == cls.ESTADO_EN_EJECUCION
+        estaba_en_ejecucion = estado_anterior == cls.ESTADO_EN_EJECUCION
+        if en_ejecucion and not estaba_en_ejecucion:
+            cls.tomar(sesion)
+        elif estaba_en_ejecucion and not en_ejecucion:
+            cls.liberar(sesion)
+
+    @classmethod
+    def reconstruir(cls):
+        """
+        Regenera el registro a partir de las sesiones en ejecución. Si un
+        usuario tiene varias (duplicados anteriores al registro) se conserva
+        la más reciente. Devuelve el número de usuarios con sesión activa.
+        """
+        SesionActiva.query.delete(synchronize_session=False)
+
+        filas = {}
+        for usuario_id, id_sesion, fecha_inicio in db.session.query(
+            Sesion.usuario_id,
+            Sesion.id_sesion,
+            Sesion.fecha_inicio
+        ).filter(
+            Sesion.estado == cls.ESTADO_EN_EJECUCION
+        ).order_by(Sesion.usuario_id, Sesion.fecha_inicio.desc()):
+            if usuario_id not in filas:
+                filas[usuario_id] = {'usuario_id': usuario_id, 'id_sesion': id_sesion, 'desde': fecha_inicio}
+
+        if filas:
+            db.session.execute(SesionActiva.__table__.insert(), list(filas.values()))
+        cls._cache.limpiar()
+        return len(filas)
@@ -0,0 +1,135 @@
+# services/sesion_inactiva_service.py
+from ..models import db, Sesion
+from .pomodoro_service import PomodoroService
+from .progreso_service import ProgresoService
+from .sesion_activa_service import SesionActivaService
+from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+import threading
+import time
+
+class SesionInactivaService:
+    """
+    Cierre de sesiones abandonadas. El cliente envía un latido periódico
+    mientras la sesión está abierta y pausar, reanudar o saltar una fase de
+    un temporizador también lo renueva. Las sesiones en ejecución sin latido
+    reciente se finalizan por lotes con la última señal como fecha de fin,
+    se actualiza su progreso y se liberan del registro de sesiones activas.
+    """
+
+    ESTADO_EN_EJECUCION = 'EnEjecucion'
+
+    @classmethod
+    def registrar_latido(cls, usuario_id, sesion_id):
+        """Marca la sesión como viva con una única sentencia UPDATE"""
+        ahora = datetime.utcnow()
+        actualizadas = Sesion.query.filter_by(
+            id_sesion=sesion_id,
+            usuario_id=usuario_id,
+            estado=cls.ESTADO_EN_EJECUCION
+        ).update({'ultimo_latido': ahora}, synchronize_session=False)
+        db.session.commit()
+
+        if not actualizadas:
+            raise ValueError("Sesión en ejecución no encontrada")
+        return ahora
+
+    # --- Cierre ---
+
+    @classmethod
+    def _objetivo_cumplido(cls, sesion, fin, segundos_activos):
+        """Si la técnica llegó a su objetivo antes de la última señal"""
+        estado = sesion.estado_tecnica
+        if not estado:
+            return False
+        if estado.tecnica == 'pomodoro':
+            calculado = PomodoroService.calcular_estado(sesion, fin)
+            PomodoroService.congelar(estado, calculado)
+            return calculado['fase_actual'] == 'completado'
+        if estado.tecnica == 'meditacion':
+            return bool(estado.duracion_planificada) and segundos_activos >= estado.duracion_planificada * 60
+        return False
+
+    @classmethod
+    def _cerrar(cls, sesion):
+        """Finaliza una sesión abandonada en su último latido"""
+        estado = sesion.estado_tecnica
+        fin = sesion.ultimo_latido or sesion.fecha_inicio
+
+        pausado = 0
+        if estado:
+            if estado.pausado_desde:
+                # Pausar también es una señal de vida
+                fin = max(fin, estado.pausado_desde)
+                estado.cerrar_pausa(fin)
+            pausado = estado.segundos_pausados(fin)
+        segundos_activos = max((fin - sesion.fecha_inicio).total_seconds() - pausado, 0)
+
+        completada = cls._objetivo_cumplido(sesion, fin, segundos_activos)
+        sesion.fecha_fin = fin
+        sesion.duracion_real = int(segundos_activos / 60)
+        sesion.estado = 'Completado' if completada else 'Cancelado'
+        ProgresoService.registrar_sesion(sesion)
+
+    @classmethod
+    def cerrar_lote(cls, limite, tamano_lote=200):
+        """
+        Cierra hasta `tamano_lote` sesiones sin latido desde `limite` y
+        confirma. Las filas se bloquean con SKIP LOCKED para que varios
+        procesos puedan ejecutar el cierre a la vez. Devuelve cuántas cerró.
+        """
+        sesiones = Sesion.query.options(selectinload(Sesion.estado_tecnica)).filter(
+            Sesion.estado == cls.ESTADO_EN_EJECUCION,
+            Sesion.ultimo_latido < limite
+        ).order_by(Sesion.ultimo_latido).limit(tamano_lote).with_for_update(skip_locked=True).all()
+
+        for sesion in sesiones:
+            cls._cerrar(sesion)
+        SesionActivaService.liberar_lote(sesiones)
+        db.session.commit()
+        return len(sesiones)
+
+    @classmethod
+    def cerrar_inactivas(cls, minutos_inactividad=30, tamano_lote=200, ahora=None):
+        """Cierra por lotes todas las sesiones inactivas. Devuelve el total"""
+        limite = (ahora or datetime.utcnow()) - timedelta(minutes=minutos_inactividad)
+
+        # Sesiones anteriores a la columna: su última señal conocida es el inicio
+        Sesion.query.filter(
+            Sesion.estado == cls.ESTADO_EN_EJECUCION,
+            Sesion.ultimo_latido.is_(None)
+        ).update({'ultimo_latido': Sesion.fecha_inicio}, synchronize_session=False)
+        db.session.commit()
+
+        total = 0
+        while True:
+            cerradas = cls.cerrar_lote(limite, tamano_lote)
+            total += cerradas
+            if cerradas < tamano_lote:
+                return total
+
+    # --- Hilo en segundo plano ---
+
+    @classmethod
+    def iniciar_hilo(cls, app):
+        """Lanza un hilo que cierra sesiones inactivas cada CIERRE_SESIONES_INTERVALO segundos"""
+        intervalo = app.config['CIERRE_SESIONES_INTERVALO']
+        minutos = app.config.get('SESION_INACTIVIDAD_MINUTOS', 30)
+
+        def ejecutar():
+            while True:
+                time.sleep(intervalo)
+                with app.app_context():
+                    try:
+                        total = cls.cerrar_inactivas(minutos)
+                        if total:
+                            app.logger.info(f"Sesiones inactivas cerradas: {total}")
+                    except Exception:
+                        db.session.rollback()
+                        app.logger.exception("Error al cerrar sesiones inactivas")
+                    finally:
+                        db.session.remove()
+
+        hilo = threading.Thread(target=ejecutar, name='cierre-sesiones', daemon=True)
+        hilo.start()
+        return hilo
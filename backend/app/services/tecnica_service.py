@@ -0,0 +1,59 @@
+# services/tecnica_service.py
+from ..models import db, Tecnica
+from ..utils.cache import CacheUsuario
+
+class TecnicaService:
+    """
+    Catálogo de técnicas en memoria. Son pocas filas que casi nunca cambian,
+    así que los listados las resuelven por id sin consultar la base de datos.
+    """
+
+    _cache = CacheUsuario(ttl=600, max_entradas=1)
+    _CLAVE = 'catalogo'
+
+    @classmethod
+    def catalogo(cls):
+        """Diccionario id_tecnica -> técnica serializada"""
+        catalogo = cls._cache.obtener(cls._CLAVE)
+        if catalogo is None:
+            catalogo = {tecnica.id_tecnica: tecnica.to_dict() for tecnica in Tecnica.query.all()}
+            cls._cache.guardar(cls._CLAVE, catalogo)
+        return catalogo
+
+    @classmethod
+    def obtener(cls, tecnica_id):
+        tecnica = cls.catalogo().get(tecnica_id)
+        if tecnica is None:
+            # Técnica creada en otro proceso después de cargar el catálogo
+            cls.invalidar()
+            tecnica = cls.catalogo().get(tecnica_id)
+        return tecnica
+
+    @classmethod
+    def id_por_nombre(cls, nombre):
+        """Id de la técnica con ese nombre según el catálogo, o None"""
+        for tecnica in cls.catalogo().values():
+            if tecnica['nombre'] == nombre:
+                return tecnica['id_tecnica']
+        return None
+
+    @classmethod
+    def obtener_id_por_nombre(cls, nombre, categoria=None):
+        """Id de la técnica con ese nombre; la crea si no existe"""
+        tecnica_id = cls.id_por_nombre(nombre)
+        if tecnica_id:
+            return tecnica_id
+
+        tecnica = Tecnica.query.filter_by(nombre=nombre).first()
+        if tecnica:
+            # Creada por otro proceso: recargar el catálogo en la próxima lectura
+            cls.invalidar()
+        else:
+            tecnica = Tecnica(nombre=nombre, categoria=categoria)
+            db.session.add(tecnica)
+            db.session.flush()
+        return tecnica.id_tecnica
+
+    @classmethod
+    def invalidar(cls):
+        cls._cache.invalidar(cls._CLAVE)
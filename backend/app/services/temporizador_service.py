@@ -0,0 +1,277 @@
+# services/temporizador_service.py
+from ..models import db, Sesion, SesionEstado
+from ..logica.estudio import StudyTimer
+from ..logica.meditacion import MeditationTimer
+from .progreso_service import ProgresoService
+from .tecnica_service import TecnicaService
+from .sesion_activa_service import SesionActivaService
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+
+class TemporizadorService:
+    """
+    Temporizadores del motor de logica/ (StudyTimer y MeditationTimer)
+    guardados en SesionEstado. Se persisten la configuración, las pausas y un
+    desfase; cualquier proceso reconstruye el temporizador en O(1) con
+    restore_state a partir del tiempo activo, sin repetir ticks.
+    """
+
+    TIPOS = ('estudio', 'meditacion')
+    FASES = {'work': 'trabajo', 'break': 'descanso', 'long_break': 'descanso_largo'}
+
+    # Catálogos de técnicas (solo lectura)
+    _estudio = StudyTimer()
+    _meditacion = MeditationTimer()
+
+    @classmethod
+    def iniciar(cls, usuario_id, tipo, tecnica_clave):
+        """Inicia un temporizador de estudio o meditación del motor"""
+        if tipo == 'estudio':
+            tecnica = cls._estudio.techniques.get(tecnica_clave)
+        elif tipo == 'meditacion':
+            tecnica = cls._meditacion.techniques.get(tecnica_clave)
+        else:
+            raise ValueError("Tipo de temporizador no válido")
+        if not tecnica:
+            raise ValueError(f"Técnica '{tecnica_clave}' no encontrada")
+
+        nueva_sesion = Sesion(
+            usuario_id=usuario_id,
+            tecnica_id=TecnicaService.obtener_id_por_nombre(
+                tecnica['name'], 'productividad' if tipo == 'estudio' else 'bienestar'
+            ),
+            fecha_inicio=datetime.utcnow(),
+            duracion_real=0,
+            es_grupal=False,
+            estado='EnEjecucion'
+        )
+
+        if tipo == 'estudio':
+            nueva_sesion.estado_tecnica = SesionEstado(
+                tecnica='estudio',
+                tecnica_clave=tecnica_clave,
+                duracion_trabajo=tecnica['work'],
+                duracion_descanso=tecnica['break'],
+                duracion_descanso_largo=tecnica['long_break'],
+                ciclos_descanso_largo=tecnica['cycles_for_long_break'],
+                ciclos_completados=0,
+                fase_actual='trabajo',
+                pausas=[],
+                desfase=0
+            )
+        else:
+            nueva_sesion.estado_tecnica = SesionEstado(
+                tecnica='meditacion',
+                tecnica_clave=tecnica_clave,
+                duracion_planificada=tecnica['duration'],
+                pausas=[],
+                desfase=0
+            )
+
+        db.session.add(nueva_sesion)
+        # Inserta el registro de sesión activa: falla si el usuario ya tiene una
+        SesionActivaService.tomar(nueva_sesion)
+        ProgresoService.registrar_sesion(nueva_sesion)
+        db.session.commit()
+
+        return cls._formatear(nueva_sesion, cls.hidratar(nueva_sesion))
+
+    # --- Estado ---
+
+    @classmethod
+    def segundos_activos(cls, sesion, ahora=None):
+        """Tiempo de sesión sin pausas; las sesiones cerradas se miden hasta fecha_fin"""
+        if sesion.estado != 'EnEjecucion' and sesion.fecha_fin:
+            ahora = sesion.fecha_fin
+        ahora = ahora or datetime.utcnow()
+        activo = (ahora - sesion.fecha_inicio).total_seconds()
+        return max(activo - sesion.estado_tecnica.segundos_pausados(ahora), 0)
+
+    @classmethod
+    def _tecnica_estudio(cls, estado):
+        """Técnica de estudio con la configuración guardada al iniciar"""
+        base = cls._estudio.techniques.get(estado.tecnica_clave) or {
+            'name': f"Personalizada {estado.duracion_trabajo}-{estado.duracion_descanso}"
+        }
+        return dict(
+            base,
+            work=estado.duracion_trabajo,
+            long_break=estado.duracion_descanso_largo,
+            cycles_for_long_break=estado.ciclos_descanso_largo,
+            **{'break': estado.duracion_descanso}
+        )
+
+    @classmethod
+    def hidratar(cls, sesion, ahora=None):
+        """Construye el temporizador en su estado actual sin simular ticks"""
+        estado = sesion.estado_tecnica
+        posicion = cls.segundos_activos(sesion, ahora) + (estado.desfase or 0)
+
+        if estado.tecnica == 'estudio':
+            timer = StudyTimer()
+            timer.restore_state(cls._tecnica_estudio(estado), posicion, estado.tecnica_clave)
+        else:
+            timer = MeditationTimer()
+            timer.restore_state(estado.tecnica_clave, posicion, estado.duracion_planificada)
+
+        if estado.pausado_desde or sesion.estado != 'EnEjecucion':
+            timer.is_active = False
+        return timer
+
+    @classmethod
+    def _obtener_sesion(cls, usuario_id, sesion_id, solo_en_ejecucion=True):
+        """Sesión y estado del temporizador en una única consulta"""
+        query = Sesion.query.options(joinedload(Sesion.estado_tecnica)).filter_by(
+            id_sesion=sesion_id,
+            usuario_id=usuario_id
+        )
+        if solo_en_ejecucion:
+            query = query.filter_by(estado='EnEjecucion')
+        sesion = query.first()
+
+        estado = sesion.estado_tecnica if sesion else None
+        if not estado or estado.tecnica not in cls.TIPOS or not estado.tecnica_clave:
+            if solo_en_ejecucion:
+                raise ValueError("Sesión no encontrada o no está en ejecución")
+            raise ValueError("Sesión no encontrada")
+        return sesion
+
+    @classmethod
+    def cargar(cls, usuario_id, sesion_id, ahora=None, solo_en_ejecucion=True):
+        """(sesion, temporizador) listo para usar en este proceso"""
+        sesion = cls._obtener_sesion(usuario_id, sesion_id, solo_en_ejecucion)
+        return sesion, cls.hidratar(sesion, ahora)
+
+    @classmethod
+    def _congelar(cls, estado, timer):
+        """Guarda la fase y los ciclos para consultas sobre sesiones no activas"""
+        if estado.tecnica == 'estudio':
+            estado.fase_actual = cls.FASES[timer.current_phase]
+            estado.ciclos_completados = timer.cycle_count
+        else:
+            estado.fase_actual = 'completado' if timer.get_remaining_time() == 0 else 'sesion'
+            estado.ciclos_completados = timer.current_cycle
+
+    @classmethod
+    def guardar(cls, sesion, timer, ahora=None):
+        """
+        Persiste el estado de un temporizador cargado con cargar(). Lo único
+        que no se deduce del reloj son los saltos de fase, que se guardan como
+        desfase; diferencias de menos de un segundo (redondeo) se ignoran.
+        """
+        estado = sesion.estado_tecnica
+        desfase = estado.desfase or 0
+        diferencia = timer.get_timeline_position() - cls.segundos_activos(sesion, ahora) - desfase
+        if abs(diferencia) >= 1:
+            estado.desfase = desfase + round(diferencia)
+        cls._congelar(estado, timer)
+        db.session.commit()
+
+    # --- Operaciones ---
+
+    @classmethod
+    def saltar_fase(cls, usuario_id, sesion_id):
+        """Termina la fase en curso de un temporizador de estudio"""
+        ahora = datetime.utcnow()
+        sesion, timer = cls.cargar(usuario_id, sesion_id, ahora)
+        if sesion.estado_tecnica.tecnica != 'estudio':
+            raise ValueError("Solo se pueden saltar fases de un temporizador de estudio")
+        if sesion.estado_tecnica.pausado_desde:
+            raise ValueError("El temporizador está en pausa")
+
+        # Saltar la fase es adelantar el calendario hasta su final (sin pasar
+        # por StudyTimer.next_phase, que escribe en la consola)
+        estado = sesion.estado_tecnica
+        estado.desfase = (estado.desfase or 0) + timer.get_remaining_time()
+        timer = cls.hidratar(sesion, ahora)
+        cls._congelar(estado, timer)
+        sesion.registrar_latido(ahora)
+        db.session.commit()
+        return cls._formatear(sesion, timer)
+
+    @classmethod
+    def pausar(cls, usuario_id, sesion_id):
+        """Pausa el temporizador (el tiempo en pausa no avanza el calendario)"""
+        ahora = datetime.utcnow()
+        sesion, timer = cls.cargar(usuario_id, sesion_id, ahora)
+        estado = sesion.estado_tecnica
+        if estado.pausado_desde:
+            raise ValueError("El temporizador ya está en pausa")
+
+        cls._congelar(estado, timer)
+        estado.pausado_desde = ahora
+        timer.is_active = False
+        sesion.registrar_latido(ahora)
+        db.session.commit()
+        return cls._formatear(sesion, timer)
+
+    @classmethod
+    def reanudar(cls, usuario_id, sesion_id):
+        """Reanuda el temporizador cerrando el intervalo de pausa"""
+        ahora = datetime.utcnow()
+        sesion = cls._obtener_sesion(usuario_id, sesion_id)
+        estado = sesion.estado_tecnica
+        if not estado.pausado_desde:
+            raise ValueError("El temporizador no está en pausa")
+
+        estado.cerrar_pausa(ahora)
+        sesion.registrar_latido(ahora)
+        db.session.commit()
+        return cls._formatear(sesion, cls.hidratar(sesion, ahora))
+
+    @classmethod
+    def finalizar(cls, usuario_id, sesion_id, completada=False):
+        """Finaliza el temporizador registrando solo el tiempo activo"""
+        ahora = datetime.utcnow()
+        sesion = cls._obtener_sesion(usuario_id, sesion_id)
+        estado = sesion.estado_tecnica
+        estado.cerrar_pausa(ahora)
+
+        timer = cls.hidratar(sesion, ahora)
+        cls._congelar(estado, timer)
+        duracion = int(cls.segundos_activos(sesion, ahora) / 60)
+
+        sesion.fecha_fin = ahora
+        sesion.duracion_real = duracion
+        sesion.estado = 'Completado' if completada or estado.fase_actual == 'completado' else 'Cancelado'
+        SesionActivaService.liberar(sesion)
+
+        ProgresoService.registrar_sesion(sesion)
+        db.session.commit()
+
+        return {
+            'message': 'Temporizador finalizado exitosamente',
+            'sesion_id': sesion_id,
+            'estado': sesion.estado,
+            'duracion_total_minutos': duracion,
+            'ciclos_completados': estado.ciclos_completados
+        }
+
+    @classmethod
+    def obtener_estado(cls, usuario_id, sesion_id):
+        """Estado actual del temporizador (solo lectura)"""
+        sesion, timer = cls.cargar(usuario_id, sesion_id, solo_en_ejecucion=False)
+        return cls._formatear(sesion, timer)
+
+    @classmethod
+    def _formatear(cls, sesion, timer):
+        """Formatea la respuesta con el estado del temporizador"""
+        estado = sesion.estado_tecnica
+        respuesta = {
+            'sesion_id': sesion.id_sesion,
+            'estado': sesion.estado,
+            'tipo': estado.tecnica,
+            'tecnica_clave': estado.tecnica_clave,
+            'tecnica': timer.current_technique['name'],
+            'inicio': sesion.fecha_inicio.isoformat(),
+            'segundos_restantes_fase': timer.get_remaining_time(),
+            'pausado': estado.pausado_desde is not None
+        }
+        if estado.tecnica == 'estudio':
+            respuesta['fase_actual'] = cls.FASES[timer.current_phase]
+            respuesta['ciclos_completados'] = timer.cycle_count
+        else:
+            respuesta['fase_actual'] = 'completado' if timer.get_remaining_time() == 0 else 'sesion'
+            respuesta['ciclos_completados'] = timer.current_cycle
+            respuesta['instruccion'] = timer.get_breathing_instruction()
+        return respuesta
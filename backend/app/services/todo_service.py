@@ -1,38 +1,72 @@
 # services/todo_service.py
-from ..models import db, Tarea, Usuario
-from datetime import datetime, date
+from ..models import db, Tarea, Usuario, Sala, UsuarioSala
+from .progreso_service import ProgresoService
+from ..utils.fechas import hoy_usuario
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, update
+import re
+from sqlalchemy.orm import aliased
 
 class TodoService:
     
     @classmethod
-    def obtener_listas_usuario(cls, usuario_id):
-        """Obtiene todas las listas de tareas organizadas del usuario"""
-        
-        # Agrupar tareas por sala (lista)
-        tareas = Tarea.query.filter_by(usuario_id=usuario_id).all()
-        
-        # Organizar por listas (salas) y tareas individuales
+    def obtener_listas_usuario(cls, usuario_id, limite_por_lista=100):
+        """
+        Obtiene todas las listas de tareas organizadas del usuario: una consulta
+        para las tareas (como mucho `limite_por_lista` por lista, las más
+        recientes) y otra para las salas implicadas.
+        """
+        
+        # Numerar las tareas dentro de cada lista (sala) para recortar en SQL
+        numeradas = select(
+            Tarea,
+            func.row_number().over(
+                partition_by=Tarea.sala_id,
+                order_by=(Tarea.fecha_creacion.desc(), Tarea.id_tarea.desc())
+            ).label('numero'),
+            func.count().over(partition_by=Tarea.sala_id).label('total')
+        ).where(Tarea.usuario_id == usuario_id).subquery()
+        tarea = aliased(Tarea, numeradas)
+        
+        filas = db.session.execute(
+            select(tarea, numeradas.c.total).where(
+                numeradas.c.numero <= limite_por_lista
+            ).order_by(numeradas.c.sala_id, numeradas.c.numero)
+        ).all()
+        
+        # Organizar por listas (salas) y tareas individuales en una pasada
         listas = {}
         tareas_individuales = []
+        total_individuales = 0
         
-        for tarea in tareas:
+        for tarea, total in filas:
             if tarea.sala_id:
                 if tarea.sala_id not in listas:
-                    from backend.models import Sala
-                    sala = Sala.query.get(tarea.sala_id)
                     listas[tarea.sala_id] = {
                         'id': tarea.sala_id,
-                        'nombre': sala.nombre if sala else 'Lista sin nombre',
-                        'descripcion': sala.descripcion if sala else None,
+                        'nombre': 'Lista sin nombre',
+                        'descripcion': None,
+                        'total_tareas': total,
                         'tareas': []
                     }
                 listas[tarea.sala_id]['tareas'].append(tarea.to_dict())
             else:
+                total_individuales = total
                 tareas_individuales.append(tarea.to_dict())
         
+        # Nombres de todas las listas con una sola consulta IN
+        if listas:
+            salas = db.session.execute(
+                select(Sala.id_sala, Sala.nombre, Sala.descripcion).where(Sala.id_sala.in_(listas))
+            ).all()
+            for sala in salas:
+                listas[sala.id_sala]['nombre'] = sala.nombre
+                listas[sala.id_sala]['descripcion'] = sala.descripcion
+        
         return {
             'listas': list(listas.values()),
-            'tareas_individuales': tareas_individuales
+            'tareas_individuales': tareas_individuales,
+            'total_tareas_individuales': total_individuales
         }
     
     @classmethod
@@ -42,7 +76,6 @@ class TodoService:
         if not nombre:
             raise ValueError("El nombre de la lista es requerido")
         
-        from backend.models import Sala, UsuarioSala
         import secrets
         import string
         
@@ -82,7 +115,7 @@ class TodoService:
     def completar_tarea_anticipadamente(cls, usuario_id, tarea_id):
         """Marca una tarea como completada verificando si fue antes de tiempo"""
         
-        tarea = Tarea.query.filter_by(tarea_id=tarea_id, usuario_id=usuario_id).first()
+        tarea = Tarea.query.filter_by(id_tarea=tarea_id, usuario_id=usuario_id).first()
         
         if not tarea:
             raise ValueError("Tarea no encontrada")
@@ -90,7 +123,7 @@ class TodoService:
         if tarea.estado == 'Completado':
             raise ValueError("La tarea ya está completada")
         
-        hoy = date.today()
+        hoy = hoy_usuario(usuario_id)
         completada_anticipadamente = False
         
         # Verificar si se completó antes de la fecha de vencimiento
@@ -100,7 +133,7 @@ class TodoService:
         else:
             dias_anticipados = 0
         
-        # Actualizar tarea
+        # Actualizar tarea (fecha_completada y dias_anticipados los fija marcar_completada al guardar)
         tarea.estado = 'Completado'
         
         # Agregar comentario si se completó anticipadamente
@@ -111,6 +144,7 @@ class TodoService:
             else:
                 tarea.comentario = comentario_anticipado
         
+        ProgresoService.registrar_tarea(tarea)
         db.session.commit()
         
         return {
@@ -122,21 +156,59 @@ class TodoService:
             'fecha_vencimiento': tarea.fecha_vencimiento.isoformat() if tarea.fecha_vencimiento else None
         }
     
+    # Comentario con el que se registraba la anticipación antes de las columnas tipadas
+    _PATRON_ANTICIPADA = re.compile(r'Completada (\d+) días antes de tiempo')
+    
+    @classmethod
+    def rellenar_finalizacion_tareas(cls, tamano_lote=1000):
+        """
+        Rellena `fecha_completada` y `dias_anticipados` de las tareas completadas
+        antes de que existieran, a partir del comentario de anticipación. Las
+        que no lo tienen quedan sin datos: no se sabe cuándo se completaron.
+        Recorre por clave y confirma cada lote. Devuelve las filas rellenadas.
+        """
+        total = 0
+        ultimo_id = ''
+        while True:
+            filas = db.session.query(Tarea.id_tarea, Tarea.fecha_vencimiento, Tarea.comentario).filter(
+                Tarea.estado == 'Completado',
+                Tarea.fecha_completada.is_(None),
+                Tarea.fecha_vencimiento.isnot(None),
+                Tarea.id_tarea > ultimo_id
+            ).order_by(Tarea.id_tarea).limit(tamano_lote).all()
+            if not filas:
+                return total
+            ultimo_id = filas[-1].id_tarea
+            
+            cambios = []
+            for id_tarea, fecha_vencimiento, comentario in filas:
+                coincidencia = cls._PATRON_ANTICIPADA.search(comentario or '')
+                if coincidencia:
+                    dias = int(coincidencia.group(1))
+                    cambios.append({
+                        'id_tarea': id_tarea,
+                        'dias_anticipados': dias,
+                        'fecha_completada': fecha_vencimiento - timedelta(days=dias)
+                    })
+            if cambios:
+                db.session.execute(update(Tarea), cambios)
+            db.session.commit()
+            total += len(cambios)
+    
     @classmethod
     def obtener_estadisticas_productividad(cls, usuario_id):
         """Obtiene estadísticas detalladas de productividad"""
         
-        hoy = date.today()
+        hoy = hoy_usuario(usuario_id)
         
         # Estadísticas básicas
         total_tareas = Tarea.query.filter_by(usuario_id=usuario_id).count()
         tareas_completadas = Tarea.query.filter_by(usuario_id=usuario_id, estado='Completado').count()
         
-        # Tareas completadas anticipadamente
+        # Tareas completadas anticipadamente (rango sobre ix_tarea_usuario_anticipacion)
         tareas_anticipadas = Tarea.query.filter(
             Tarea.usuario_id == usuario_id,
-            Tarea.estado == 'Completado',
-            Tarea.comentario.like('%días antes de tiempo%')
+            Tarea.dias_anticipados > 0
         ).count()
         
         # Tareas vencidas
@@ -152,15 +224,15 @@ class TodoService:
         
         tareas_semana = Tarea.query.filter(
             Tarea.usuario_id == usuario_id,
-            Tarea.fecha_creacion >= inicio_semana,
-            Tarea.fecha_creacion <= fin_semana
+            Tarea.dia >= inicio_semana,
+            Tarea.dia <= fin_semana
         ).count()
         
         tareas_completadas_semana = Tarea.query.filter(
             Tarea.usuario_id == usuario_id,
-            Tarea.estado == 'Completado',
-            Tarea.fecha_creacion >= inicio_semana,
-            Tarea.fecha_creacion <= fin_semana
+            Tarea.dia >= inicio_semana,
+            Tarea.dia <= fin_semana,
+            Tarea.estado == 'Completado'
         ).count()
         
         return {
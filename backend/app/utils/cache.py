@@ -0,0 +1,43 @@
+import threading
+import time
+
+class CacheUsuario:
+    """
+    Caché en memoria por usuario con expiración e invalidación explícita.
+
+    Vive en cada proceso: la invalidación explícita es inmediata en el proceso
+    que atiende la escritura y el TTL acota lo desactualizado que puede quedar
+    el resto de workers.
+    """
+
+    def __init__(self, ttl=60, max_entradas=10000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if not entrada:
+                return None
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            if len(self._datos) >= self.max_entradas and clave not in self._datos:
+                # Descartar la entrada más antigua (orden de inserción)
+                self._datos.pop(next(iter(self._datos)))
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
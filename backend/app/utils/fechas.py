@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import select, event, inspect
+from app.models import db, Usuario, Sesion, Tarea
+from app.utils.cache import CacheUsuario
+
+ZONA_POR_DEFECTO = 'UTC'
+
+_zonas_usuario = CacheUsuario(ttl=3600)
+
+def zona(nombre):
+    """ZoneInfo a partir de un nombre IANA; UTC si no es válido"""
+    try:
+        return ZoneInfo(nombre or ZONA_POR_DEFECTO)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(ZONA_POR_DEFECTO)
+
+def zona_valida(nombre):
+    try:
+        ZoneInfo(nombre)
+        return True
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return False
+
+def dia_local(momento_utc, zona_horaria):
+    """Día local de un instante guardado en UTC sin tzinfo"""
+    return momento_utc.replace(tzinfo=timezone.utc).astimezone(zona(zona_horaria)).date()
+
+def zona_usuario(usuario_id, conexion=None):
+    """
+    Zona horaria de un usuario (cacheada). Acepta una conexión explícita para
+    poder usarse dentro de eventos de flush.
+    """
+    nombre = _zonas_usuario.obtener(usuario_id)
+    if nombre is None:
+        consulta = select(Usuario.zona_horaria).where(Usuario.id_usuario == usuario_id)
+        if conexion is not None:
+            nombre = conexion.execute(consulta).scalar()
+        else:
+            nombre = db.session.execute(consulta).scalar()
+        nombre = nombre or ZONA_POR_DEFECTO
+        _zonas_usuario.guardar(usuario_id, nombre)
+    return nombre
+
+def invalidar_zona_usuario(usuario_id):
+    _zonas_usuario.invalidar(usuario_id)
+
+def hoy_usuario(usuario_id):
+    """Fecha de hoy en la zona horaria del usuario"""
+    return dia_local(datetime.utcnow(), zona_usuario(usuario_id))
+
+# --- Día local persistido en sesiones y tareas ---
+
+# Columna de fecha/hora de la que se deriva `dia` en cada modelo
+_MOMENTO_POR_MODELO = {
+    Sesion: 'fecha_inicio',
+    Tarea: 'fecha_creacion'
+}
+
+def asegurar_dia(objeto, conexion=None):
+    """
+    Fija `objeto.dia` (día local del usuario) si aún no está calculado y lo
+    devuelve. Si falta la fecha de inicio/creación se fija a ahora para que
+    ambas columnas coincidan.
+    """
+    if objeto.dia is not None:
+        return objeto.dia
+    atributo = _MOMENTO_POR_MODELO[type(objeto)]
+    momento = getattr(objeto, atributo)
+    if momento is None:
+        momento = datetime.utcnow()
+        setattr(objeto, atributo, momento)
+    objeto.dia = dia_local(momento, zona_usuario(objeto.usuario_id, conexion))
+    return objeto.dia
+
+def _antes_de_insertar(mapper, conexion, objeto):
+    asegurar_dia(objeto, conexion)
+
+def _antes_de_actualizar(mapper, conexion, objeto):
+    estado = inspect(objeto)
+    atributo = _MOMENTO_POR_MODELO[type(objeto)]
+    if estado.attrs[atributo].history.has_changes() and not estado.attrs['dia'].history.has_changes():
+        objeto.dia = None
+    asegurar_dia(objeto, conexion)
+
+for _modelo in _MOMENTO_POR_MODELO:
+    event.listen(_modelo, 'before_insert', _antes_de_insertar)
+    event.listen(_modelo, 'before_update', _antes_de_actualizar)
+
+# --- Finalización de tareas ---
+
+def marcar_completada(tarea, conexion=None):
+    """
+    Mantiene `fecha_completada` (día local del usuario) y `dias_anticipados`
+    coherentes con el estado: se fijan al pasar a 'Completado', se recalculan
+    si cambia el vencimiento y se borran si la tarea se reabre.
+    """
+    if tarea.estado != 'Completado':
+        tarea.fecha_completada = None
+        tarea.dias_anticipados = None
+        return
+    if tarea.fecha_completada is None:
+        tarea.fecha_completada = dia_local(datetime.utcnow(), zona_usuario(tarea.usuario_id, conexion))
+    if tarea.fecha_vencimiento:
+        tarea.dias_anticipados = (tarea.fecha_vencimiento - tarea.fecha_completada).days
+    else:
+        tarea.dias_anticipados = None
+
+def _tarea_antes_de_insertar(mapper, conexion, tarea):
+    marcar_completada(tarea, conexion)
+
+def _tarea_antes_de_actualizar(mapper, conexion, tarea):
+    estado = inspect(tarea)
+    if estado.attrs['estado'].history.has_changes() or estado.attrs['fecha_vencimiento'].history.has_changes():
+        marcar_completada(tarea, conexion)
+
+event.listen(Tarea, 'before_insert', _tarea_antes_de_insertar)
+event.listen(Tarea, 'before_update', _tarea_antes_de_actualizar)
@@ -0,0 +1,130 @@
+import base64
+import json
+from datetime import datetime, date
+from sqlalchemy import or_, and_
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import load_only
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+# Cabecera con el cursor de la página siguiente (el cuerpo sigue siendo la lista)
+CABECERA_CURSOR = 'X-Next-Cursor'
+
+class Pagina:
+    """
+    Paginación por clave (keyset) sobre (fecha, id) en orden descendente.
+
+    En lugar de OFFSET, cada página continúa a partir de la última fila de la
+    anterior, así que el coste depende del tamaño de página y no de la
+    antigüedad de la cuenta. El cursor es opaco para el cliente.
+    """
+
+    def __init__(self, columna_fecha, columna_id, limite=LIMITE_POR_DEFECTO, cursor=None):
+        self.columna_fecha = columna_fecha
+        self.columna_id = columna_id
+        self.limite = limite
+        self.cursor = cursor
+        self.siguiente = None
+
+    @classmethod
+    def desde_peticion(cls, args, columna_fecha, columna_id):
+        """Lee `limit` y `cursor` de la query string. Lanza ValueError si no son válidos"""
+        try:
+            limite = int(args.get('limit', LIMITE_POR_DEFECTO))
+        except ValueError:
+            raise ValueError('El parámetro limit debe ser un número entero')
+        if limite < 1 or limite > LIMITE_MAXIMO:
+            raise ValueError(f'El parámetro limit debe estar entre 1 y {LIMITE_MAXIMO}')
+
+        cursor = args.get('cursor')
+        if cursor:
+            cursor = cls._decodificar(cursor, columna_fecha)
+        return cls(columna_fecha, columna_id, limite, cursor)
+
+    def aplicar(self, query):
+        """Filtra a partir del cursor, ordena y limita (pidiendo una fila de más)"""
+        if self.cursor:
+            fecha, id_ = self.cursor
+            query = query.filter(or_(
+                self.columna_fecha < fecha,
+                and_(self.columna_fecha == fecha, self.columna_id < id_)
+            ))
+        return query.order_by(
+            self.columna_fecha.desc(),
+            self.columna_id.desc()
+        ).limit(self.limite + 1)
+
+    def recortar(self, filas):
+        """Quita la fila de más y prepara el cursor de la página siguiente"""
+        if len(filas) > self.limite:
+            filas = filas[:self.limite]
+            ultima = filas[-1]
+            if isinstance(ultima, Row):
+                ultima = ultima[0]  # Consultas con columnas extra: la entidad paginada va primero
+            self.siguiente = self._codificar(
+                getattr(ultima, self.columna_fecha.key),
+                getattr(ultima, self.columna_id.key)
+            )
+        return filas
+
+    def cabeceras(self):
+        return {CABECERA_CURSOR: self.siguiente} if self.siguiente else {}
+
+    @staticmethod
+    def _codificar(fecha, id_):
+        datos = json.dumps([fecha.isoformat(), id_], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decodificar(cursor, columna_fecha):
+        try:
+            datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            fecha, id_ = json.loads(datos)
+            if columna_fecha.type.python_type is datetime:
+                fecha = datetime.fromisoformat(fecha)
+            else:
+                fecha = date.fromisoformat(fecha)
+            return fecha, str(id_)
+        except (ValueError, TypeError):
+            raise ValueError('Cursor inválido')
+
+def campos_solicitados(args, modelo, extra=()):
+    """
+    Campos pedidos con `fields=a,b,c` (sparse fieldsets). Devuelve None si no se
+    pidió ninguno. Lanza ValueError si alguno no existe.
+    """
+    valor = args.get('fields')
+    if not valor:
+        return None
+    campos = [campo.strip() for campo in valor.split(',') if campo.strip()]
+    permitidos = set(modelo.__table__.columns.keys()) | set(extra)
+    desconocidos = [campo for campo in campos if campo not in permitidos]
+    if desconocidos:
+        raise ValueError(f"Campos no válidos: {', '.join(desconocidos)}")
+    return campos
+
+def cargar_solo(query, modelo, campos, pagina, necesarias=()):
+    """
+    Limita las columnas leídas a los campos pedidos, las del cursor y las
+    `necesarias` para calcular otros campos
+    """
+    if campos is None:
+        return query
+    columnas = {pagina.columna_fecha.key, pagina.columna_id.key, *necesarias}
+    columnas.update(campo for campo in campos if campo in modelo.__table__.columns)
+    return query.options(load_only(*[getattr(modelo, columna) for columna in columnas]))
+
+def serializar(objeto, campos):
+    """to_dict() completo o solo los campos pedidos"""
+    if campos is None:
+        return objeto.to_dict()
+    datos = {}
+    for campo in campos:
+        if campo not in objeto.__table__.columns:
+            continue  # Campos calculados: los añade cada endpoint
+        valor = getattr(objeto, campo)
+        if isinstance(valor, (datetime, date)):
+            valor = valor.isoformat()
+        datos[campo] = valor
+    return datos
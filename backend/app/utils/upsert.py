@@ -0,0 +1,66 @@
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.models import db
+
+def _dialecto():
+    return db.session.get_bind().dialect.name
+
+def _insert(tabla):
+    dialecto = _dialecto()
+    if dialecto in ('mysql', 'mariadb'):
+        return mysql.insert(tabla)
+    if dialecto == 'sqlite':
+        return sqlite.insert(tabla)
+    if dialecto == 'postgresql':
+        return postgresql.insert(tabla)
+    raise NotImplementedError(f"Upsert no soportado para el motor '{dialecto}'")
+
+def _en_conflicto(stmt, tabla, claves, sumar, reemplazar):
+    mysql_like = _dialecto() in ('mysql', 'mariadb')
+    nuevo = stmt.inserted if mysql_like else stmt.excluded
+
+    set_ = {}
+    for columna in sumar:
+        set_[columna] = tabla.c[columna] + nuevo[columna]
+    for columna in reemplazar:
+        set_[columna] = nuevo[columna]
+
+    if mysql_like:
+        # ON DUPLICATE KEY necesita al menos una asignación; col = col no modifica nada
+        return stmt.on_duplicate_key_update(set_ or {claves[0]: tabla.c[claves[0]]})
+
+    if not set_:
+        return stmt.on_conflict_do_nothing(index_elements=list(claves))
+    return stmt.on_conflict_do_update(index_elements=list(claves), set_=set_)
+
+def upsert(modelo, filas, claves, sumar=(), reemplazar=()):
+    """
+    Construye un INSERT ... ON DUPLICATE KEY / ON CONFLICT según el motor.
+
+    - claves: columnas del índice único que identifica la fila
+    - sumar: columnas que se incrementan con el valor insertado (col = col + nuevo)
+    - reemplazar: columnas que toman el valor insertado (col = nuevo)
+
+    Si no se indica ninguna columna a actualizar, la fila existente se deja intacta.
+    """
+    tabla = modelo.__table__
+    stmt = _insert(tabla).values(filas)
+    return _en_conflicto(stmt, tabla, claves, sumar, reemplazar)
+
+def upsert_desde_select(modelo, columnas, consulta, claves, sumar=(), reemplazar=()):
+    """
+    Igual que upsert() pero insertando el resultado de una consulta
+    (INSERT ... SELECT ... ON DUPLICATE KEY / ON CONFLICT).
+    """
+    tabla = modelo.__table__
+    stmt = _insert(tabla).from_select(columnas, consulta)
+    return _en_conflicto(stmt, tabla, claves, sumar, reemplazar)
+
+def uuid_sql():
+    """Expresión SQL que genera un identificador único por fila (para INSERT ... SELECT)"""
+    dialecto = _dialecto()
+    if dialecto in ('mysql', 'mariadb'):
+        return func.uuid()
+    if dialecto == 'postgresql':
+        return func.cast(func.gen_random_uuid(), db.String(36))
+    return func.lower(func.hex(func.randomblob(16)))
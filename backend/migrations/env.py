@@ -45,6 +45,18 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Tablas creadas fuera de los modelos que autogenerate no debe borrar: la
+# tabla virtual FTS5 de búsqueda de tareas en SQLite y sus tablas internas
+# (ver BusquedaTareaService.asegurar_indice)
+TABLAS_EXCLUIDAS = ('tarea_fts',)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name and name.startswith(TABLAS_EXCLUIDAS):
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +77,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +106,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,135 @@
+# tests/test_consultas.py
+"""
+Número de sentencias SQL por página de los listados: debe ser constante e
+independiente de cuántas filas tenga el usuario o la sala (sin N+1).
+Se ejecuta sobre SQLite en memoria: python -m pytest -q desde backend/
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db, Usuario, Tecnica, Sesion, SesionTecnicaParam, Sala, UsuarioSala, Tarea
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture
+def app():
+    app = create_app('development')
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def usuario(app):
+    usuario = Usuario(Username='ana', correo='ana@example.com', password='x', rol_id=2)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def cliente(app, usuario):
+    token = create_access_token(identity=usuario.id_usuario)
+    cliente = app.test_client()
+    cliente.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return cliente
+
+
+@contextmanager
+def contar_sentencias():
+    """Cuenta las sentencias que llegan al motor dentro del bloque"""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+
+
+def crear_sesiones(usuario, cantidad):
+    tecnica = Tecnica.query.first()
+    inicio = datetime(2026, 1, 1)
+    for i in range(cantidad):
+        sesion = Sesion(
+            usuario_id=usuario.id_usuario,
+            tecnica_id=tecnica.id_tecnica,
+            fecha_inicio=inicio + timedelta(hours=i),
+            duracion_real=25,
+            estado='Completado'
+        )
+        db.session.add(sesion)
+        db.session.flush()
+        db.session.add(SesionTecnicaParam(id_sesion=sesion.id_sesion, parametro='ciclos', valor='4'))
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def crear_sala_con_tareas(usuario, cantidad):
+    """Sala con dos miembros que se reparten `cantidad` tareas"""
+    companero = Usuario(Username='luis', correo='luis@example.com', password='x', rol_id=2)
+    db.session.add(companero)
+    db.session.flush()
+    sala = Sala(nombre='Estudio', creador_id=usuario.id_usuario)
+    db.session.add(sala)
+    db.session.flush()
+    db.session.add_all([
+        UsuarioSala(id_usuario=usuario.id_usuario, id_sala=sala.id_sala, rol_en_sala='admin'),
+        UsuarioSala(id_usuario=companero.id_usuario, id_sala=sala.id_sala, rol_en_sala='miembro')
+    ])
+    inicio = datetime(2026, 1, 1)
+    for i in range(cantidad):
+        autor = usuario if i % 2 else companero
+        db.session.add(Tarea(
+            usuario_id=autor.id_usuario,
+            sala_id=sala.id_sala,
+            titulo=f'Tarea {i}',
+            estado='Pendiente',
+            fecha_creacion=inicio + timedelta(hours=i)
+        ))
+    db.session.commit()
+    sala_id = sala.id_sala
+    db.session.expunge_all()
+    return sala_id
+
+
+@pytest.mark.parametrize('cantidad', [20, 200])
+def test_sesiones_consultas_constantes_por_pagina(cliente, usuario, cantidad):
+    crear_sesiones(usuario, cantidad)
+
+    with contar_sentencias() as sentencias:
+        respuesta = cliente.get('/api/sesiones?limit=20')
+
+    assert respuesta.status_code == 200
+    assert len(respuesta.json) == 20
+    assert all(s['tecnica'] and s['parametros'] for s in respuesta.json)
+    # Página + parámetros, más el catálogo de técnicas si no está en caché
+    assert len(sentencias) <= 3
+
+
+@pytest.mark.parametrize('cantidad', [20, 200])
+def test_tareas_sala_consultas_constantes_por_pagina(cliente, usuario, cantidad):
+    sala_id = crear_sala_con_tareas(usuario, cantidad)
+
+    with contar_sentencias() as sentencias:
+        respuesta = cliente.get(f'/api/tareas/sala/{sala_id}?limit=20')
+
+    assert respuesta.status_code == 200
+    assert len(respuesta.json) == 20
+    assert {t['usuario']['Username'] for t in respuesta.json} == {'ana', 'luis'}
+    # Pertenencia a la sala + página de tareas con su autor
+    assert len(sentencias) == 2
@@ -0,0 +1,23 @@
+import { useEffect } from 'react';
+import { sesionesService } from '../services/sesiones';
+
+const INTERVALO_LATIDO = 60 * 1000;
+
+// Mantiene viva la sesión en ejecución mientras la página está abierta,
+// también si el temporizador está en pausa
+export const useLatidoSesion = (sesionId) => {
+  useEffect(() => {
+    if (!sesionId) return;
+
+    const enviarLatido = async () => {
+      try {
+        await sesionesService.latido(sesionId);
+      } catch (error) {
+        console.error('Error enviando latido de sesión:', error);
+      }
+    };
+
+    const interval = setInterval(enviarLatido, INTERVALO_LATIDO);
+    return () => clearInterval(interval);
+  }, [sesionId]);
+};
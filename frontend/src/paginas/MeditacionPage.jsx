@@ -8,6 +8,7 @@ import ProgresoCard from '../componentes/ProgresoCard.jsx';
 import { Play, Pause, RotateCcw, Settings, Lock, Star } from 'lucide-react';
 import { meditacionService } from '../services/meditacion';
 import { useRecompensas } from '../hooks/useRecompensas';
+import { useLatidoSesion } from '../hooks/useLatidoSesion';
 
 export default function MeditacionPage({ user, onAuthClick }) {
   const [sesionActual, setSesionActual] = useState(null);
@@ -27,6 +28,7 @@ export default function MeditacionPage({ user, onAuthClick }) {
 
   const intervalRef = useRef(null);
   const { verificarRecompensas } = useRecompensas();
+  useLatidoSesion(sesionActual?.sesion_id);
 
   // Cargar tipos de meditación al inicio
   useEffect(() => {
@@ -8,6 +8,7 @@ import ProgresoCard from '../componentes/ProgresoCard';
 import { Play, Pause, RotateCcw, Settings, Lock } from 'lucide-react';
 import { pomodoroService } from '../services/pomodoro';
 import { useRecompensas } from '../hooks/useRecompensas';
+import { useLatidoSesion } from '../hooks/useLatidoSesion';
 
 export default function PomodoroPage({ user }) {
   // Configuración base
@@ -30,6 +31,7 @@ export default function PomodoroPage({ user }) {
 
   const intervalRef = useRef(null);
   const { verificarRecompensas } = useRecompensas();
+  useLatidoSesion(sesionActual?.sesion_id);
 
   // Lógica del temporizador
   useEffect(() => {
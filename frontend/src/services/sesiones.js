@@ -0,0 +1,8 @@
+import ApiService from './api';
+
+export const sesionesService = {
+  // Señal de vida de una sesión en ejecución: sin latidos el servidor la cierra sola
+  async latido(sesionId) {
+    return await ApiService.patch(`/sesiones/${sesionId}/latido`);
+  }
+};
@@ -1,9 +1,22 @@
 import ApiService from './api';
 
+// El listado está paginado: cada página trae el cursor de la siguiente en esta cabecera
+const CABECERA_CURSOR = 'x-next-cursor';
+const TAREAS_POR_PAGINA = 200;
+
 export const tareasService = {
+  // Recorre todas las páginas y devuelve la lista completa de tareas
   async obtenerTareas(filtros = {}) {
-    const params = new URLSearchParams(filtros).toString();
-    return await ApiService.get(`/tareas${params ? `?${params}` : ''}`);
+    const tareas = [];
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({ ...filtros, limit: TAREAS_POR_PAGINA });
+      if (cursor) params.set('cursor', cursor);
+      const respuesta = await ApiService.get(`/tareas?${params.toString()}`);
+      tareas.push(...respuesta.data);
+      cursor = respuesta.headers[CABECERA_CURSOR];
+    } while (cursor);
+    return tareas;
   },
 
   async crearTarea(tarea) {